@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from .metrics import QuantileSketch
+except ImportError:
+    from metrics import QuantileSketch
+
+
+class AdmissionRejected(Exception):
+    """Raised when the intake queue is full; retry_after is a suggested wait in whole seconds"""
+
+    def __init__(self, retry_after, reason="queue full"):
+        super().__init__(f"Admission rejected ({reason}), retry in {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+# Bounded intake queue
+class AdmissionController:
+    """Lets at most `max_concurrent` callers run at once and up to `max_queue` wait in line.
+
+    Anyone arriving when the line is full, or waiting longer than `max_wait`
+    seconds, is turned away at once with an estimate of when to retry instead
+    of piling up behind the database.
+    """
+
+    def __init__(self, max_concurrent=4, max_queue=32, max_wait=5.0, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        # Average time a caller holds its slot, used to estimate retry delays
+        self._mean_service = None
+        # Wait and service times in milliseconds
+        self.wait_times = QuantileSketch(min_value=0.1, max_value=600000.0)
+        self.service_times = QuantileSketch(min_value=0.1, max_value=600000.0)
+
+    def configure(self, max_concurrent=None, max_queue=None, max_wait=None):
+        """Change the limits; callers already admitted or queued are not affected"""
+        with self._condition:
+            if max_concurrent is not None:
+                self.max_concurrent = max_concurrent
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if max_wait is not None:
+                self.max_wait = max_wait
+            self._condition.notify_all()
+
+    def retry_after(self):
+        """Estimated whole seconds until a new caller could be admitted"""
+        with self._condition:
+            return self._retry_after()
+
+    def _retry_after(self):
+        service = self._mean_service or 1.0
+        # Everyone in line ahead gets served max_concurrent at a time
+        rounds = (self._queued + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(rounds * service))
+
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the duration of the with block, or raise AdmissionRejected"""
+        arrived = self._clock()
+        with self._condition:
+            if self._in_flight >= self.max_concurrent:
+                if self._queued >= self.max_queue:
+                    self._rejected += 1
+                    raise AdmissionRejected(self._retry_after())
+
+                self._queued += 1
+                self._peak_queued = max(self._peak_queued, self._queued)
+                try:
+                    deadline = arrived + self.max_wait
+                    while self._in_flight >= self.max_concurrent:
+                        remaining = deadline - self._clock()
+                        if remaining <= 0:
+                            self._timed_out += 1
+                            raise AdmissionRejected(self._retry_after(), "timed out waiting")
+                        self._condition.wait(remaining)
+                finally:
+                    self._queued -= 1
+
+            self._in_flight += 1
+            self._admitted += 1
+            self.wait_times.add((self._clock() - arrived) * 1000)
+
+        started = self._clock()
+        try:
+            yield
+        finally:
+            service = self._clock() - started
+            with self._condition:
+                self._in_flight -= 1
+                self.service_times.add(service * 1000)
+                self._mean_service = service if self._mean_service is None else \
+                    0.9 * self._mean_service + 0.1 * service
+                # Waiters may have given up, so wake all of them rather than one
+                self._condition.notify_all()
+
+    def stats(self):
+        """Return current queue depth, counters and wait/service time percentiles (ms) for tuning"""
+        with self._condition:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": self._queued,
+                "peak_queue_depth": self._peak_queued,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "wait_ms": self.wait_times.percentiles(),
+                "service_ms": self.service_times.percentiles()
+            }
@@ -1,14 +1,88 @@
 
-from classes import User, UserRole, MenuItem, Order, OrderStatus, OrderType, UserManager,DataStore,MenuManager,OrderManager,DeliveryManager,Order
+try:
+    from .classes import User, UserRole, MenuItem, Order, OrderStatus, OrderType, UserManager,DataStore,MenuManager,OrderManager,DeliveryManager,Order,DEFAULT_RESTAURANT_ID,agent_route
+except ImportError:
+    from classes import User, UserRole, MenuItem, Order, OrderStatus, OrderType, UserManager,DataStore,MenuManager,OrderManager,DeliveryManager,Order,DEFAULT_RESTAURANT_ID,agent_route
+try:
+    from .reporting import Reports, ReportTimeout
+except ImportError:
+    from reporting import Reports, ReportTimeout
 from datetime import datetime, timezone
+import argparse
+import json
+import sys
+import time
 import uuid
 # CLI Interface
 class FoodDeliveryApp:
-    def __init__(self):
-        self.user_manager = UserManager()
-        self.menu_manager = MenuManager()
-        self.order_manager = OrderManager()
-        self.delivery_manager = DeliveryManager()
+    # Menu shown to each role (None before login) as (label, action)
+    MENUS = {
+        None: [("Login", "login"), ("Register as Customer", "register"), ("Exit", "exit")],
+        UserRole.CUSTOMER: [
+            ("View Menu", "view_menu"), ("Place Order", "place_order"), ("View My Orders", "view_my_orders"),
+            ("Track Order", "track_order"), ("Logout", "logout")
+        ],
+        UserRole.RESTAURANT_MANAGER: [
+            ("View All Orders", "view_all_orders"), ("Update Order Status", "update_status"),
+            ("Bulk Update Order Status", "bulk_update_status"), ("Start Next Order in Kitchen", "start_next_order"),
+            ("Dispatch Ready Deliveries", "dispatch_deliveries"), ("Manage Menu", "manage_menu"), ("Logout", "logout")
+        ],
+        UserRole.DELIVERY_AGENT: [
+            ("View My Assigned Orders", "view_assigned_orders"), ("Update Delivery Status", "update_delivery_status"),
+            ("Logout", "logout")
+        ],
+        UserRole.ADMIN: [
+            ("View All Orders", "view_all_orders"), ("View All Delivery Agents", "view_agents"),
+            ("Register New Staff", "register_staff"), ("View Delivery Performance", "view_performance"),
+            ("Logout", "logout")
+        ]
+    }
+    
+    MENU_TITLES = {
+        UserRole.CUSTOMER: "Customer Menu",
+        UserRole.RESTAURANT_MANAGER: "Restaurant Manager Menu",
+        UserRole.DELIVERY_AGENT: "Delivery Agent Menu",
+        UserRole.ADMIN: "Admin Menu"
+    }
+    
+    # Screen method behind each action; scripts and recordings refer to actions by these names
+    ACTIONS = {
+        "login": "_login",
+        "register": "_register_customer",
+        "exit": "_exit",
+        "logout": "_logout",
+        "view_menu": "_display_menu",
+        "place_order": "_place_order",
+        "view_my_orders": "_view_customer_orders",
+        "track_order": "_track_order",
+        "view_all_orders": "_view_all_orders",
+        "update_status": "_update_order_status",
+        "bulk_update_status": "_bulk_update_order_status",
+        "start_next_order": "_start_next_preparation",
+        "dispatch_deliveries": "_dispatch_deliveries",
+        "manage_menu": "_manage_menu",
+        "view_assigned_orders": "_view_agent_orders",
+        "update_delivery_status": "_update_delivery_status",
+        "view_agents": "_view_all_agents",
+        "register_staff": "_register_staff",
+        "view_performance": "_view_delivery_performance"
+    }
+    
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID, input_func=input, record_file=None):
+        """input_func answers every prompt (input() by default). If record_file is given,
+        each action is appended to it as a JSON line that headless.py can replay."""
+        self.restaurant_id = restaurant_id
+        self._read_input = input_func
+        self._record_file = record_file
+        # Answers given during the current action, for recording
+        self._answers = []
+        self._session_start = time.perf_counter()
+        self.user_manager = UserManager(restaurant_id)
+        self.menu_manager = MenuManager(restaurant_id)
+        self.order_manager = OrderManager(restaurant_id)
+        self.delivery_manager = DeliveryManager(restaurant_id)
+        # Listings and summaries read through their own read-only connections, away from order placement
+        self.reports = Reports(self.order_manager.data_store.get_reporting_pool(), restaurant_id)
         self.current_user = None
         
         # Initialize with sample data if empty
@@ -18,7 +92,7 @@ class FoodDeliveryApp:
         data_store = DataStore()
         
         # Add sample menu items if none exist
-        if not data_store.get_menu_items():
+        if not self.menu_manager.get_all_items():
             self.menu_manager.add_item("Margherita Pizza", "Classic cheese and tomato pizza", 12.99, "Pizza")
             self.menu_manager.add_item("Pepperoni Pizza", "Pizza with pepperoni toppings", 14.99, "Pizza")
             self.menu_manager.add_item("Chicken Burger", "Grilled chicken burger with lettuce and mayo", 9.99, "Burger")
@@ -34,38 +108,72 @@ class FoodDeliveryApp:
     
     def start(self):
         print("===== Welcome to Food Delivery System =====")
+        # Watch active orders so listings can show ETAs and overdue orders without reloading
+        self.order_manager.start_eta_tracking()
         while True:
-            if not self.current_user:
-                self._show_auth_menu()
-            else:
-                if self.current_user.role == UserRole.CUSTOMER:
-                    self._show_customer_menu()
-                elif self.current_user.role == UserRole.RESTAURANT_MANAGER:
-                    self._show_manager_menu()
-                elif self.current_user.role == UserRole.DELIVERY_AGENT:
-                    self._show_delivery_agent_menu()
-                elif self.current_user.role == UserRole.ADMIN:
-                    self._show_admin_menu()
-    
-    def _show_auth_menu(self):
-        print("\n1. Login")
-        print("2. Register as Customer")
-        print("3. Exit")
-        choice = input("Enter your choice: ")
-        
-        if choice == "1":
-            self._login()
-        elif choice == "2":
-            self._register_customer()
-        elif choice == "3":
-            print("Thank you for using Food Delivery System!")
-            exit(0)
+            self._show_menu()
+    
+    def _input(self, prompt=""):
+        answer = self._read_input(prompt)
+        # "Press Enter" pauses carry no data, so they are not part of an action's inputs
+        if "Press Enter" not in prompt:
+            self._answers.append(answer)
+        return answer
+    
+    def _show_menu(self):
+        role = self.current_user.role if self.current_user else None
+        if role is None:
+            print()
         else:
-            print("Invalid choice. Please try again.")
+            print(f"\n===== {self.MENU_TITLES[role]} ({self.current_user.name}) =====")
+        
+        entries = self.MENUS[role]
+        for number, (label, _) in enumerate(entries, 1):
+            print(f"{number}. {label}")
+        choice = self._input("Enter your choice: ")
+        
+        for number, (_, action) in enumerate(entries, 1):
+            if choice == str(number):
+                self.perform(action)
+                return
+        print("Invalid choice. Please try again.")
+    
+    def perform(self, action):
+        """Run one menu action as the logged-in user and return what its screen returned.
+        
+        The screen's prompts are answered by input_func. Raises ValueError if the
+        action is not on the current user's menu.
+        """
+        role = self.current_user.role if self.current_user else None
+        if action not in (name for _, name in self.MENUS[role]):
+            raise ValueError(f"Action {action} is not available to {role.value if role else 'guests'}")
+        
+        started = time.perf_counter() - self._session_start
+        self._answers = []
+        result = None
+        try:
+            result = getattr(self, self.ACTIONS[action])()
+            return result
+        finally:
+            if self._record_file:
+                entry = {"t": round(started, 3), "action": action, "inputs": self._answers}
+                # Lets a replay map this order's id to the one created when the session is replayed
+                if isinstance(result, Order):
+                    entry["order_id"] = result.id
+                self._record_file.write(json.dumps(entry) + "\n")
+                self._record_file.flush()
+    
+    def _exit(self):
+        print("Thank you for using Food Delivery System!")
+        sys.exit(0)
+    
+    def _logout(self):
+        self.current_user = None
+        print("Logged out successfully.")
     
     def _login(self):
-        username = input("Username: ")
-        password = input("Password: ")
+        username = self._input("Username: ")
+        password = self._input("Password: ")
         
         success, result = self.user_manager.authenticate(username, password)
         if success:
@@ -75,93 +183,13 @@ class FoodDeliveryApp:
             print(f"Login failed: {result}")
     
     def _register_customer(self):
-        username = input("Username: ")
-        password = input("Password: ")
-        name = input("Full Name: ")
+        username = self._input("Username: ")
+        password = self._input("Password: ")
+        name = self._input("Full Name: ")
         
         success, message = self.user_manager.register_user(username, password, UserRole.CUSTOMER, name)
         print(message)
     
-    def _show_customer_menu(self):
-        print(f"\n===== Customer Menu ({self.current_user.name}) =====")
-        print("1. View Menu")
-        print("2. Place Order")
-        print("3. View My Orders")
-        print("4. Track Order")
-        print("5. Logout")
-        choice = input("Enter your choice: ")
-        
-        if choice == "1":
-            self._display_menu()
-        elif choice == "2":
-            self._place_order()
-        elif choice == "3":
-            self._view_customer_orders()
-        elif choice == "4":
-            self._track_order()
-        elif choice == "5":
-            self.current_user = None
-            print("Logged out successfully.")
-        else:
-            print("Invalid choice. Please try again.")
-    
-    def _show_manager_menu(self):
-        print(f"\n===== Restaurant Manager Menu ({self.current_user.name}) =====")
-        print("1. View All Orders")
-        print("2. Update Order Status")
-        print("3. Manage Menu")
-        print("4. Logout")
-        choice = input("Enter your choice: ")
-        
-        if choice == "1":
-            self._view_all_orders()
-        elif choice == "2":
-            self._update_order_status()
-        elif choice == "3":
-            self._manage_menu()
-        elif choice == "4":
-            self.current_user = None
-            print("Logged out successfully.")
-        else:
-            print("Invalid choice. Please try again.")
-    
-    def _show_delivery_agent_menu(self):
-        print(f"\n===== Delivery Agent Menu ({self.current_user.name}) =====")
-        print("1. View My Assigned Orders")
-        print("2. Update Delivery Status")
-        print("3. Logout")
-        choice = input("Enter your choice: ")
-        
-        if choice == "1":
-            self._view_agent_orders()
-        elif choice == "2":
-            self._update_delivery_status()
-        elif choice == "3":
-            self.current_user = None
-            print("Logged out successfully.")
-        else:
-            print("Invalid choice. Please try again.")
-    
-    def _show_admin_menu(self):
-        print(f"\n===== Admin Menu ({self.current_user.name}) =====")
-        print("1. View All Orders")
-        print("2. View All Delivery Agents")
-        print("3. Register New Staff")
-        print("4. Logout")
-        choice = input("Enter your choice: ")
-        
-        if choice == "1":
-            self._view_all_orders()
-        elif choice == "2":
-            self._view_all_agents()
-        elif choice == "3":
-            self._register_staff()
-        elif choice == "4":
-            self.current_user = None
-            print("Logged out successfully.")
-        else:
-            print("Invalid choice. Please try again.")
-    
     def _display_menu(self):
         print("\n===== Menu =====")
         menu_items = self.menu_manager.get_all_items()
@@ -175,7 +203,7 @@ class FoodDeliveryApp:
             print(f"{item.id}: {item.name} - ${item.price:.2f}")
             print(f"   {item.description}")
         
-        input("\nPress Enter to continue...")
+        self._input("\nPress Enter to continue...")
     
     def _place_order(self):
         print("\n===== Place Order =====")
@@ -185,7 +213,7 @@ class FoodDeliveryApp:
         
         cart = []
         while True:
-            item_id = input("\nEnter item ID to add to cart (or 'done' to finish): ")
+            item_id = self._input("\nEnter item ID to add to cart (or 'done' to finish): ")
             if item_id.lower() == 'done':
                 break
             
@@ -195,7 +223,7 @@ class FoodDeliveryApp:
                 continue
             
             try:
-                quantity = int(input(f"Enter quantity for {item.name}: "))
+                quantity = int(self._input(f"Enter quantity for {item.name}: "))
                 if quantity <= 0:
                     print("Quantity must be positive.")
                     continue
@@ -213,14 +241,14 @@ class FoodDeliveryApp:
         print("\nOrder Type:")
         print("1. Home Delivery")
         print("2. Takeaway")
-        order_type_choice = input("Enter your choice: ")
+        order_type_choice = self._input("Enter your choice: ")
         
         delivery_address = None
         order_type = None
         
         if order_type_choice == "1":
             order_type = OrderType.DELIVERY
-            delivery_address = input("Enter delivery address: ")
+            delivery_address = self._input("Enter delivery address: ")
         elif order_type_choice == "2":
             order_type = OrderType.TAKEAWAY
         else:
@@ -241,13 +269,9 @@ class FoodDeliveryApp:
             print(f"Order ID: {order.id}")
             print(f"Total amount: ${order.total_amount:.2f}")
             
-            # Assign delivery agent if it's a delivery order
+            # Delivery orders are batched onto an agent once they are ready
             if order_type == OrderType.DELIVERY:
-                success, agent_id = self.delivery_manager.assign_delivery_agent(order.id)
-                if success:
-                    print("Delivery agent assigned.")
-                else:
-                    print(f"Note: {agent_id}")
+                print("A delivery agent will be assigned when your order is ready.")
             
             time_remaining = self.order_manager.get_time_remaining(order.id)
             if time_remaining:
@@ -255,6 +279,7 @@ class FoodDeliveryApp:
                     print(f"Estimated delivery time: {time_remaining} minutes")
                 else:
                     print(f"Estimated pickup time: {time_remaining} minutes")
+            return order
         else:
             print(f"Failed to place order: {result}")
     
@@ -264,10 +289,11 @@ class FoodDeliveryApp:
         
         if not orders:
             print("You have no orders.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         orders.sort(key=lambda x: x.created_at, reverse=True)
+        times_remaining = self.order_manager.get_times_remaining(orders)
         
         for order in orders:
             print(f"\nOrder ID: {order.id}")
@@ -286,27 +312,27 @@ class FoodDeliveryApp:
             
             # Show time remaining if applicable
             if order.status not in [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]:
-                time_remaining = self.order_manager.get_time_remaining(order.id)
+                time_remaining = times_remaining[order.id]
                 if time_remaining:
                     if order.order_type == OrderType.DELIVERY:
                         print(f"Estimated time until delivery: {time_remaining} minutes")
                     else:
                         print(f"Estimated time until pickup: {time_remaining} minutes")
         
-        input("\nPress Enter to continue...")
+        self._input("\nPress Enter to continue...")
     
     def _track_order(self):
-        order_id = input("\nEnter Order ID to track: ")
+        order_id = self._input("\nEnter Order ID to track: ")
         order = self.order_manager.get_order(order_id)
         
         if not order:
             print("Order not found.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         if order.customer_id != self.current_user.id:
             print("This is not your order.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         print(f"\nOrder ID: {order.id}")
@@ -320,18 +346,26 @@ class FoodDeliveryApp:
                 else:
                     print(f"Estimated time until pickup: {time_remaining} minutes")
         
-        input("\nPress Enter to continue...")
+        self._input("\nPress Enter to continue...")
     
     def _view_all_orders(self):
         print("\n===== All Orders =====")
-        orders = self.order_manager.get_all_orders()
+        try:
+            orders = [Order.from_dict(row) for row in self.reports.orders()]
+            summary = self.reports.order_summary()
+        except ReportTimeout as e:
+            print(f"Report unavailable: {e}")
+            self._input("\nPress Enter to continue...")
+            return
         
         if not orders:
             print("No orders found.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
-        orders.sort(key=lambda x: x.created_at, reverse=True)
+        print(f"{summary['orders']} orders, revenue ${summary['revenue']:.2f}, "
+              f"average ${summary['average_order_value']:.2f}")
+        times_remaining = self.order_manager.get_times_remaining(orders)
         
         for order in orders:
             print(f"\nOrder ID: {order.id}")
@@ -339,16 +373,22 @@ class FoodDeliveryApp:
             print(f"Status: {order.status.value}")
             print(f"Type: {order.order_type.value}")
             print(f"Total: ${order.total_amount:.2f}")
+            
+            if order.status not in [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]:
+                if self.order_manager.eta_scheduler.is_overdue(order.id):
+                    print("ETA: OVERDUE")
+                else:
+                    print(f"ETA: {times_remaining[order.id]} minutes")
         
-        input("\nPress Enter to continue...")
+        self._input("\nPress Enter to continue...")
     
     def _update_order_status(self):
-        order_id = input("\nEnter Order ID to update: ")
+        order_id = self._input("\nEnter Order ID to update: ")
         order = self.order_manager.get_order(order_id)
         
         if not order:
             print("Order not found.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         print(f"\nCurrent Status: {order.status.value}")
@@ -361,7 +401,7 @@ class FoodDeliveryApp:
         print("6. Picked Up (for takeaway orders)")
         print("7. Cancelled")
         
-        choice = input("Enter your choice: ")
+        choice = self._input("Enter your choice: ")
         
         new_status = None
         if choice == "1":
@@ -380,12 +420,78 @@ class FoodDeliveryApp:
             new_status = OrderStatus.CANCELLED
         else:
               print("Invalid choice or status not applicable to this order type.")
-              input("\nPress Enter to continue...")
+              self._input("\nPress Enter to continue...")
               return
         
         success, message = self.order_manager.update_order_status(order_id, new_status)
         print(message)
-        input("\nPress Enter to continue...")
+        if success and new_status == OrderStatus.READY and order.order_type == OrderType.DELIVERY:
+            self._dispatch_ready_orders()
+        self._input("\nPress Enter to continue...")
+    
+    def _bulk_update_order_status(self):
+        order_ids = [order_id.strip() for order_id in self._input("\nEnter Order IDs to update (comma separated): ").split(",")]
+        order_ids = [order_id for order_id in order_ids if order_id]
+        
+        if not order_ids:
+            print("No orders selected.")
+            self._input("\nPress Enter to continue...")
+            return
+        
+        print("\nSelect new status:")
+        statuses = [
+            OrderStatus.CONFIRMED, OrderStatus.PREPARING, OrderStatus.READY,
+            OrderStatus.OUT_FOR_DELIVERY, OrderStatus.DELIVERED, OrderStatus.PICKED_UP,
+            OrderStatus.CANCELLED
+        ]
+        for i, status in enumerate(statuses, 1):
+            print(f"{i}. {status.value.replace('_', ' ').title()}")
+        
+        try:
+            idx = int(self._input("Enter your choice: ")) - 1
+            if idx < 0 or idx >= len(statuses):
+                raise ValueError
+        except ValueError:
+            print("Invalid choice.")
+            self._input("\nPress Enter to continue...")
+            return
+        
+        outcomes = self.order_manager.bulk_update_order_status(order_ids, statuses[idx])
+        for order_id, success, message in outcomes:
+            print(f"{order_id}: {'OK' if success else 'FAILED'} - {message}")
+        if statuses[idx] == OrderStatus.READY:
+            self._dispatch_ready_orders()
+        self._input("\nPress Enter to continue...")
+    
+    def _dispatch_deliveries(self):
+        self._dispatch_ready_orders()
+        self._input("\nPress Enter to continue...")
+    
+    def _dispatch_ready_orders(self):
+        success, result = self.delivery_manager.dispatch_ready_orders()
+        if not success:
+            print(result)
+            return
+        
+        if not result:
+            print("No ready deliveries could be dispatched.")
+        for agent_id, route in result:
+            print(f"Agent {agent_id} takes {len(route)} order(s): {' -> '.join(route)}")
+    
+    def _start_next_preparation(self):
+        success, result = self.order_manager.start_next_preparation()
+        if success:
+            print(f"Start preparing order {result}.")
+        else:
+            print(result)
+        
+        # Show what the kitchen will cook after it
+        queued = self.order_manager.kitchen.queued()
+        if queued:
+            print("\nUp next:")
+            for position, order_id in enumerate(queued, 1):
+                print(f"{position}. {order_id}")
+        self._input("\nPress Enter to continue...")
     
     def _manage_menu(self):
         while True:
@@ -396,7 +502,7 @@ class FoodDeliveryApp:
             print("4. Remove Menu Item")
             print("5. Back to Main Menu")
             
-            choice = input("Enter your choice: ")
+            choice = self._input("Enter your choice: ")
             
             if choice == "1":
                 self._display_menu()
@@ -413,11 +519,11 @@ class FoodDeliveryApp:
     
     def _add_menu_item(self):
         print("\n===== Add Menu Item =====")
-        name = input("Enter item name: ")
-        description = input("Enter description: ")
+        name = self._input("Enter item name: ")
+        description = self._input("Enter description: ")
         
         try:
-            price = float(input("Enter price: $"))
+            price = float(self._input("Enter price: $"))
             if price <= 0:
                 print("Price must be positive.")
                 return
@@ -425,13 +531,16 @@ class FoodDeliveryApp:
             print("Invalid price. Please enter a number.")
             return
         
-        category = input("Enter category: ")
+        category = self._input("Enter category: ")
         
         item = self.menu_manager.add_item(name, description, price, category)
+        if not item:
+            print("Failed to add item, please try again.")
+            return
         print(f"Item added successfully with ID: {item.id}")
     
     def _update_menu_item(self):
-        item_id = input("\nEnter Item ID to update: ")
+        item_id = self._input("\nEnter Item ID to update: ")
         item = self.menu_manager.get_item(item_id)
         
         if not item:
@@ -444,10 +553,10 @@ class FoodDeliveryApp:
         print(f"Category: {item.category}")
         
         print("\nLeave field empty to keep current value.")
-        name = input("New name (or enter to keep current): ")
-        description = input("New description (or enter to keep current): ")
-        price_str = input("New price (or enter to keep current): $")
-        category = input("New category (or enter to keep current): ")
+        name = self._input("New name (or enter to keep current): ")
+        description = self._input("New description (or enter to keep current): ")
+        price_str = self._input("New price (or enter to keep current): $")
+        category = self._input("New category (or enter to keep current): ")
         
         updates = {}
         if name:
@@ -475,14 +584,14 @@ class FoodDeliveryApp:
         print(message)
     
     def _remove_menu_item(self):
-        item_id = input("\nEnter Item ID to remove: ")
+        item_id = self._input("\nEnter Item ID to remove: ")
         item = self.menu_manager.get_item(item_id)
         
         if not item:
             print("Item not found.")
             return
         
-        confirm = input(f"Are you sure you want to remove '{item.name}'? (y/n): ")
+        confirm = self._input(f"Are you sure you want to remove '{item.name}'? (y/n): ")
         if confirm.lower() != 'y':
             print("Removal cancelled.")
             return
@@ -496,27 +605,19 @@ class FoodDeliveryApp:
         
         if not orders:
             print("You have no assigned orders.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         orders.sort(key=lambda x: x.created_at, reverse=True)
         
         for order in orders:
-         print(f"Order ID: {order.id}")
-         try:
-            # Use strptime instead of fromisoformat
-            order_date = datetime.strptime(order.created_at, "%Y-%m-%dT%H:%M:%S.%f")
-            print(f"Date: {order_date.strftime('%Y-%m-%d %H:%M')}")
-         except ValueError:
-            # Fallback if the datetime string doesn't have milliseconds
-            order_date = datetime.strptime(order.created_at, "%Y-%m-%dT%H:%M:%S")
-            print(f"Date: {order_date.strftime('%Y-%m-%d %H:%M')}")
+            print(f"Order ID: {order.id}")
+            print(f"Date: {datetime.fromisoformat(order.created_at).strftime('%Y-%m-%d %H:%M')}")
+            print(f"Status: {order.status.value}")
+            print(f"Type: {order.order_type.value}")
+            print(f"Total: ${order.total_amount:.2f}\n")
         
-        print(f"Status: {order.status.value}")
-        print(f"Type: {order.order_type.value}")
-        print(f"Total: ${order.total_amount:.2f}\n")
-    
-    input("Press Enter to continue...")
+        self._input("Press Enter to continue...")
     
     def _update_delivery_status(self):
         orders = self.delivery_manager.get_agent_orders(self.current_user.id)
@@ -524,7 +625,7 @@ class FoodDeliveryApp:
         
         if not active_orders:
             print("\nYou have no active orders to update.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         print("\n===== Update Delivery Status =====")
@@ -532,7 +633,7 @@ class FoodDeliveryApp:
             print(f"{i}. Order ID: {order.id} - Status: {order.status.value}")
         
         try:
-            idx = int(input("\nEnter number to select order: ")) - 1
+            idx = int(self._input("\nEnter number to select order: ")) - 1
             if idx < 0 or idx >= len(active_orders):
                 print("Invalid selection.")
                 return
@@ -553,10 +654,10 @@ class FoodDeliveryApp:
             print("1. Delivered")
         else:
             print("No valid status updates available for this order.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
-        choice = input("Enter your choice: ")
+        choice = self._input("Enter your choice: ")
         
         new_status = None
         if choice == "1":
@@ -567,7 +668,7 @@ class FoodDeliveryApp:
         
         if not new_status:
             print("Invalid choice.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         success, message = self.order_manager.update_order_status(
@@ -576,26 +677,73 @@ class FoodDeliveryApp:
             self.current_user.id
         )
         print(message)
-        input("\nPress Enter to continue...")
+        self._input("\nPress Enter to continue...")
     
     def _view_all_agents(self):
         print("\n===== All Delivery Agents =====")
-        data_store = DataStore()
-        agents = data_store.get_delivery_agents()
+        try:
+            agents = {agent["id"]: agent for agent in self.reports.agents()}
+        except ReportTimeout as e:
+            print(f"Report unavailable: {e}")
+            self._input("\nPress Enter to continue...")
+            return
         
         if not agents:
             print("No delivery agents found.")
-            input("\nPress Enter to continue...")
+            self._input("\nPress Enter to continue...")
             return
         
         for agent_id, agent_data in agents.items():
             print(f"\nAgent ID: {agent_id}")
             print(f"Name: {agent_data['name']}")
             print(f"Status: {agent_data['status']}")
-            if agent_data['current_order']:
-                print(f"Current Order: {agent_data['current_order']}")
+            print(f"Delivered: {agent_data['delivered']}")
+            route = agent_route(agent_data)
+            if route:
+                print(f"Current Order: {route[0]}")
+            if len(route) > 1:
+                print(f"Then: {', '.join(route[1:])}")
+        
+        self._input("\nPress Enter to continue...")
+    
+    def _view_delivery_performance(self):
+        print("\n===== Delivery Performance =====")
+        metrics = self.order_manager.metrics
+        
+        def minutes(seconds):
+            return f"{seconds / 60:.1f}m"
         
-        input("\nPress Enter to continue...")
+        for label, percentiles in (("Preparation", metrics.prep_time_percentiles()),
+                                   ("Delivery", metrics.delivery_time_percentiles())):
+            if percentiles:
+                print(f"{label} time: " + ", ".join(f"p{p} {minutes(v)}" for p, v in percentiles.items()))
+            else:
+                print(f"{label} time: no data yet")
+        
+        transitions = metrics.transitions()
+        if transitions:
+            print("\nTime per status transition:")
+            for (from_status, to_status), sketch in sorted(transitions.items()):
+                values = sketch.percentiles()
+                print(f"  {from_status} -> {to_status} ({sketch.count} orders): " +
+                      ", ".join(f"p{p} {minutes(v)}" for p, v in values.items()))
+        
+        agent_times = metrics.agent_delivery_times()
+        if agent_times:
+            print("\nDelivery time per agent:")
+            for agent_id, sketch in agent_times.items():
+                values = sketch.percentiles()
+                print(f"  {agent_id} ({sketch.count} orders): " +
+                      ", ".join(f"p{p} {minutes(v)}" for p, v in values.items()))
+        
+        intake = self.order_manager.get_intake_stats()
+        print(f"\nOrder intake: {intake['in_flight']}/{intake['max_concurrent']} in progress, "
+              f"{intake['queue_depth']}/{intake['max_queue']} queued (peak {intake['peak_queue_depth']}), "
+              f"{intake['admitted']} admitted, {intake['rejected'] + intake['timed_out']} turned away")
+        if intake["admitted"]:
+            print("  Queue wait: " + ", ".join(f"p{p} {v:.1f}ms" for p, v in intake["wait_ms"].items()))
+        
+        self._input("\nPress Enter to continue...")
     
     def _register_staff(self):
         print("\n===== Register New Staff =====")
@@ -604,14 +752,14 @@ class FoodDeliveryApp:
         print("3. Register Admin")
         print("4. Back")
         
-        choice = input("Enter your choice: ")
+        choice = self._input("Enter your choice: ")
         
         if choice == "4":
             return
         
-        username = input("Enter username: ")
-        password = input("Enter password: ")
-        name = input("Enter full name: ")
+        username = self._input("Enter username: ")
+        password = self._input("Enter password: ")
+        name = self._input("Enter full name: ")
         
         role = None
         if choice == "1":
@@ -629,6 +777,16 @@ class FoodDeliveryApp:
 
 # Main entry point
 if __name__ == "__main__":
-    app = FoodDeliveryApp()
-    app.start()
+    parser = argparse.ArgumentParser(description="Food Delivery System")
+    parser.add_argument("restaurant_id", nargs="?", default=DEFAULT_RESTAURANT_ID)
+    parser.add_argument("--record", metavar="FILE", help="append this session's actions to FILE for replay")
+    args = parser.parse_args()
+    
+    record_file = open(args.record, "a") if args.record else None
+    try:
+        app = FoodDeliveryApp(args.restaurant_id, record_file=record_file)
+        app.start()
+    finally:
+        if record_file:
+            record_file.close()
           
\ No newline at end of file
@@ -0,0 +1,409 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from spatial_index import GridIndex, RESTAURANT_LOCATION, distance_km
+
+# Spread of generated agent and customer locations around the restaurant, in degrees
+CITY_RADIUS_DEGREES = 0.15
+
+
+def _random_location(rng):
+    return (
+        RESTAURANT_LOCATION[0] + rng.uniform(-CITY_RADIUS_DEGREES, CITY_RADIUS_DEGREES),
+        RESTAURANT_LOCATION[1] + rng.uniform(-CITY_RADIUS_DEGREES, CITY_RADIUS_DEGREES)
+    )
+
+
+def benchmark_agent_assignment(num_agents=5000, num_orders=2500, seed=42):
+    """Compare random, linear-scan and grid-index agent assignment on the same orders"""
+    rng = random.Random(seed)
+    agents = {f"agent-{i}": _random_location(rng) for i in range(num_agents)}
+    orders = [_random_location(rng) for _ in range(num_orders)]
+
+    def run(strategy_name, pick):
+        available = dict(agents)
+        index = GridIndex()
+        for agent_id, location in available.items():
+            index.insert(agent_id, location)
+
+        pick_rng = random.Random(seed)
+        total_distance = 0.0
+        start = time.perf_counter()
+        for order_location in orders:
+            agent_id = pick(available, index, order_location, pick_rng)
+            total_distance += distance_km(available[agent_id], order_location)
+            # The agent is busy until the benchmark ends
+            del available[agent_id]
+            index.remove(agent_id)
+        elapsed = time.perf_counter() - start
+
+        print(f"{strategy_name:<12} {elapsed / num_orders * 1e6:>10.1f} us/assignment "
+              f"{total_distance:>12.1f} km total {total_distance / num_orders:>8.2f} km/order")
+
+    print(f"\n== Agent assignment: {num_agents} agents, {num_orders} orders ==")
+    run("random", lambda available, index, location, pick_rng: pick_rng.choice(list(available)))
+    run("linear", lambda available, index, location, pick_rng:
+        min(available, key=lambda agent_id: distance_km(available[agent_id], location)))
+    run("grid index", lambda available, index, location, pick_rng: index.nearest(location)[0])
+
+
+def _fresh_data_store():
+    """Create a DataStore backed by a new database in a temporary directory"""
+    from classes import DataStore
+
+    # DataStore opens food_delivery.db in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="food_delivery_bench_"))
+    DataStore._instance = None
+    return DataStore()
+
+
+def _seed_orders(data_store, customer_id, num_orders, items_per_order=3, restaurant_id="default"):
+    from classes import Order, OrderType
+
+    orders = data_store.data["orders"]
+    for i in range(num_orders):
+        items = [{"item_id": f"item-{j}", "name": f"Item {j}", "price": 9.99, "quantity": 1}
+                 for j in range(items_per_order)]
+        order = Order(customer_id, items, OrderType.DELIVERY, f"{i} Bench St", restaurant_id)
+        orders[order.id] = order.to_dict()
+    data_store.save_data()
+
+
+def benchmark_assign_delivery_agent(pool_sizes=(500, 5000, 20000), assignments=200, seed=42):
+    """Time DeliveryManager.assign_delivery_agent end to end as the agent pool grows"""
+    from classes import DeliveryManager, Order, OrderType
+
+    print(f"\n== assign_delivery_agent: {assignments} assignments ==")
+    for pool_size in pool_sizes:
+        rng = random.Random(seed)
+        data_store = _fresh_data_store()
+        for i in range(pool_size):
+            latitude, longitude = _random_location(rng)
+            data_store.data["delivery_agents"][f"agent-{i}"] = {
+                "id": f"agent-{i}", "name": f"Agent {i}", "status": "available", "current_order": None,
+                "route": [], "latitude": latitude, "longitude": longitude, "restaurant_id": "default"
+            }
+        order_ids = []
+        for i in range(assignments):
+            order = Order("bench-customer", [], OrderType.DELIVERY, f"{i} Bench St")
+            data_store.data["orders"][order.id] = order.to_dict()
+            order_ids.append(order.id)
+        data_store.save_data()
+        delivery_manager = DeliveryManager()
+
+        start = time.perf_counter()
+        for order_id in order_ids:
+            delivery_manager.assign_delivery_agent(order_id)
+        elapsed = time.perf_counter() - start
+        print(f"{pool_size:>6} agents {elapsed / assignments * 1000:>9.3f} ms/assignment")
+
+
+def benchmark_order_listing(num_orders=400):
+    """Compare Order objects built by a listing plus per-order ETA lookups, before and after the identity map"""
+    from classes import Order, OrderManager
+
+    data_store = _fresh_data_store()
+    _seed_orders(data_store, "bench-customer", num_orders)
+    order_manager = OrderManager()
+
+    # Count every Order built from a database row
+    hydrations = [0]
+    original_from_dict = Order.from_dict.__func__
+
+    def counting_from_dict(cls, data):
+        hydrations[0] += 1
+        return original_from_dict(cls, data)
+
+    Order.from_dict = classmethod(counting_from_dict)
+
+    def run(label, listing):
+        hydrations[0] = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        listing()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<16} {elapsed * 1000:>9.1f} ms {hydrations[0]:>8} orders built {peak / 1024:>10.1f} KiB peak")
+
+    def per_order_reload():
+        # What the listing screens used to do: one full reload and rebuild per order
+        for order in order_manager.get_customer_orders("bench-customer"):
+            data_store.data = data_store._load_data()
+            order_manager.get_order(order.id)
+
+    def identity_map():
+        data_store.data = data_store._load_data()
+        for order in order_manager.get_customer_orders("bench-customer"):
+            order_manager.get_time_remaining(order.id)
+
+    print(f"\n== Order listing with ETAs: {num_orders} orders ==")
+    try:
+        run("per-order reload", per_order_reload)
+        run("identity map", identity_map)
+    finally:
+        Order.from_dict = classmethod(original_from_dict)
+
+
+def benchmark_refresh(num_orders=5000, changed_per_round=5, rounds=50):
+    """Compare a full reload with an incremental refresh after another session changes a few orders"""
+    import sqlite3
+    from classes import DataStore
+
+    data_store = _fresh_data_store()
+    _seed_orders(data_store, "bench-customer", num_orders)
+
+    # A second store on the same file stands in for another process
+    peer = object.__new__(DataStore)
+    peer.db_file = data_store.db_file
+    peer.conn = sqlite3.connect(peer.db_file, check_same_thread=False)
+    peer.conn.row_factory = sqlite3.Row
+    peer.data = peer._load_data()
+    order_ids = list(peer.data["orders"])
+    rng = random.Random(42)
+
+    def run(label, read):
+        elapsed = 0.0
+        for _ in range(rounds):
+            for order_id in rng.sample(order_ids, changed_per_round):
+                peer.data["orders"][order_id]["status"] = rng.choice(["confirmed", "preparing", "ready"])
+            peer.save_data()
+
+            start = time.perf_counter()
+            read()
+            elapsed += time.perf_counter() - start
+        print(f"{label:<20} {elapsed / rounds * 1000:>9.2f} ms/read")
+
+    def full_reload():
+        data_store.data = data_store._load_data()
+
+    def unchanged():
+        # No peer writes in between: refresh only checks PRAGMA data_version
+        start = time.perf_counter()
+        for _ in range(rounds):
+            data_store.refresh()
+        print(f"{'refresh (no change)':<20} {(time.perf_counter() - start) / rounds * 1000:>9.2f} ms/read")
+
+    print(f"\n== Cache refresh: {num_orders} orders, {changed_per_round} changed by a peer per read ==")
+    run("full reload", full_reload)
+    run("refresh", data_store.refresh)
+    unchanged()
+
+
+def benchmark_restaurant_partitions(orders_per_restaurant=200, tenant_counts=(1, 10, 50), reads=50):
+    """Time one restaurant's order listing as the number of restaurants on the deployment grows"""
+    from classes import OrderManager
+
+    print(f"\n== Per-restaurant listing: {orders_per_restaurant} orders per restaurant ==")
+    for tenants in tenant_counts:
+        data_store = _fresh_data_store()
+        for tenant in range(tenants):
+            _seed_orders(data_store, "bench-customer", orders_per_restaurant, restaurant_id=f"r{tenant}")
+        order_manager = OrderManager("r0")
+
+        start = time.perf_counter()
+        for _ in range(reads):
+            order_manager.get_customer_orders("bench-customer")
+        elapsed = time.perf_counter() - start
+
+        # What a listing cost before partitioning: scan every order on the deployment
+        start = time.perf_counter()
+        for _ in range(reads):
+            [order for order in data_store.get_orders().values()
+             if order["customer_id"] == "bench-customer" and order["restaurant_id"] == "r0"]
+        scan = time.perf_counter() - start
+        print(f"{tenants:>4} restaurants {elapsed / reads * 1000:>9.2f} ms/listing "
+              f"(full scan {scan / reads * 1000:.2f} ms)")
+
+
+def benchmark_order_intake(clients=200, max_concurrent=4, max_queue=16):
+    """Burst of concurrent create_order calls with and without a bounded intake queue"""
+    from classes import MenuManager, OrderManager, OrderType
+    from metrics import QuantileSketch
+
+    _fresh_data_store()
+    item = MenuManager().add_item("Bench Pizza", "", 9.99, "Pizza")
+
+    def run(label, order_manager):
+        latencies = QuantileSketch(min_value=0.01, max_value=600000.0)
+        rejected = [0]
+        lock = threading.Lock()
+        start_gate = threading.Event()
+
+        def client(i):
+            start_gate.wait()
+            start = time.perf_counter()
+            success, _ = order_manager.create_order(f"client-{i}", [{"item_id": item.id, "quantity": 1}],
+                                                    OrderType.TAKEAWAY)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                if success:
+                    latencies.add(elapsed_ms)
+                else:
+                    rejected[0] += 1
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        start_gate.set()
+        for thread in threads:
+            thread.join()
+
+        p = latencies.percentiles()
+        print(f"{label:<10} {latencies.count:>5} served {rejected[0]:>5} rejected "
+              f"p50 {p[50]:>8.1f} ms p99 {p[99]:>8.1f} ms")
+
+    print(f"\n== Order intake: burst of {clients} clients ==")
+    run("unbounded", OrderManager(max_concurrent_orders=clients, max_queued_orders=clients))
+    run("bounded", OrderManager(max_concurrent_orders=max_concurrent, max_queued_orders=max_queue))
+
+
+def benchmark_export(history_sizes=(5000, 20000), chunk_size=1000):
+    """Peak memory of a streamed export as the order history grows, against loading it all"""
+    from export import export_orders
+
+    print(f"\n== Order export: chunks of {chunk_size} ==")
+    for num_orders in history_sizes:
+        data_store = _fresh_data_store()
+        _seed_orders(data_store, "bench-customer", num_orders)
+        # Drop the cache so the full load below is measured from scratch
+        data_store.data = None
+
+        def run(label, export):
+            tracemalloc.start()
+            start = time.perf_counter()
+            export()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{num_orders:>7} orders {label:<14} {elapsed * 1000:>9.1f} ms {peak / 1024:>10.1f} KiB peak")
+
+        run("streamed", lambda: export_orders(os.path.join(os.getcwd(), "export"), chunk_size=chunk_size,
+                                              data_store=data_store))
+        run("load all", lambda: [json.loads(order["items"]) for order in data_store._load_data()["orders"].values()])
+
+
+def benchmark_kitchen(num_orders=2000, stations=3, loads=(0.7, 0.85, 0.95), seed=42):
+    """Throughput and on-time rate of the kitchen scheduler against first-come first-served"""
+    from kitchen import PREP_MINUTES_BY_CATEGORY, simulate
+
+    rng = random.Random(seed)
+    prep_choices = list(PREP_MINUTES_BY_CATEGORY.values())
+    mean_prep = sum(prep_choices) / len(prep_choices)
+
+    print(f"\n== Kitchen: {num_orders} orders, {stations} stations ==")
+    for load in loads:
+        # Arrivals spaced so the stations are busy `load` of the time
+        mean_gap = mean_prep * 60 / stations / load
+        orders = []
+        arrival = 0.0
+        for _ in range(num_orders):
+            arrival += rng.expovariate(1 / mean_gap)
+            prep = rng.choice(prep_choices)
+            # Takeaway promises are tight, delivery promises leave room for the trip
+            promised = prep + rng.choice((10, 15, 40, 60))
+            orders.append((arrival, prep, arrival + promised * 60))
+
+        for policy in ("fifo", "priority"):
+            result = simulate(orders, stations, policy)
+            print(f"load {load:>4.2f} {policy:<9} {result['throughput_per_hour']:>7.1f} orders/h "
+                  f"on time {result['on_time_rate'] * 100:>5.1f}% p90 late {result['p90_late_minutes']:>6.1f} min")
+
+
+def benchmark_routing(num_orders=300, num_agents=40, peak_minutes=120, seed=42):
+    """Orders delivered per agent-hour with batched multi-drop trips against one order per agent"""
+    from routing import simulate
+
+    rng = random.Random(seed)
+    orders = [(rng.uniform(0, peak_minutes), _random_location(rng)) for _ in range(num_orders)]
+
+    print(f"\n== Delivery routing: {num_orders} orders over {peak_minutes} min, {num_agents} agents ==")
+    for label, max_batch in (("single", 1), ("batch of 2", 2), ("batch of 3", 3)):
+        start = time.perf_counter()
+        result = simulate(orders, num_agents, max_batch=max_batch)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<11} {result['orders_per_agent_hour']:>5.2f} orders/agent-hour "
+              f"mean wait {result['mean_wait_minutes']:>6.1f} min {result['km_driven']:>8.0f} km "
+              f"({elapsed * 1000:.0f} ms)")
+
+
+def benchmark_reporting(history=20000, orders=200):
+    """create_order latency while a heavy report runs on the shared connection or on the read-only pool"""
+    from classes import MenuManager, OrderManager, OrderType
+    from metrics import QuantileSketch
+    from reporting import Reports
+
+    data_store = _fresh_data_store()
+    _seed_orders(data_store, "bench-customer", history)
+    item = MenuManager().add_item("Bench Pizza", "", 9.99, "Pizza")
+    order_manager = OrderManager()
+    reports = Reports(data_store.get_reporting_pool())
+    # Revenue per customer and status across the whole history
+    heavy_sql = ("SELECT customer_id, status, COUNT(*), SUM(total_amount), MAX(LENGTH(items)) "
+                 "FROM orders GROUP BY customer_id, status ORDER BY 4 DESC")
+
+    def shared_report():
+        # The read-write connection is shared, so a report on it has to hold the DataStore lock
+        with data_store._db_lock:
+            data_store.conn.execute(heavy_sql).fetchall()
+            data_store.conn.execute("SELECT * FROM orders ORDER BY created_at DESC").fetchall()
+
+    def pooled_report():
+        reports.pool.query(heavy_sql)
+        reports.orders()
+
+    def run(label, report):
+        stop = threading.Event()
+        reports_run = [0]
+
+        def reporter():
+            while not stop.is_set():
+                report()
+                reports_run[0] += 1
+
+        thread = None
+        if report:
+            thread = threading.Thread(target=reporter)
+            thread.start()
+        latencies = QuantileSketch(min_value=0.01, max_value=600000.0)
+        try:
+            for i in range(orders):
+                start = time.perf_counter()
+                order_manager.create_order(f"bench-{i}", [{"item_id": item.id, "quantity": 1}], OrderType.TAKEAWAY)
+                latencies.add((time.perf_counter() - start) * 1000)
+        finally:
+            stop.set()
+            if thread:
+                thread.join()
+        p = latencies.percentiles()
+        print(f"{label:<14} create_order p50 {p[50]:>7.2f} ms p99 {p[99]:>7.2f} ms ({reports_run[0]} reports)")
+
+    print(f"\n== Reporting isolation: {history} orders of history ==")
+    run("no reports", None)
+    run("shared conn", shared_report)
+    run("read-only pool", pooled_report)
+
+
+BENCHMARKS = {
+    "assign": benchmark_agent_assignment,
+    "assign-store": benchmark_assign_delivery_agent,
+    "listing": benchmark_order_listing,
+    "refresh": benchmark_refresh,
+    "partitions": benchmark_restaurant_partitions,
+    "intake": benchmark_order_intake,
+    "export": benchmark_export,
+    "kitchen": benchmark_kitchen,
+    "routing": benchmark_routing,
+    "reporting": benchmark_reporting
+}
+
+if __name__ == "__main__":
+    # Run the named benchmarks, or all of them
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -1,12 +1,33 @@
 import time
-import random
 import sqlite3
 import json
 from enum import Enum
 from datetime import datetime, timedelta  # Make sure timedelta is imported
 import uuid
 import os
+import re
+import threading
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    from .eta_scheduler import ETAScheduler, minutes_until
+    from .spatial_index import GridIndex, geocode, distance_km, RESTAURANT_LOCATION
+    from .metrics import DeliveryMetrics
+    from .admission import AdmissionController, AdmissionRejected
+    from .migrations import apply_migrations, DEFAULT_RESTAURANT_ID
+    from .kitchen import KitchenScheduler, order_prep_minutes
+    from .reporting import ReadOnlyPool
+    from .routing import plan_route, pick_batch, MAX_BATCH_SIZE, BATCH_RADIUS_KM, DELIVERY_SPEED_KMH, HANDOVER_MINUTES
+except ImportError:
+    from eta_scheduler import ETAScheduler, minutes_until
+    from spatial_index import GridIndex, geocode, distance_km, RESTAURANT_LOCATION
+    from metrics import DeliveryMetrics
+    from admission import AdmissionController, AdmissionRejected
+    from migrations import apply_migrations, DEFAULT_RESTAURANT_ID
+    from kitchen import KitchenScheduler, order_prep_minutes
+    from reporting import ReadOnlyPool
+    from routing import plan_route, pick_batch, MAX_BATCH_SIZE, BATCH_RADIUS_KM, DELIVERY_SPEED_KMH, HANDOVER_MINUTES
 
 # Enum definitions
 class OrderStatus(Enum):
@@ -29,78 +50,168 @@ class UserRole(Enum):
     RESTAURANT_MANAGER = "restaurant_manager"
     ADMIN = "admin"
 
+# Allowed order status transitions, keyed by the current status
+ALLOWED_STATUS_TRANSITIONS = {
+    OrderStatus.PLACED: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.PREPARING, OrderStatus.READY, OrderStatus.OUT_FOR_DELIVERY, OrderStatus.CANCELLED},
+    OrderStatus.PREPARING: {OrderStatus.READY, OrderStatus.CANCELLED},
+    OrderStatus.READY: {OrderStatus.OUT_FOR_DELIVERY, OrderStatus.PICKED_UP, OrderStatus.CANCELLED},
+    OrderStatus.OUT_FOR_DELIVERY: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.PICKED_UP: set(),
+    OrderStatus.CANCELLED: set()
+}
+
+# Statuses that only apply to one order type
+DELIVERY_ONLY_STATUSES = {OrderStatus.OUT_FOR_DELIVERY, OrderStatus.DELIVERED}
+TAKEAWAY_ONLY_STATUSES = {OrderStatus.PICKED_UP}
+
+# Statuses after which the delivery agent is released
+FINAL_STATUSES = [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]
+
+def restaurant_of(row):
+    """Return the restaurant a cached menu item, order or agent row belongs to"""
+    return row.get("restaurant_id") or DEFAULT_RESTAURANT_ID
+
+def agent_route(agent_data):
+    """Return the order ids an agent still has to deliver, in drop order"""
+    route = agent_data.get("route")
+    if isinstance(route, str):
+        route = agent_data["route"] = json.loads(route)
+    if route is None:
+        # Rows written before routes existed only know their current order
+        route = [agent_data["current_order"]] if agent_data.get("current_order") else []
+    return route
+
+def agent_location(agent_data):
+    """Return an agent's (latitude, longitude), defaulting to the restaurant"""
+    if agent_data.get("latitude") is None or agent_data.get("longitude") is None:
+        return RESTAURANT_LOCATION
+    return (agent_data["latitude"], agent_data["longitude"])
+
+def set_agent_route(agent_data, route):
+    """Give an agent a new route; the agent is busy until its last drop is done"""
+    agent_data["route"] = list(route)
+    agent_data["current_order"] = route[0] if route else None
+    agent_data["status"] = "busy" if route else "available"
+
+def finish_drop(agent_data, order_id):
+    """Take a delivered or cancelled order off its agent's route"""
+    set_agent_route(agent_data, [routed for routed in agent_route(agent_data) if routed != order_id])
+
+# Returned when a save loses the optimistic version check to another session
+STALE_WRITE_MESSAGE = "Data was changed by another session, please try again"
+
+# Default limits of the order intake queue in front of create_order
+ORDER_INTAKE_CONCURRENCY = 4
+ORDER_INTAKE_QUEUE_DEPTH = 32
+ORDER_INTAKE_MAX_WAIT = 5.0
+
+# Orders the kitchen can prepare at once
+KITCHEN_STATIONS = 3
+
+# An order's ETA is only rewritten when the kitchen queue moves it by at least this much
+ETA_FEEDBACK_SECONDS = 60
+
+# Window (min, max) of minutes still needed once an order reaches a status,
+# used to pull ETAs back into a realistic range when the status changes
+ETA_WINDOW_MINUTES = {
+    OrderStatus.PLACED: {OrderType.TAKEAWAY: (10, 30), OrderType.DELIVERY: (25, 75)},
+    OrderStatus.CONFIRMED: {OrderType.TAKEAWAY: (10, 30), OrderType.DELIVERY: (25, 75)},
+    OrderStatus.PREPARING: {OrderType.TAKEAWAY: (5, 30), OrderType.DELIVERY: (20, 75)},
+    OrderStatus.READY: {OrderType.TAKEAWAY: (0, 0), OrderType.DELIVERY: (15, 45)},
+    OrderStatus.OUT_FOR_DELIVERY: {OrderType.TAKEAWAY: (0, 0), OrderType.DELIVERY: (5, 45)}
+}
+
 # Data storage class
 class DataStore:
     _instance = None
     
-    def __new__(cls):
+    # Columns of each table besides id and version, in the order they are written
+    TABLE_COLUMNS = {
+        "users": ("username", "password", "role", "name"),
+        "menu_items": ("name", "description", "price", "category", "restaurant_id"),
+        "orders": ("customer_id", "order_type", "delivery_address", "status", "created_at", "updated_at",
+                   "estimated_delivery_time", "delivery_agent_id", "total_amount", "items", "menu_version",
+                   "restaurant_id"),
+        "delivery_agents": ("name", "status", "current_order", "latitude", "longitude", "restaurant_id", "route")
+    }
+    
+    # Tables split by restaurant; the cache keeps {table: {restaurant_id: {id: None}}} for them
+    PARTITIONED_TABLES = ("menu_items", "orders", "delivery_agents")
+    _partitions = None
+    _partition_of = None
+    # Spatial index of each restaurant's available agents, updated as agent rows are cached
+    _agent_indexes = None
+    _agent_index_of = None
+    
+    # With sharding on, every restaurant but the default one gets its own database file
+    shard_by_restaurant = False
+    shard_directory = "."
+    _shards = {}
+    
+    # Row versions as last read or written: {table: {id: (version, column values)}}
+    _loaded_rows = None
+    # PRAGMA data_version when the cache was last brought up to date
+    _data_version = None
+    # Last change_log entry this store has read, and the token marking its own entries
+    _changes_seq = None
+    _change_token = None
+    # Entries kept in the change log; a store further behind than this reloads fully
+    CHANGE_LOG_KEEP = 10000
+    # (table, id) of rows rejected by the version check on the last save
+    last_conflicts = ()
+    
+    # Bumped whenever the cache is reloaded or written, so hydrated objects know when they are stale
+    snapshot_id = 0
+    
+    # Current published MenuSnapshot; readers take it without locking or touching SQLite
+    _menu_snapshot = None
+    _menu_publish_lock = threading.Lock()
+    
+    # The connection is shared between threads, so transactions and refreshes take turns
+    _db_lock = threading.RLock()
+    
+    # Read-only connections for reports, opened on first use
+    _reporting_pool = None
+    
+    def __new__(cls, restaurant_id=None):
+        if cls.shard_by_restaurant and restaurant_id not in (None, DEFAULT_RESTAURANT_ID):
+            shard = cls._shards.get(restaurant_id)
+            if shard is None:
+                shard = super(DataStore, cls).__new__(cls)
+                shard._open(cls.shard_file(restaurant_id))
+                cls._shards[restaurant_id] = shard
+            return shard
+        
         if cls._instance is None:
             cls._instance = super(DataStore, cls).__new__(cls)
             cls._instance._initialize()
         return cls._instance
     
+    @classmethod
+    def shard_file(cls, restaurant_id):
+        if not re.fullmatch(r"[\w-]+", restaurant_id):
+            raise ValueError(f"Invalid restaurant id: {restaurant_id!r}")
+        return os.path.join(cls.shard_directory, f"food_delivery_{restaurant_id}.db")
+    
     def _initialize(self):
-        self.db_file = "food_delivery.db"
+        self._open("food_delivery.db")
+    
+    def _open(self, db_file):
+        self.db_file = db_file
         # Connect with check_same_thread=False to allow access from multiple threads
         self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets read-only report connections read a snapshot while orders are written
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self._create_tables()
         # Cache loaded data to maintain compatibility with existing code
         self.data = self._load_data()
     
     def _create_tables(self):
-        cursor = self.conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT UNIQUE,
-            password TEXT,
-            role TEXT,
-            name TEXT
-        )
-        ''')
-        
-        # Create menu_items table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS menu_items (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            description TEXT,
-            price REAL,
-            category TEXT
-        )
-        ''')
-        
-        # Create orders table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS orders (
-            id TEXT PRIMARY KEY,
-            customer_id TEXT,
-            order_type TEXT,
-            delivery_address TEXT,
-            status TEXT,
-            created_at TEXT,
-            updated_at TEXT,
-            estimated_delivery_time TEXT,
-            delivery_agent_id TEXT,
-            total_amount REAL,
-            items TEXT  -- JSON string of items
-        )
-        ''')
-        
-        # Create delivery_agents table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS delivery_agents (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            status TEXT,
-            current_order TEXT
-        )
-        ''')
-        
-        self.conn.commit()
+        # The schema is owned by the migrations; this brings older databases up to date too
+        apply_migrations(self.conn)
     
     def _load_data(self):
         """Load data from SQLite into our in-memory data structure for compatibility"""
@@ -110,128 +221,544 @@ class DataStore:
             "orders": {},
             "delivery_agents": {}
         }
+        self._reset_row_state()
         
         cursor = self.conn.cursor()
         
-        # Load users
-        cursor.execute("SELECT * FROM users")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_dict = dict(row)
-            username = row_dict.pop("username")
-            # Include username in the user data
-            row_dict["username"] = username  # Add this line
-            data["users"][username] = row_dict
-        
-        # Load menu_items
-        cursor.execute("SELECT * FROM menu_items")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_dict = dict(row)
-            data["menu_items"][row_dict["id"]] = row_dict
-        
-        # Load orders
-        cursor.execute("SELECT * FROM orders")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_dict = dict(row)
-            row_dict["items"] = json.loads(row_dict["items"])
-            data["orders"][row_dict["id"]] = row_dict
-        
-        # Load delivery_agents
-        cursor.execute("SELECT * FROM delivery_agents")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_dict = dict(row)
-            data["delivery_agents"][row_dict["id"]] = row_dict
+        # Note where we are before reading so changes committed meanwhile are picked up by refresh()
+        self._data_version = self._read_data_version(cursor)
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+        self._changes_seq = cursor.fetchone()[0]
+        
+        # Users are keyed by username, everything else by id. Order items stay as JSON
+        # text and are decoded lazily by Order.
+        for table in data:
+            cursor.execute(f"SELECT * FROM {table}")
+            for row in cursor.fetchall():
+                self._cache_row(data, table, dict(row))
+        
+        # Every load starts a new read snapshot
+        self.snapshot_id += 1
         
         return data
     
+    def _reset_row_state(self):
+        self._loaded_rows = {table: {} for table in self.TABLE_COLUMNS}
+        self._partitions = {table: {} for table in self.PARTITIONED_TABLES}
+        self._partition_of = {table: {} for table in self.PARTITIONED_TABLES}
+        self._agent_indexes = {}
+        self._agent_index_of = {}
+    
+    def _cache_row(self, data, table, row_dict):
+        key = row_dict["username"] if table == "users" else row_dict["id"]
+        data[table][key] = row_dict
+        self._loaded_rows[table][row_dict["id"]] = (row_dict.get("version") or 0, self._row_values(table, row_dict))
+        if table in self._partitions:
+            self._add_to_partition(table, row_dict["id"], restaurant_of(row_dict))
+        if table == "delivery_agents":
+            self._index_agent(row_dict)
+    
+    def _add_to_partition(self, table, row_id, restaurant_id):
+        previous = self._partition_of[table].get(row_id)
+        if previous == restaurant_id:
+            return
+        if previous is not None:
+            self._partitions[table][previous].pop(row_id, None)
+        self._partition_of[table][row_id] = restaurant_id
+        self._partitions[table].setdefault(restaurant_id, {})[row_id] = None
+    
+    def _remove_from_partition(self, table, row_id):
+        if table not in self._partitions:
+            return
+        if table == "delivery_agents":
+            self._unindex_agent(row_id)
+        restaurant_id = self._partition_of[table].pop(row_id, None)
+        if restaurant_id is not None:
+            self._partitions[table][restaurant_id].pop(row_id, None)
+    
+    def _index_agent(self, agent_data):
+        """Put an agent in its restaurant's index if it is available, or take it out"""
+        agent_id = agent_data["id"]
+        self._unindex_agent(agent_id)
+        if agent_data.get("status") == "available":
+            restaurant_id = restaurant_of(agent_data)
+            self._agent_indexes.setdefault(restaurant_id, GridIndex()).insert(agent_id, agent_location(agent_data))
+            self._agent_index_of[agent_id] = restaurant_id
+    
+    def _unindex_agent(self, agent_id):
+        restaurant_id = self._agent_index_of.pop(agent_id, None)
+        if restaurant_id is not None:
+            self._agent_indexes[restaurant_id].remove(agent_id)
+    
+    def get_agent_index(self, restaurant_id):
+        """Return the GridIndex of a restaurant's available agents.
+        
+        Agents are added, moved and removed as their rows are loaded, written or
+        reloaded, so finding the nearest one never walks the whole pool. Use it
+        with _db_lock held, since writes on other threads update it.
+        """
+        # First pick up changes committed by other sessions
+        self.refresh()
+        return self._agent_indexes.setdefault(restaurant_id, GridIndex())
+    
+    def get_partition(self, table, restaurant_id):
+        """Return the cached rows of one table that belong to one restaurant"""
+        # First pick up changes committed by other sessions
+        self.refresh()
+        cache = self.data[table]
+        return [cache[row_id] for row_id in self._partitions[table].get(restaurant_id, ()) if row_id in cache]
+    
+    def _row_values(self, table, row):
+        """Return the column values of a cached row in TABLE_COLUMNS order"""
+        values = []
+        for column in self.TABLE_COLUMNS[table]:
+            value = row.get(column)
+            # Items are only re-encoded if they were decoded (and so may have changed)
+            if column == "items" and not isinstance(value, str):
+                value = json.dumps(value)
+            elif column == "route" and value is not None and not isinstance(value, str):
+                value = json.dumps(value)
+            elif column == "status" and table == "delivery_agents" and value is None:
+                value = "available"
+            elif column == "restaurant_id" and value is None:
+                value = DEFAULT_RESTAURANT_ID
+            values.append(value)
+        return tuple(values)
+    
+    @staticmethod
+    def _read_data_version(cursor):
+        # Changes whenever another connection commits to the database file
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+    
     def save_data(self):
-        """Save in-memory data to SQLite database"""
-        # Get a new cursor for this transaction
-        cursor = self.conn.cursor()
+        """Save changed rows from the in-memory cache to SQLite.
         
-        try:
-            # Begin transaction
-            cursor.execute("BEGIN TRANSACTION")
+        Only rows that differ from what was last read are written, and each write
+        checks the row version, so a row another process changed in the meantime is
+        not overwritten. Returns False (and reloads the cache) on such a conflict or
+        any other error.
+        """
+        if self._loaded_rows is None:
+            self._reset_row_state()
+        
+        changes = {}
+        for table in self.TABLE_COLUMNS:
+            rows = {row["id"]: row for row in self.data[table].values()}
+            deleted_ids = [row_id for row_id in self._loaded_rows[table] if row_id not in rows]
+            changes[table] = (rows, deleted_ids)
+        
+        return self._save_changes(changes)
+    
+    def save_rows(self, orders=(), delivery_agents=(), users=(), menu_items=()):
+        """Write only the given rows in a single transaction.
+        
+        Rows are named by their cache key (username for users, id otherwise), or passed
+        as row dicts, which join the cache once written. Cache keys are looked up with
+        the write lock held, so a concurrent reload can't swap the cache in between.
+        The cost depends on the rows written rather than on the size of the database.
+        """
+        with self._db_lock:
+            if self._loaded_rows is None:
+                self._reset_row_state()
             
-            # Save users: First delete existing then insert new
-            cursor.execute("DELETE FROM users")
-            for username, user_data in self.data["users"].items():
-                cursor.execute(
-                    "INSERT INTO users (id, username, password, role, name) VALUES (?, ?, ?, ?, ?)",
-                    (user_data["id"], username, user_data["password"], user_data["role"], user_data["name"])
-                )
+            changes = {}
+            added = []
+            for table, keys in (("users", users), ("menu_items", menu_items),
+                                ("orders", orders), ("delivery_agents", delivery_agents)):
+                rows = []
+                for key in keys:
+                    if isinstance(key, dict):
+                        rows.append(key)
+                        added.append((table, key))
+                    elif key in self.data[table]:
+                        rows.append(self.data[table][key])
+                    else:
+                        # A reload since the caller changed the row dropped it
+                        print(f"Save rejected: {table} row {key} is no longer cached")
+                        # Start over from the latest data so the caller can retry
+                        self.data = self._load_data()
+                        return False
+                changes[table] = ({row["id"]: row for row in rows}, ())
             
-            # Save menu_items: First delete existing then insert new
-            cursor.execute("DELETE FROM menu_items")
-            for item_id, item_data in self.data["menu_items"].items():
+            if not self._save_changes(changes):
+                return False
+            for table, row in added:
+                self.data[table][row["username"] if table == "users" else row["id"]] = row
+            return True
+    
+    def delete_rows(self, orders=(), delivery_agents=(), users=(), menu_items=()):
+        """Delete only the given rows, named by cache key, in a single transaction.
+        
+        Keys that are no longer cached are skipped. Returns False on a conflict or
+        error, like save_rows.
+        """
+        with self._db_lock:
+            if self._loaded_rows is None:
+                self._reset_row_state()
+            
+            changes = {}
+            removed = []
+            for table, keys in (("users", users), ("menu_items", menu_items),
+                                ("orders", orders), ("delivery_agents", delivery_agents)):
+                deleted_ids = []
+                for key in keys:
+                    row = self.data[table].get(key)
+                    if row is not None and row["id"] in self._loaded_rows[table]:
+                        deleted_ids.append(row["id"])
+                        removed.append((table, key))
+                changes[table] = ({}, deleted_ids)
+            
+            if not self._save_changes(changes):
+                return False
+            for table, key in removed:
+                self.data[table].pop(key, None)
+            return True
+    
+    def _save_changes(self, changes):
+        # Only one transaction at a time on the shared connection
+        with self._db_lock:
+            # changes maps table -> (rows by id, ids of deleted rows)
+            cursor = self.conn.cursor()
+            
+            try:
+                # Take the write lock up front so version checks and writes see the same data
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                written = {}
+                conflicts = []
+                for table, (rows, deleted_ids) in changes.items():
+                    written[table] = self._write_rows(cursor, table, rows, deleted_ids, conflicts)
+                
+                if conflicts:
+                    self.conn.rollback()
+                    self.last_conflicts = tuple(conflicts)
+                    print(f"Save rejected: {len(conflicts)} row(s) were changed by another session")
+                    # Start over from the latest data so the caller can retry
+                    self.data = self._load_data()
+                    return False
+                
+                changed = {table: list(table_written) for table, table_written in written.items() if table_written}
+                if changed:
+                    self._log_changes(cursor, changed)
+                self.conn.commit()
+            except Exception as e:
+                # Rollback on error
+                self.conn.rollback()
+                print(f"Error saving data to SQLite: {e}")
+                self.data = self._load_data()
+                return False
+            
+            self.last_conflicts = ()
+            
+            # What we wrote is now the baseline for the next save
+            for table, table_written in written.items():
+                rows = changes[table][0]
+                loaded = self._loaded_rows[table]
+                for row_id, state in table_written.items():
+                    if state is None:
+                        loaded.pop(row_id, None)
+                        self._remove_from_partition(table, row_id)
+                    else:
+                        loaded[row_id] = state
+                        rows[row_id]["version"] = state[0]
+                        if table in self._partitions:
+                            self._add_to_partition(table, row_id, restaurant_of(rows[row_id]))
+                        if table == "delivery_agents":
+                            self._index_agent(rows[row_id])
+            
+            if changed:
+                # Menu items changed outside publish_menu_change; reload the snapshot on next use
+                if "menu_items" in changed:
+                    self._menu_snapshot = None
+                self.snapshot_id += 1
+            return True
+    
+    def _write_rows(self, cursor, table, rows, deleted_ids, conflicts):
+        """Insert, update or delete rows with optimistic version checks.
+        
+        Returns {id: (version, values)} for written rows and {id: None} for deleted
+        ones; rows that fail their version check are added to conflicts.
+        """
+        columns = self.TABLE_COLUMNS[table]
+        loaded = self._loaded_rows[table]
+        written = {}
+        
+        for row_id, row in rows.items():
+            values = self._row_values(table, row)
+            previous = loaded.get(row_id)
+            if previous is None:
+                try:
+                    cursor.execute(
+                        f"INSERT INTO {table} (id, version, {', '.join(columns)}) "
+                        f"VALUES (?, 1, {', '.join('?' * len(columns))})",
+                        (row_id,) + values
+                    )
+                except sqlite3.IntegrityError:
+                    # Another session already created this row (or took the username)
+                    conflicts.append((table, row_id))
+                    continue
+                written[row_id] = (1, values)
+            elif previous[1] != values:
                 cursor.execute(
-                    "INSERT INTO menu_items (id, name, description, price, category) VALUES (?, ?, ?, ?, ?)",
-                    (item_id, item_data["name"], item_data["description"], item_data["price"], item_data["category"])
+                    f"UPDATE {table} SET {', '.join(column + ' = ?' for column in columns)}, version = version + 1 "
+                    f"WHERE id = ? AND version = ?",
+                    values + (row_id, previous[0])
                 )
+                if cursor.rowcount == 0:
+                    conflicts.append((table, row_id))
+                    continue
+                written[row_id] = (previous[0] + 1, values)
+        
+        for row_id in deleted_ids:
+            cursor.execute(f"DELETE FROM {table} WHERE id = ? AND version = ?", (row_id, loaded[row_id][0]))
+            if cursor.rowcount == 0:
+                conflicts.append((table, row_id))
+                continue
+            written[row_id] = None
+        
+        return written
+    
+    def _feed_token(self):
+        # Identifies this store's own entries in the change log
+        if self._change_token is None:
+            self._change_token = f"{os.getpid()}-{uuid.uuid4().hex}"
+        return self._change_token
+    
+    def _log_changes(self, cursor, changed):
+        """Record the ids of rows this transaction changed; call inside the transaction, before commit.
+        
+        The entry commits (or rolls back) with the rows, so a reader never sees one
+        without the other, and entries are numbered in commit order.
+        """
+        cursor.execute("INSERT INTO change_log (token, changes) VALUES (?, ?)",
+                       (self._feed_token(), json.dumps(changed)))
+        # Writers hold the write lock here, so trimming the log can't race another writer
+        cursor.execute("DELETE FROM change_log WHERE seq <= ?", (cursor.lastrowid - self.CHANGE_LOG_KEEP,))
+    
+    def _read_change_log(self, cursor):
+        """Return ({table: set of ids} changed by other sessions, last seq read), or None if that is unknown.
+        
+        Unknown means an entry is missing (trimmed from the log) or says anything may
+        have changed, or no entry accounts for the commits data_version reported.
+        """
+        cursor.execute("SELECT seq, token, changes FROM change_log WHERE seq > ? ORDER BY seq",
+                       (self._changes_seq,))
+        changed = {}
+        seq = self._changes_seq
+        for entry_seq, token, changes in cursor.fetchall():
+            # Entries commit with their rows and roll back with them, so seqs only skip when trimmed
+            if entry_seq != seq + 1 or changes is None:
+                return None
+            seq = entry_seq
+            if token == self._change_token:
+                continue
+            for table, ids in json.loads(changes).items():
+                changed.setdefault(table, set()).update(ids)
+        return (changed, seq) if changed else None
+    
+    def refresh(self):
+        """Bring the cache up to date with changes committed by other processes.
+        
+        Nothing is read when the database has not changed. Otherwise only the rows
+        listed in the change log since we last read it are reloaded, falling back to
+        a full reload when the log cannot account for the change.
+        """
+        # Don't read the connection while another thread is part way through a transaction
+        with self._db_lock:
+            if self._loaded_rows is None or self._data_version is None or self._changes_seq is None:
+                self.data = self._load_data()
+                return
+            
+            cursor = self.conn.cursor()
+            # Read before the log: anything committed after this shows up as a new data_version next time
+            data_version = self._read_data_version(cursor)
+            if data_version == self._data_version:
+                return
             
-            # Save orders: First delete existing then insert new
-            cursor.execute("DELETE FROM orders")
-            for order_id, order_data in self.data["orders"].items():
-                # Convert items to JSON string
-                items_json = json.dumps(order_data["items"])
+            logged = self._read_change_log(cursor)
+            if logged is None:
+                self.data = self._load_data()
+                return
+            
+            changed, self._changes_seq = logged
+            self._data_version = data_version
+            for table, ids in changed.items():
+                if table in self.TABLE_COLUMNS:
+                    self._reload_rows(cursor, table, list(ids))
+            
+            if "menu_items" in changed:
+                self._menu_snapshot = None
+            self.snapshot_id += 1
+    
+    def _reload_rows(self, cursor, table, ids):
+        cache = self.data[table]
+        loaded = self._loaded_rows[table]
+        
+        fresh = {}
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(f"SELECT * FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            for row in cursor.fetchall():
+                fresh[row["id"]] = dict(row)
+        
+        for row_id in ids:
+            previous = loaded.pop(row_id, None)
+            if previous is not None:
+                # Users are cached by username, which is the first user column
+                cache.pop(previous[1][0] if table == "users" else row_id, None)
+                self._remove_from_partition(table, row_id)
+            if row_id in fresh:
+                self._cache_row(self.data, table, fresh[row_id])
+    
+    def get_menu_snapshot(self):
+        """Return the current immutable menu version, loading it on first use"""
+        snapshot = self._menu_snapshot
+        if snapshot is None:
+            with self._menu_publish_lock:
+                if self._menu_snapshot is None:
+                    cursor = self.conn.cursor()
+                    self._menu_snapshot = MenuSnapshot(*self._read_menu(cursor))
+                snapshot = self._menu_snapshot
+        return snapshot
+    
+    @staticmethod
+    def _read_menu(cursor):
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM menu_versions")
+        version = cursor.fetchone()[0]
+        cursor.execute("SELECT * FROM menu_items")
+        return version, {row["id"]: dict(row) for row in cursor.fetchall()}
+    
+    def publish_menu_change(self, upserts=None, deletes=(), updates=None, restaurant_id=None):
+        """Write a menu change and atomically publish it as a new menu version.
+        
+        upserts maps item ids to full item dicts, updates maps item ids to the fields
+        to change, and deletes lists item ids to remove. If restaurant_id is given,
+        updated and deleted items must belong to that restaurant. Returns the new
+        MenuSnapshot, or None if an item is missing or the write failed.
+        """
+        upserts = upserts or {}
+        updates = updates or {}
+        
+        with self._menu_publish_lock, self._db_lock:
+            cursor = self.conn.cursor()
+            try:
+                # Take the write lock first so the change is based on the latest menu
+                cursor.execute("BEGIN IMMEDIATE")
+                _, items = self._read_menu(cursor)
                 
-                # Handle any None values properly
-                delivery_address = order_data.get("delivery_address")
-                delivery_agent_id = order_data.get("delivery_agent_id")
+                for item_id in list(updates) + list(deletes):
+                    if item_id not in items or (restaurant_id and restaurant_of(items[item_id]) != restaurant_id):
+                        self.conn.rollback()
+                        return None
                 
-                cursor.execute(
-                    """INSERT INTO orders 
-                       (id, customer_id, order_type, delivery_address, status, created_at, 
-                        updated_at, estimated_delivery_time, delivery_agent_id, total_amount, items)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        order_id, order_data["customer_id"], order_data["order_type"],
-                        delivery_address, order_data["status"], 
-                        order_data["created_at"], order_data["updated_at"],
-                        order_data["estimated_delivery_time"], delivery_agent_id,
-                        order_data["total_amount"], items_json
+                for item_id, fields in updates.items():
+                    upserts[item_id] = dict(items[item_id], **fields)
+                
+                for item_id, item_data in upserts.items():
+                    row_version = (items[item_id].get("version") or 0) + 1 if item_id in items else 1
+                    item_data = dict(item_data, id=item_id, version=row_version)
+                    item_data["restaurant_id"] = restaurant_of(item_data)
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO menu_items (id, name, description, price, category, restaurant_id, version) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (item_id, item_data["name"], item_data["description"], item_data["price"],
+                         item_data["category"], item_data["restaurant_id"], row_version)
                     )
-                )
+                    upserts[item_id] = items[item_id] = item_data
+                
+                for item_id in deletes:
+                    cursor.execute("DELETE FROM menu_items WHERE id = ?", (item_id,))
+                    del items[item_id]
+                
+                cursor.execute("INSERT INTO menu_versions (published_at) VALUES (?)",
+                               (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+                version = cursor.lastrowid
+                self._log_changes(cursor, {"menu_items": list(upserts) + list(deletes)})
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                print(f"Error publishing menu change: {e}")
+                return None
             
-            # Save delivery_agents: First delete existing then insert new
-            cursor.execute("DELETE FROM delivery_agents")
-            for agent_id, agent_data in self.data["delivery_agents"].items():
-                cursor.execute(
-                    "INSERT INTO delivery_agents (id, name, status, current_order) VALUES (?, ?, ?, ?)",
-                    (agent_id, agent_data["name"], agent_data.get("status", "available"), agent_data.get("current_order"))
-                )
+            # Keep the legacy cache in step so save_data does not resurrect or drop items
+            if self._loaded_rows is None:
+                self._reset_row_state()
+            for item_id, item_data in upserts.items():
+                self._cache_row(self.data, "menu_items", dict(item_data))
+            for item_id in deletes:
+                self.data["menu_items"].pop(item_id, None)
+                self._loaded_rows["menu_items"].pop(item_id, None)
+                self._remove_from_partition("menu_items", item_id)
             
-            # Commit the transaction
-            self.conn.commit()
-        except Exception as e:
-            # Rollback on error
-            self.conn.rollback()
-            print(f"Error saving data to SQLite: {e}")
+            self._menu_snapshot = MenuSnapshot(version, items)
+            return self._menu_snapshot
     
     def get_users(self):
-        # First refresh data from database to get latest changes
-        self.data = self._load_data()
+        # First pick up changes committed by other sessions
+        self.refresh()
         return self.data["users"]
     
     def get_menu_items(self):
-        # First refresh data from database to get latest changes
-        self.data = self._load_data()
+        # First pick up changes committed by other sessions
+        self.refresh()
         return self.data["menu_items"]
     
     def get_orders(self):
-        # First refresh data from database to get latest changes
-        self.data = self._load_data()
+        # First pick up changes committed by other sessions
+        self.refresh()
         return self.data["orders"]
     
     def get_delivery_agents(self):
-        # First refresh data from database to get latest changes
-        self.data = self._load_data()
+        # First pick up changes committed by other sessions
+        self.refresh()
         return self.data["delivery_agents"]
     
+    def iter_order_rows(self, created_from=None, created_to=None, chunk_size=1000, restaurant_id=None):
+        """Yield lists of at most chunk_size order rows straight from SQLite, oldest first.
+        
+        Rows are read from the read-only reporting pool rather than the cache, so
+        memory use depends on chunk_size and not on the size of the order history.
+        Each chunk borrows a connection for one query under the pool's time budget
+        and picks up after the last (created_at, id) read, so a slow or abandoned
+        export never keeps a connection from the report screens.
+        created_from is inclusive and created_to exclusive ("YYYY-MM-DD[ HH:MM:SS]").
+        """
+        conditions = []
+        params = []
+        if created_from:
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            conditions.append("created_at < ?")
+            params.append(created_to)
+        if restaurant_id:
+            conditions.append("restaurant_id = ?")
+            params.append(restaurant_id)
+        
+        pool = self.get_reporting_pool()
+        last = None
+        while True:
+            page_conditions = conditions + (["(created_at, id) > (?, ?)"] if last else [])
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            rows = pool.query(f"SELECT * FROM orders {where} ORDER BY created_at, id LIMIT ?",
+                              params + (list(last) if last else []) + [chunk_size])
+            if not rows:
+                break
+            yield rows
+            last = (rows[-1]["created_at"], rows[-1]["id"])
+    
+    def get_reporting_pool(self):
+        """Read-only connections for reports and exports, kept apart from the connection orders are written on"""
+        if self._reporting_pool is None:
+            self._reporting_pool = ReadOnlyPool(self.db_file)
+        return self._reporting_pool
+    
     def close(self):
+        if self._reporting_pool is not None:
+            self._reporting_pool.close()
+            self._reporting_pool = None
         if hasattr(self, 'conn'):
             self.conn.close()
          
@@ -273,8 +800,11 @@ class User:
 # Changes to the UserManager class in classes.py
 
 class UserManager:
-    def __init__(self):
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID):
         self.data_store = DataStore()
+        # New delivery agents join this restaurant's pool, which may live in its own shard
+        self.restaurant_id = restaurant_id
+        self.agent_store = DataStore(restaurant_id)
     
     def register_user(self, username, password, role, name=None):
         users = self.data_store.get_users()
@@ -282,18 +812,37 @@ class UserManager:
             return False, "Username already exists"
         
         new_user = User(username, password, role, name)
-        users[username] = new_user.to_dict()
-        
-        if role == UserRole.DELIVERY_AGENT:
-            delivery_agents = self.data_store.get_delivery_agents()
-            delivery_agents[new_user.id] = {
-                "id": new_user.id,
-                "name": new_user.name,
-                "status": "available",
-                "current_order": None
-            }
-        
-        self.data_store.save_data()
+        if role != UserRole.DELIVERY_AGENT:
+            if not self.data_store.save_rows(users=[new_user.to_dict()]):
+                return False, STALE_WRITE_MESSAGE
+            return True, "User registered successfully"
+        
+        agent = {
+            "id": new_user.id,
+            "name": new_user.name,
+            "status": "available",
+            "current_order": None,
+            "route": [],
+            # New agents start at the restaurant
+            "latitude": RESTAURANT_LOCATION[0],
+            "longitude": RESTAURANT_LOCATION[1],
+            "restaurant_id": self.restaurant_id
+        }
+        if self.agent_store is self.data_store:
+            # Same database: the user and the agent commit together or not at all
+            if not self.data_store.save_rows(users=[new_user.to_dict()], delivery_agents=[agent]):
+                return False, STALE_WRITE_MESSAGE
+            return True, "User registered successfully"
+        
+        # The agent pool lives in another shard, so no transaction spans both rows;
+        # take the user row back out if the agent can't be written
+        if not self.data_store.save_rows(users=[new_user.to_dict()]):
+            return False, STALE_WRITE_MESSAGE
+        if not self.agent_store.save_rows(delivery_agents=[agent]):
+            if not self.data_store.delete_rows(users=[username]):
+                print(f"Could not remove user {username} after the delivery agent row failed to save")
+            return False, STALE_WRITE_MESSAGE
+        
         return True, "User registered successfully"
     
     def authenticate(self, username, password):
@@ -344,14 +893,18 @@ class UserManager:
             print(f"Authentication error: {str(e)}")
             return False, f"Authentication error: {str(e)}"
 
+# Fields a menu item update may touch
+MENU_ITEM_FIELDS = ("name", "description", "price", "category")
+
 # Menu item class
 class MenuItem:
-    def __init__(self, name, description, price, category):
+    def __init__(self, name, description, price, category, restaurant_id=DEFAULT_RESTAURANT_ID):
         self.id = str(uuid.uuid4())
         self.name = name
         self.description = description
         self.price = price
         self.category = category
+        self.restaurant_id = restaurant_id
     
     def to_dict(self):
         return {
@@ -359,7 +912,8 @@ class MenuItem:
             "name": self.name,
             "description": self.description,
             "price": self.price,
-            "category": self.category
+            "category": self.category,
+            "restaurant_id": self.restaurant_id
         }
     
     @classmethod
@@ -368,56 +922,68 @@ class MenuItem:
             name=data["name"],
             description=data["description"],
             price=data["price"],
-            category=data["category"]
+            category=data["category"],
+            restaurant_id=restaurant_of(data)
         )
         item.id = data["id"]
         return item
 
+# Immutable published menu
+class MenuSnapshot:
+    """A read-only version of the menu; edits publish a new snapshot instead of changing this one"""
+    __slots__ = ("version", "items", "_by_restaurant")
+    
+    def __init__(self, version, items):
+        self.version = version
+        self.items = MappingProxyType({item_id: MappingProxyType(dict(item)) for item_id, item in items.items()})
+        by_restaurant = {}
+        for item_id, item in self.items.items():
+            by_restaurant.setdefault(restaurant_of(item), []).append(item)
+        self._by_restaurant = MappingProxyType({key: tuple(value) for key, value in by_restaurant.items()})
+    
+    def items_for(self, restaurant_id):
+        """Return the items of one restaurant's menu"""
+        return self._by_restaurant.get(restaurant_id, ())
+
 # Menu management
 class MenuManager:
-    def __init__(self):
-        self.data_store = DataStore()
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID):
+        self.restaurant_id = restaurant_id
+        self.data_store = DataStore(restaurant_id)
     
     def add_item(self, name, description, price, category):
-        menu_items = self.data_store.get_menu_items()
-        new_item = MenuItem(name, description, price, category)
-        menu_items[new_item.id] = new_item.to_dict()
-        self.data_store.save_data()
+        """Publish a new menu item and return it, or None if the write failed"""
+        new_item = MenuItem(name, description, price, category, self.restaurant_id)
+        if not self.data_store.publish_menu_change(upserts={new_item.id: new_item.to_dict()}):
+            return None
         return new_item
     
     def update_item(self, item_id, **kwargs):
-        menu_items = self.data_store.get_menu_items()
-        if item_id not in menu_items:
+        updates = {key: value for key, value in kwargs.items() if key in MENU_ITEM_FIELDS and key != "id"}
+        if not self.data_store.publish_menu_change(updates={item_id: updates}, restaurant_id=self.restaurant_id):
             return False, "Item not found"
-        
-        for key, value in kwargs.items():
-            if key in menu_items[item_id] and key != "id":
-                menu_items[item_id][key] = value
-        
-        self.data_store.save_data()
         return True, "Item updated"
     
     def remove_item(self, item_id):
-        menu_items = self.data_store.get_menu_items()
-        if item_id not in menu_items:
+        if not self.data_store.publish_menu_change(deletes=[item_id], restaurant_id=self.restaurant_id):
             return False, "Item not found"
-        
-        del menu_items[item_id]
-        self.data_store.save_data()
         return True, "Item removed"
     
+    def get_menu_version(self):
+        return self.data_store.get_menu_snapshot().version
+    
     def get_all_items(self):
-        return [MenuItem.from_dict(item) for item in self.data_store.get_menu_items().values()]
+        return [MenuItem.from_dict(item) for item in self.data_store.get_menu_snapshot().items_for(self.restaurant_id)]
     
     def get_item(self, item_id):
-        menu_items = self.data_store.get_menu_items()
-        if item_id not in menu_items:
+        menu_items = self.data_store.get_menu_snapshot().items
+        if item_id not in menu_items or restaurant_of(menu_items[item_id]) != self.restaurant_id:
             return None
         return MenuItem.from_dict(menu_items[item_id])
 
 # Order class
 class Order:
-    def __init__(self, customer_id, items, order_type, delivery_address=None):
+    def __init__(self, customer_id, items, order_type, delivery_address=None, restaurant_id=DEFAULT_RESTAURANT_ID):
         self.id = str(uuid.uuid4())
         self.customer_id = customer_id
         self.items = items
@@ -432,6 +998,11 @@ class Order:
         
         self.delivery_agent_id = None
         
+        # Menu version the order was priced against
+        self.menu_version = None
+        
+        self.restaurant_id = restaurant_id
+        
         # Calculate total amount
         self.total_amount = sum(item["price"] * item["quantity"] for item in items) if items else 0
     
@@ -447,56 +1018,212 @@ class Order:
             "updated_at": self.updated_at,
             "estimated_delivery_time": self.estimated_delivery_time,
             "delivery_agent_id": self.delivery_agent_id,
-            "total_amount": self.total_amount
+            "total_amount": self.total_amount,
+            "menu_version": self.menu_version,
+            "restaurant_id": self.restaurant_id
         }
     
+    @property
+    def items(self):
+        # Items loaded from the database stay as JSON text until first accessed
+        if isinstance(self._items, str):
+            self._items = json.loads(self._items)
+        return self._items
+    
+    @items.setter
+    def items(self, value):
+        self._items = value
+    
     @classmethod
     def from_dict(cls, data):
-        order = cls(
-            customer_id=data["customer_id"],
-            items=data["items"],
-            order_type=OrderType(data["order_type"]),
-            delivery_address=data["delivery_address"]
-        )
-        order.id = data["id"]
-        order.status = OrderStatus(data["status"])
-        order.created_at = data["created_at"]
-        order.updated_at = data["updated_at"]
-        order.estimated_delivery_time = data["estimated_delivery_time"]
-        order.delivery_agent_id = data["delivery_agent_id"]
-        order.total_amount = data["total_amount"]
-        return order
-    @classmethod
-    def from_dict(cls, data):
-        order = cls(
-            customer_id=data["customer_id"],
-            items=data["items"],
-            order_type=OrderType(data["order_type"]),
-            delivery_address=data["delivery_address"]
-        )
+        # Skip __init__: it would generate an id and timestamps and decode the items
+        order = cls.__new__(cls)
         order.id = data["id"]
+        order.customer_id = data["customer_id"]
+        order.items = data["items"]
+        order.order_type = OrderType(data["order_type"])
+        order.delivery_address = data["delivery_address"]
         order.status = OrderStatus(data["status"])
         order.created_at = data["created_at"]
         order.updated_at = data["updated_at"]
         order.estimated_delivery_time = data["estimated_delivery_time"]
         order.delivery_agent_id = data["delivery_agent_id"]
         order.total_amount = data["total_amount"]
+        order.menu_version = data.get("menu_version")
+        order.restaurant_id = restaurant_of(data)
         return order
 
 # Order management
 class OrderManager:
-    def __init__(self):
-        self.data_store = DataStore()
-        self.menu_manager = MenuManager()
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID, max_concurrent_orders=ORDER_INTAKE_CONCURRENCY,
+                 max_queued_orders=ORDER_INTAKE_QUEUE_DEPTH, max_order_wait=ORDER_INTAKE_MAX_WAIT,
+                 kitchen_stations=KITCHEN_STATIONS):
+        self.restaurant_id = restaurant_id
+        self.data_store = DataStore(restaurant_id)
+        self.menu_manager = MenuManager(restaurant_id)
+        self.eta_scheduler = ETAScheduler()
+        # Streaming percentiles of time spent between status transitions
+        self.metrics = DeliveryMetrics()
+        # Orders already hydrated from the current read snapshot, keyed by id
+        self._identity_map = {}
+        self._identity_snapshot = None
+        # Bounded queue in front of create_order so a rush is turned away fast instead of timing out
+        self.intake = AdmissionController(max_concurrent_orders, max_queued_orders, max_order_wait)
+        # Confirmed orders waiting for a kitchen station, prepared least-slack first
+        self.kitchen = KitchenScheduler(kitchen_stations)
+    
+    def _hydrate(self, order_data):
+        """Return the Order for a cached row, building it at most once per read snapshot"""
+        if self._identity_snapshot != self.data_store.snapshot_id:
+            self._identity_map = {}
+            self._identity_snapshot = self.data_store.snapshot_id
+        
+        order = self._identity_map.get(order_data["id"])
+        if order is None:
+            order = self._identity_map[order_data["id"]] = Order.from_dict(order_data)
+        return order
+    
+    def _record_transition(self, order_data, previous_status, previous_update, new_status):
+        """Feed the time an order spent in its previous status into the delivery metrics"""
+        if previous_status == new_status.value:
+            return
+        
+        try:
+            started = datetime.fromisoformat(previous_update)
+        except (TypeError, ValueError):
+            return
+        
+        now = datetime.now()
+        self.metrics.record_transition(
+            previous_status, new_status.value, (now - started).total_seconds(),
+            order_data.get("delivery_agent_id"), now
+        )
+    
+    @staticmethod
+    def _move_agent_to_address(agent_data, order_data):
+        """A delivered order leaves its agent at the delivery address"""
+        agent_data["latitude"], agent_data["longitude"] = geocode(order_data.get("delivery_address"))
+    
+    def start_eta_tracking(self, on_overdue=None):
+        """Load active orders into the ETA scheduler and start watching for overdue orders"""
+        if on_overdue:
+            self.eta_scheduler.add_callback(on_overdue)
+        
+        for order_id, order_data in self.data_store.get_orders().items():
+            status = OrderStatus(order_data["status"])
+            if status not in FINAL_STATUSES:
+                self.eta_scheduler.track(order_id, order_data["estimated_delivery_time"])
+            if status in (OrderStatus.CONFIRMED, OrderStatus.PREPARING) and self._owns(order_data):
+                self._enqueue_in_kitchen(order_data)
+                if status == OrderStatus.PREPARING:
+                    self.kitchen.start(order_id)
+        
+        self.eta_scheduler.start()
+    
+    def stop_eta_tracking(self):
+        self.eta_scheduler.stop()
+    
+    def _prep_minutes(self, items):
+        """Kitchen time for order items, from their menu categories"""
+        if isinstance(items, str):
+            items = json.loads(items)
+        menu_items = self.data_store.get_menu_snapshot().items
+        categories = {item["item_id"]: menu_items[item["item_id"]]["category"]
+                      for item in items if item["item_id"] in menu_items}
+        return order_prep_minutes(items, categories)
+    
+    @staticmethod
+    def _travel_minutes(order_data):
+        """Minutes from the kitchen pass to the customer"""
+        if order_data["order_type"] != OrderType.DELIVERY.value:
+            return 0
+        distance = distance_km(RESTAURANT_LOCATION, geocode(order_data.get("delivery_address")))
+        return distance / DELIVERY_SPEED_KMH * 60 + HANDOVER_MINUTES
+    
+    def _enqueue_in_kitchen(self, order_data):
+        # The kitchen must be done by the promised delivery time minus the trip
+        try:
+            promised = float(order_data["estimated_delivery_time"])
+        except (ValueError, TypeError):
+            promised = datetime.now().timestamp()
+        due = promised - self._travel_minutes(order_data) * 60
+        self.kitchen.enqueue(order_data["id"], self._prep_minutes(order_data["items"]), due)
+    
+    def _kitchen_eta_feedback(self, orders, skip=()):
+        """Write the kitchen's queue-based ready times into the ETAs of orders in the kitchen.
+        
+        Returns the ids of orders (besides those in skip) whose ETA moved by at
+        least ETA_FEEDBACK_SECONDS, so the caller can save them with its own change.
+        """
+        changed = []
+        for order_id, ready in self.kitchen.estimate_ready_times().items():
+            order_data = orders.get(order_id)
+            if order_data is None:
+                continue
+            eta = ready + self._travel_minutes(order_data) * 60
+            try:
+                moved = abs(float(order_data["estimated_delivery_time"]) - eta)
+            except (ValueError, TypeError):
+                moved = ETA_FEEDBACK_SECONDS
+            if order_id in skip or moved >= ETA_FEEDBACK_SECONDS:
+                order_data["estimated_delivery_time"] = eta
+                self.eta_scheduler.track(order_id, eta)
+                if order_id not in skip:
+                    changed.append(order_id)
+        return changed
+    
+    def _update_eta(self, order_data, new_status):
+        """Recompute an order's ETA after a status change and keep the scheduler in sync"""
+        if new_status in FINAL_STATUSES:
+            self.kitchen.complete(order_data["id"])
+            self.eta_scheduler.untrack(order_data["id"])
+            return
+        
+        # Confirmed and preparing orders get their ETA from the kitchen queue
+        if new_status == OrderStatus.CONFIRMED:
+            self._enqueue_in_kitchen(order_data)
+        elif new_status == OrderStatus.PREPARING:
+            if order_data["id"] not in self.kitchen:
+                self._enqueue_in_kitchen(order_data)
+            self.kitchen.start(order_data["id"])
+        else:
+            self.kitchen.complete(order_data["id"])
+        if order_data["id"] in self.kitchen:
+            return
+        
+        window = ETA_WINDOW_MINUTES.get(new_status)
+        if window:
+            now = datetime.now().timestamp()
+            min_minutes, max_minutes = window[OrderType(order_data["order_type"])]
+            try:
+                eta = float(order_data["estimated_delivery_time"])
+            except (ValueError, TypeError):
+                eta = now
+            eta = min(max(eta, now + min_minutes * 60), now + max_minutes * 60)
+            order_data["estimated_delivery_time"] = eta
+        
+        self.eta_scheduler.track(order_data["id"], order_data["estimated_delivery_time"])
     
     def create_order(self, customer_id, items, order_type, delivery_address=None):
-        # Validate order items
-        menu_items = self.data_store.get_menu_items()
+        try:
+            with self.intake.admit():
+                return self._create_order(customer_id, items, order_type, delivery_address)
+        except AdmissionRejected as e:
+            return False, f"The restaurant is busy, please try again in {e.retry_after} seconds"
+    
+    def get_intake_stats(self):
+        """Queue depth, rejections and wait times of the order intake, for capacity tuning"""
+        return self.intake.stats()
+    
+    def _create_order(self, customer_id, items, order_type, delivery_address=None):
+        # Validate and price every item against a single menu version
+        menu = self.data_store.get_menu_snapshot()
+        menu_items = menu.items
         valid_items = []
         total_amount = 0
         
         for item in items:
-            if item["item_id"] in menu_items:
+            if item["item_id"] in menu_items and restaurant_of(menu_items[item["item_id"]]) == self.restaurant_id:
                 menu_item = menu_items[item["item_id"]]
                 valid_items.append({
                     "item_id": item["item_id"],
@@ -509,40 +1236,39 @@ class OrderManager:
                 return False, "Item not found in menu"
         
         # Create the order
-        new_order = Order(customer_id, valid_items, order_type, delivery_address)
+        new_order = Order(customer_id, valid_items, order_type, delivery_address, self.restaurant_id)
         new_order.total_amount = total_amount
+        new_order.menu_version = menu.version
         
-        # Set estimated delivery time (random for demonstration)
-        prep_time = random.randint(10, 30)
-        delivery_time = 0
-        if order_type == OrderType.DELIVERY:
-            delivery_time = random.randint(15, 45)
-        total_time = prep_time + delivery_time
-        
-        current_time = datetime.now()
-        eta = current_time.timestamp() + (total_time * 60)  # Convert minutes to seconds
+        # Estimate delivery from the kitchen's current queue plus the trip to the customer
+        order_data = new_order.to_dict()
+        kitchen_wait = self.kitchen.estimate_wait(order_prep_minutes(
+            valid_items, {item["item_id"]: menu_items[item["item_id"]]["category"] for item in valid_items}))
+        eta = datetime.now().timestamp() + kitchen_wait + self._travel_minutes(order_data) * 60
         new_order.estimated_delivery_time = eta
         
-        # Save order
-        orders = self.data_store.get_orders()
-        orders[new_order.id] = new_order.to_dict()
-        self.data_store.save_data()
+        # Save order; the row joins the cache under the store's lock
+        if not self.data_store.save_rows(orders=[new_order.to_dict()]):
+            return False, STALE_WRITE_MESSAGE
+        self.eta_scheduler.track(new_order.id, eta)
         
         return True, new_order
     
+    def _owns(self, order_data):
+        return restaurant_of(order_data) == self.restaurant_id
+    
     def get_order(self, order_id):
         orders = self.data_store.get_orders()
-        if order_id not in orders:
+        if order_id not in orders or not self._owns(orders[order_id]):
             return None
-        return Order.from_dict(orders[order_id])
+        return self._hydrate(orders[order_id])
     
     def get_customer_orders(self, customer_id):
-        orders = self.data_store.get_orders()
         customer_orders = []
         
-        for order_data in orders.values():
+        for order_data in self.data_store.get_partition("orders", self.restaurant_id):
             if order_data["customer_id"] == customer_id:
-                customer_orders.append(Order.from_dict(order_data))
+                customer_orders.append(self._hydrate(order_data))
         
         return customer_orders
     
@@ -550,107 +1276,254 @@ class OrderManager:
         """Update the status of an order and handle agent assignments"""
         orders = self.data_store.get_orders()
         
-        if order_id not in orders:
+        if order_id not in orders or not self._owns(orders[order_id]):
             return False, "Order not found"
         
+        previous_status = orders[order_id]["status"]
+        previous_update = orders[order_id]["updated_at"]
+        
         # Update order status - save the enum value
         orders[order_id]["status"] = new_status.value
         orders[order_id]["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._update_eta(orders[order_id], new_status)
+        # Other orders in the kitchen queue may have moved up or back
+        rescheduled = self._kitchen_eta_feedback(orders, skip={order_id})
+        
+        changed_agents = []
         
         # If a delivery agent is specified, update the delivery agent info
         if delivery_agent_id:
             orders[order_id]["delivery_agent_id"] = delivery_agent_id
             
-            # Update delivery agent status
-            delivery_agents = self.data_store.get_delivery_agents()
-            if delivery_agent_id in delivery_agents:
-                delivery_agents[delivery_agent_id]["status"] = "busy"
-                delivery_agents[delivery_agent_id]["current_order"] = order_id
+            # Update delivery agent status (use the cache loaded above so the status change is kept)
+            delivery_agents = self.data_store.data["delivery_agents"]
+            if delivery_agent_id in delivery_agents and \
+                    restaurant_of(delivery_agents[delivery_agent_id]) == self.restaurant_id:
+                route = agent_route(delivery_agents[delivery_agent_id])
+                if order_id not in route:
+                    set_agent_route(delivery_agents[delivery_agent_id], route + [order_id])
+                changed_agents.append(delivery_agent_id)
         
-        # If delivered/picked up/cancelled, release the delivery agent
-        if new_status in [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]:
+        # If delivered/picked up/cancelled, take the order off the agent's route
+        if new_status in FINAL_STATUSES:
             agent_id = orders[order_id].get("delivery_agent_id")
             if agent_id:
-                delivery_agents = self.data_store.get_delivery_agents()
+                delivery_agents = self.data_store.data["delivery_agents"]
                 if agent_id in delivery_agents:
-                    delivery_agents[agent_id]["status"] = "available"
-                    delivery_agents[agent_id]["current_order"] = None
+                    finish_drop(delivery_agents[agent_id], order_id)
+                    if new_status == OrderStatus.DELIVERED:
+                        self._move_agent_to_address(delivery_agents[agent_id], orders[order_id])
+                    changed_agents.append(agent_id)
         
         # Save changes
-        self.data_store.save_data()
+        if not self.data_store.save_rows(orders=[order_id] + rescheduled, delivery_agents=changed_agents):
+            return False, STALE_WRITE_MESSAGE
+        self._record_transition(orders[order_id], previous_status, previous_update, new_status)
         
         return True, "Order status updated successfully"
         
+    def bulk_update_order_status(self, order_ids, new_status):
+        """Move several orders to a new status in one pass and return (order_id, success, message) per order"""
+        # Reload once for the whole batch
+        orders = self.data_store.get_orders()
+        delivery_agents = self.data_store.data["delivery_agents"]
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        outcomes = []
+        changed_orders = []
+        changed_agents = []
+        transitions = []
+        
+        for order_id in order_ids:
+            if order_id not in orders or not self._owns(orders[order_id]):
+                outcomes.append((order_id, False, "Order not found"))
+                continue
+            
+            order_data = orders[order_id]
+            current_status = OrderStatus(order_data["status"])
+            order_type = OrderType(order_data["order_type"])
+            
+            if new_status not in ALLOWED_STATUS_TRANSITIONS[current_status]:
+                outcomes.append((order_id, False, f"Cannot change status from {current_status.value} to {new_status.value}"))
+                continue
+            if (new_status in DELIVERY_ONLY_STATUSES and order_type != OrderType.DELIVERY) or \
+                    (new_status in TAKEAWAY_ONLY_STATUSES and order_type != OrderType.TAKEAWAY):
+                outcomes.append((order_id, False, f"Status {new_status.value} does not apply to {order_type.value} orders"))
+                continue
+            
+            transitions.append((order_data, order_data["status"], order_data["updated_at"]))
+            order_data["status"] = new_status.value
+            order_data["updated_at"] = now
+            self._update_eta(order_data, new_status)
+            changed_orders.append(order_id)
+            
+            # Take the order off its agent's route in the same pass
+            agent_id = order_data.get("delivery_agent_id")
+            if new_status in FINAL_STATUSES and agent_id in delivery_agents:
+                finish_drop(delivery_agents[agent_id], order_id)
+                if new_status == OrderStatus.DELIVERED:
+                    self._move_agent_to_address(delivery_agents[agent_id], order_data)
+                changed_agents.append(agent_id)
+            
+            outcomes.append((order_id, True, "Order status updated successfully"))
+        
+        if changed_orders:
+            changed_orders += self._kitchen_eta_feedback(orders, skip=set(changed_orders))
+        
+        # Write all affected rows in a single transaction
+        if changed_orders and not self.data_store.save_rows(changed_orders, changed_agents):
+            return [(order_id, False, STALE_WRITE_MESSAGE) if success else (order_id, success, message)
+                    for order_id, success, message in outcomes]
+        
+        for order_data, previous_status, previous_update in transitions:
+            self._record_transition(order_data, previous_status, previous_update, new_status)
+        
+        return outcomes
+    
+    def start_next_preparation(self):
+        """Move the confirmed order the kitchen should cook next to PREPARING"""
+        self.data_store.refresh()
+        queued = self.kitchen.queued()
+        if not queued:
+            return False, "No confirmed orders are waiting for the kitchen"
+        if len(self.kitchen.cooking()) >= self.kitchen.stations:
+            return False, "All kitchen stations are busy"
+        
+        success, message = self.update_order_status(queued[0], OrderStatus.PREPARING)
+        return success, queued[0] if success else message
+    
     def get_all_orders(self):
-        return [Order.from_dict(order) for order in self.data_store.get_orders().values()]
+        return [self._hydrate(order) for order in self.data_store.get_partition("orders", self.restaurant_id)]
             
         # Make sure the get_time_remaining method is properly indented as part of OrderManager
   
         
     def get_time_remaining(self, order_id):
-        order = self.get_order(order_id)
+        # Reuse the order if a listing already hydrated it from the current snapshot
+        order = None
+        if self._identity_snapshot == self.data_store.snapshot_id:
+            order = self._identity_map.get(order_id)
+        if order is None:
+            order = self.get_order(order_id)
         if not order:
             return None
         
-        current_time = datetime.now().timestamp()
-        
-        # Convert estimated_delivery_time to float if it's a string
-        if isinstance(order.estimated_delivery_time, str):
-            try:
-                estimated_delivery_time = float(order.estimated_delivery_time)
-            except (ValueError, TypeError):
-                # Handle the case where conversion fails
-                return 0
-        else:
-            estimated_delivery_time = order.estimated_delivery_time
+        return minutes_until(order.estimated_delivery_time, datetime.now().timestamp())
+    
+    def get_times_remaining(self, orders):
+        """Return {order_id: minutes left} for a list of orders without reloading the database"""
+        now = datetime.now().timestamp()
+        remaining = self.eta_scheduler.remaining_minutes([order.id for order in orders], now)
         
-        remaining_seconds = max(0, estimated_delivery_time - current_time)
-        remaining_minutes = int(remaining_seconds / 60)
+        # Fall back to the ETA on the order itself if the scheduler is not tracking it
+        for order in orders:
+            if remaining[order.id] is None:
+                remaining[order.id] = minutes_until(order.estimated_delivery_time, now)
         
-        return remaining_minutes
+        return remaining
 # Delivery management
 class DeliveryManager:
-    def __init__(self):
-        self.data_store = DataStore()
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID):
+        self.restaurant_id = restaurant_id
+        self.data_store = DataStore(restaurant_id)
     
     def get_available_agents(self):
-        delivery_agents = self.data_store.get_delivery_agents()
-        return [agent for agent in delivery_agents.values() if agent["status"] == "available"]
+        return [agent for agent in self.data_store.get_partition("delivery_agents", self.restaurant_id)
+                if agent["status"] == "available"]
     
     def assign_delivery_agent(self, order_id):
-        available_agents = self.get_available_agents()
-        orders = self.data_store.get_orders()
-        
-        if order_id not in orders:
-            return False, "Order not found"
-        
-        if not available_agents:
-            return False, "No delivery agents available"
-        
-        # Choose a random agent for simplicity
-        agent = random.choice(available_agents)
-        orders[order_id]["delivery_agent_id"] = agent["id"]
+        # Other threads' writes update the agent index, so pick and claim an agent in one go
+        with self.data_store._db_lock:
+            orders = self.data_store.get_orders()
+            
+            if order_id not in orders or restaurant_of(orders[order_id]) != self.restaurant_id:
+                return False, "Order not found"
+            
+            # Only this restaurant's available agents are indexed; the cache was refreshed above
+            delivery_agents = self.data_store.data["delivery_agents"]
+            agent_index = self.data_store.get_agent_index(self.restaurant_id)
+            
+            if not len(agent_index):
+                return False, "No delivery agents available"
+            
+            # Choose the free agent closest to the delivery address
+            agent_id, _ = agent_index.nearest(geocode(orders[order_id].get("delivery_address")))
+            orders[order_id]["delivery_agent_id"] = agent_id
+            
+            # Update agent status; saving it takes the agent out of the index
+            set_agent_route(delivery_agents[agent_id], [order_id])
+            
+            if not self.data_store.save_rows(orders=[order_id], delivery_agents=[agent_id]):
+                return False, STALE_WRITE_MESSAGE
+            return True, agent_id
+    
+    def dispatch_ready_orders(self, max_batch=MAX_BATCH_SIZE, radius_km=BATCH_RADIUS_KM):
+        """Batch READY delivery orders without an agent onto free agents.
         
-        # Update agent status
+        The oldest waiting order seeds each batch and its nearest neighbours
+        within radius_km join it, up to max_batch drops. The batch goes to the
+        free agent closest to the seed, with the drops ordered by plan_route.
+        Returns (success, [(agent_id, route)]).
+        """
+        # Other threads' writes update the agent index, so pick and claim agents in one go
+        with self.data_store._db_lock:
+            orders = self.data_store.get_orders()
+            delivery_agents = self.data_store.data["delivery_agents"]
+            agent_index = self.data_store.get_agent_index(self.restaurant_id)
+            
+            waiting = {}
+            for order_data in self.data_store.get_partition("orders", self.restaurant_id):
+                if order_data["status"] == OrderStatus.READY.value and not order_data.get("delivery_agent_id") and \
+                        order_data["order_type"] == OrderType.DELIVERY.value:
+                    waiting[order_data["id"]] = geocode(order_data.get("delivery_address"))
+            
+            dispatched = []
+            for seed in sorted(waiting, key=lambda order_id: (orders[order_id]["created_at"], order_id)):
+                if seed not in waiting:
+                    continue
+                if not len(agent_index):
+                    break
+                
+                batch = pick_batch(seed, waiting, max_batch, radius_km)
+                agent_id, _ = agent_index.nearest(waiting[seed])
+                route = plan_route(RESTAURANT_LOCATION, {order_id: waiting.pop(order_id) for order_id in batch})
+                
+                for order_id in route:
+                    orders[order_id]["delivery_agent_id"] = agent_id
+                set_agent_route(delivery_agents[agent_id], route)
+                # The agent is busy now, so the next batch can't pick it; a failed save reloads the index
+                self.data_store._index_agent(delivery_agents[agent_id])
+                dispatched.append((agent_id, route))
+            
+            if dispatched and not self.data_store.save_rows(
+                    orders=[order_id for _, route in dispatched for order_id in route],
+                    delivery_agents=[agent_id for agent_id, _ in dispatched]):
+                return False, STALE_WRITE_MESSAGE
+            return True, dispatched
+    
+    def update_agent_location(self, agent_id, latitude, longitude):
         delivery_agents = self.data_store.get_delivery_agents()
-        delivery_agents[agent["id"]]["status"] = "busy"
-        delivery_agents[agent["id"]]["current_order"] = order_id
+        if agent_id not in delivery_agents or restaurant_of(delivery_agents[agent_id]) != self.restaurant_id:
+            return False, "Agent not found"
         
-        self.data_store.save_data()
-        return True, agent["id"]
+        delivery_agents[agent_id]["latitude"] = latitude
+        delivery_agents[agent_id]["longitude"] = longitude
+        if not self.data_store.save_rows(delivery_agents=[agent_id]):
+            return False, STALE_WRITE_MESSAGE
+        return True, "Agent location updated"
     
     def get_agent_orders(self, agent_id):
         """Get all orders assigned to a specific delivery agent"""
         # Make sure to refresh data from database
-        self.data_store.data = self.data_store._load_data()
+        self.data_store.refresh()
         
         # Print the agent ID for debugging
         print(f"Looking for orders for agent ID: {agent_id}")
         
-        orders = self.data_store.get_orders()
         agent_orders = []
         
-        for order_id, order_data in orders.items():
+        for order_data in self.data_store.get_partition("orders", self.restaurant_id):
+            order_id = order_data["id"]
             # Debug the order's delivery_agent_id
             delivery_agent_id = order_data.get("delivery_agent_id")
             print(f"Order {order_id} has agent: {delivery_agent_id}")
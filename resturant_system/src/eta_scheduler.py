@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+def minutes_until(eta, now=None):
+    """Return the whole minutes left until an ETA timestamp (0 if passed or unreadable)"""
+    if now is None:
+        now = time.time()
+
+    # ETAs loaded from SQLite may come back as strings
+    if isinstance(eta, str):
+        try:
+            eta = float(eta)
+        except (ValueError, TypeError):
+            return 0
+
+    remaining_seconds = max(0, eta - now)
+    return int(remaining_seconds / 60)
+
+
+# Scheduler that watches order ETAs
+class ETAScheduler:
+    """Keeps active orders in a min-heap keyed by ETA and fires callbacks when they go overdue.
+
+    Replaced or removed entries are left in the heap and skipped when popped,
+    so tracking and untracking an order are both O(log n).
+    """
+
+    def __init__(self, on_overdue=None, clock=time.time):
+        self._clock = clock
+        self._heap = []  # (eta, sequence, order_id)
+        self._etas = {}  # order_id -> current eta
+        self._overdue = set()
+        self._callbacks = [on_overdue] if on_overdue else []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def add_callback(self, callback):
+        """Register a callback(order_id, eta) to run when an order goes overdue"""
+        with self._condition:
+            self._callbacks.append(callback)
+
+    def track(self, order_id, eta):
+        """Start tracking an order, or move it to a new ETA"""
+        if isinstance(eta, str):
+            eta = float(eta)
+
+        with self._condition:
+            self._etas[order_id] = eta
+            self._overdue.discard(order_id)
+            heapq.heappush(self._heap, (eta, next(self._sequence), order_id))
+            # Wake the worker in case this ETA is now the earliest
+            self._condition.notify()
+
+    def untrack(self, order_id):
+        """Stop tracking an order (e.g. once it is delivered or cancelled)"""
+        with self._condition:
+            self._etas.pop(order_id, None)
+            self._overdue.discard(order_id)
+
+    def is_tracked(self, order_id):
+        return order_id in self._etas
+
+    def get_eta(self, order_id):
+        return self._etas.get(order_id)
+
+    def is_overdue(self, order_id):
+        return order_id in self._overdue
+
+    def get_overdue(self):
+        """Return the ids of tracked orders that are past their ETA"""
+        with self._condition:
+            return set(self._overdue)
+
+    def remaining_minutes(self, order_ids, now=None):
+        """Return {order_id: minutes left} for the given orders without touching the database.
+
+        Orders that are not tracked map to None.
+        """
+        if now is None:
+            now = self._clock()
+
+        etas = self._etas
+        return {
+            order_id: minutes_until(etas[order_id], now) if order_id in etas else None
+            for order_id in order_ids
+        }
+
+    def fire_overdue(self, now=None):
+        """Fire callbacks for every order whose ETA has passed and return their ids"""
+        if now is None:
+            now = self._clock()
+
+        fired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                eta, _, order_id = heapq.heappop(self._heap)
+                # Skip entries that were untracked or moved to another ETA
+                if self._etas.get(order_id) != eta:
+                    continue
+                self._overdue.add(order_id)
+                fired.append((order_id, eta))
+            callbacks = list(self._callbacks)
+
+        # Run callbacks outside the lock so they may call back into the scheduler
+        for order_id, eta in fired:
+            for callback in callbacks:
+                try:
+                    callback(order_id, eta)
+                except Exception as e:
+                    print(f"Error in overdue callback for order {order_id}: {e}")
+
+        return [order_id for order_id, _ in fired]
+
+    def start(self):
+        """Start the background thread that fires overdue callbacks"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="eta-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+
+                # Sleep until the earliest ETA, or until something new is tracked
+                timeout = None
+                if self._heap:
+                    timeout = max(0, self._heap[0][0] - self._clock())
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+            self.fire_overdue()
@@ -0,0 +1,231 @@
+import argparse
+import calendar
+import csv
+import gzip
+import json
+import math
+import os
+import struct
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    from .classes import DataStore
+except ImportError:
+    from classes import DataStore
+
+# Columns exported for orders and their line items: (name, NumPy dtype).
+# Strings are fixed-width byte strings; longer values are truncated in the binary files only.
+ORDER_COLUMNS = [
+    ("id", "|S36"),
+    ("restaurant_id", "|S32"),
+    ("customer_id", "|S36"),
+    ("order_type", "|S8"),
+    ("status", "|S16"),
+    ("created_at", "<M8[s]"),
+    ("updated_at", "<M8[s]"),
+    ("estimated_delivery_time", "<f8"),
+    ("delivery_agent_id", "|S36"),
+    ("total_amount", "<f8"),
+    ("item_count", "<i4"),
+    ("menu_version", "<i8")
+]
+
+ITEM_COLUMNS = [
+    ("order_id", "|S36"),
+    ("item_id", "|S36"),
+    ("name", "|S64"),
+    ("price", "<f8"),
+    ("quantity", "<i4")
+]
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# NumPy's "not a time" value for datetime64 columns
+NAT = -2 ** 63
+
+
+@lru_cache(maxsize=4096)
+def _to_epoch(timestamp):
+    # Orders placed in the same second share a timestamp, so parsing is cached.
+    # Naive timestamps are read as UTC, so NumPy shows the wall-clock time stored whatever the host's zone
+    try:
+        return calendar.timegm(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timetuple())
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def order_records(rows):
+    """Turn order rows into (order record, [line item records]) with the export columns"""
+    for row in rows:
+        try:
+            items = json.loads(row["items"]) if row["items"] else []
+        except ValueError:
+            items = []
+
+        order = {
+            "id": row["id"],
+            "restaurant_id": row["restaurant_id"],
+            "customer_id": row["customer_id"],
+            "order_type": row["order_type"],
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "estimated_delivery_time": _to_float(row["estimated_delivery_time"]),
+            "delivery_agent_id": row["delivery_agent_id"],
+            "total_amount": _to_float(row["total_amount"]),
+            "item_count": sum(item.get("quantity", 0) for item in items),
+            "menu_version": row["menu_version"]
+        }
+        line_items = [{
+            "order_id": row["id"],
+            "item_id": item.get("item_id"),
+            "name": item.get("name"),
+            "price": _to_float(item.get("price")),
+            "quantity": item.get("quantity", 0)
+        } for item in items]
+        yield order, line_items
+
+
+# Gzipped CSV table
+class CsvGzWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = [name for name, _ in columns]
+        self._file = gzip.open(path, "wt", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+        self.rows = 0
+
+    def write(self, records):
+        for record in records:
+            self._writer.writerow(["" if record[name] is None else record[name] for name in self.columns])
+        self.rows += len(records)
+
+    def close(self):
+        self._file.close()
+
+
+# One .npy file per column
+class NpyColumnWriter:
+    """Streams each column to its own .npy file (readable with numpy.load) without NumPy.
+
+    The header is written with room for any row count and rewritten with the
+    real shape on close, so rows never need to be held in memory.
+    """
+
+    # Room in the header for the shape, whatever the final row count
+    SHAPE_WIDTH = 24
+
+    def __init__(self, directory, columns):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.columns = columns
+        self.rows = 0
+        self._files = {}
+        for name, dtype in columns:
+            column_file = open(os.path.join(directory, f"{name}.npy"), "wb")
+            column_file.write(self._header(dtype, 0))
+            self._files[name] = column_file
+
+    @classmethod
+    def _header(cls, dtype, rows):
+        shape = f"({rows},)".ljust(cls.SHAPE_WIDTH)
+        header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': {shape}, }}"
+        # Magic, version 1.0, header length, then the header padded so the data starts 64-byte aligned
+        prefix_length = 10
+        total = prefix_length + len(header) + 1
+        header += " " * (-total % 64) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+    @staticmethod
+    def _pack(dtype, values):
+        if dtype.startswith("|S"):
+            width = int(dtype[2:])
+            return b"".join((value or "").encode("utf-8")[:width].ljust(width, b"\0") for value in values)
+        if dtype == "<f8":
+            return struct.pack(f"<{len(values)}d", *(math.nan if value is None else value for value in values))
+        if dtype == "<M8[s]":
+            epochs = (_to_epoch(value) for value in values)
+            return struct.pack(f"<{len(values)}q", *(NAT if value is None else value for value in epochs))
+        if dtype == "<i8":
+            return struct.pack(f"<{len(values)}q", *(-1 if value is None else value for value in values))
+        if dtype == "<i4":
+            return struct.pack(f"<{len(values)}i", *(-1 if value is None else value for value in values))
+        raise ValueError(f"Unsupported dtype: {dtype}")
+
+    def write(self, records):
+        for name, dtype in self.columns:
+            self._files[name].write(self._pack(dtype, [record[name] for record in records]))
+        self.rows += len(records)
+
+    def close(self):
+        for name, dtype in self.columns:
+            column_file = self._files[name]
+            column_file.seek(0)
+            column_file.write(self._header(dtype, self.rows))
+            column_file.close()
+
+
+def export_orders(output_dir, created_from=None, created_to=None, formats=("csv", "npy"),
+                  chunk_size=1000, restaurant_id=None, data_store=None):
+    """Stream orders and their line items into output_dir and return (orders, line items) written.
+
+    Writes orders.csv.gz / order_items.csv.gz and orders/*.npy / order_items/*.npy
+    depending on formats. Only one chunk of orders is in memory at a time.
+    """
+    # With sharding on, a restaurant's orders live in its own database
+    data_store = data_store or DataStore(restaurant_id)
+    os.makedirs(output_dir, exist_ok=True)
+
+    writers = []
+    if "csv" in formats:
+        writers.append((CsvGzWriter(os.path.join(output_dir, "orders.csv.gz"), ORDER_COLUMNS),
+                        CsvGzWriter(os.path.join(output_dir, "order_items.csv.gz"), ITEM_COLUMNS)))
+    if "npy" in formats:
+        writers.append((NpyColumnWriter(os.path.join(output_dir, "orders"), ORDER_COLUMNS),
+                        NpyColumnWriter(os.path.join(output_dir, "order_items"), ITEM_COLUMNS)))
+
+    order_count = 0
+    item_count = 0
+    try:
+        for rows in data_store.iter_order_rows(created_from, created_to, chunk_size, restaurant_id):
+            orders = []
+            line_items = []
+            for order, items in order_records(rows):
+                orders.append(order)
+                line_items.extend(items)
+
+            for order_writer, item_writer in writers:
+                order_writer.write(orders)
+                item_writer.write(line_items)
+            order_count += len(orders)
+            item_count += len(line_items)
+    finally:
+        for order_writer, item_writer in writers:
+            order_writer.close()
+            item_writer.close()
+
+    return order_count, item_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export order history for offline analytics")
+    parser.add_argument("output_dir")
+    parser.add_argument("--from", dest="created_from", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="created_to", help="day to stop before (YYYY-MM-DD)")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=["csv", "npy"], default=["csv", "npy"])
+    parser.add_argument("--restaurant", help="only export one restaurant's orders")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    orders_written, items_written = export_orders(args.output_dir, args.created_from, args.created_to,
+                                                  args.formats, args.chunk_size, args.restaurant)
+    print(f"Exported {orders_written} orders and {items_written} line items to {args.output_dir}")
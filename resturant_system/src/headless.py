@@ -0,0 +1,189 @@
+import argparse
+import io
+import json
+import re
+import sys
+import time
+from collections import deque
+from contextlib import redirect_stdout
+
+try:
+    from .app import FoodDeliveryApp
+    from .classes import Order, DEFAULT_RESTAURANT_ID
+    from .metrics import QuantileSketch
+except ImportError:
+    from app import FoodDeliveryApp
+    from classes import Order, DEFAULT_RESTAURANT_ID
+    from metrics import QuantileSketch
+
+# Placeholders scripts can use in inputs: {item:<menu item name>} and {order:<n>}
+# (n-th order placed by the script, -1 for the latest)
+PLACEHOLDER = re.compile(r"\{(item|order):([^}]*)\}")
+ORDER_ID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class ScriptError(Exception):
+    """Raised when a scripted action cannot be run as written"""
+
+
+# Answers prompts from a script instead of the keyboard
+class ScriptedInput:
+    def __init__(self):
+        self.answers = deque()
+
+    def __call__(self, prompt=""):
+        if "Press Enter" in prompt:
+            return ""
+        if not self.answers:
+            raise ScriptError(f"Ran out of inputs at prompt {prompt.strip()!r}")
+        return self.answers.popleft()
+
+
+def load_actions(path):
+    """Read actions from a JSON lines file ('-' for stdin); blank lines and # comments are skipped"""
+    source = sys.stdin if path == "-" else open(path)
+    try:
+        for line_number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ScriptError(f"Line {line_number}: {e}")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+# Runs scripted actions against FoodDeliveryApp
+class HeadlessSession:
+    """Drives FoodDeliveryApp through its own screens with scripted answers.
+
+    Each action is {"action": <name from FoodDeliveryApp.ACTIONS>, "inputs": [...]}
+    with an optional "t" (seconds since the session started) used to pace
+    replays. Order ids from a recording (its "order_id" entries) are mapped
+    to the orders created by the replay, so recorded sessions can run against
+    a fresh database.
+    """
+
+    def __init__(self, restaurant_id=DEFAULT_RESTAURANT_ID, app=None, quiet=True):
+        self.input = ScriptedInput()
+        self.app = app or FoodDeliveryApp(restaurant_id, input_func=self.input)
+        self.app._read_input = self.input
+        self.quiet = quiet
+        self.placed_orders = []
+        # Order id in the script or recording -> order id created by this session
+        self.order_ids = {}
+        self.timings = {}
+        self.errors = {}
+
+    def _resolve(self, value):
+        value = str(value)
+
+        def placeholder(match):
+            kind, key = match.groups()
+            if kind == "item":
+                for item in self.app.menu_manager.get_all_items():
+                    if item.name == key:
+                        return item.id
+                raise ScriptError(f"No menu item named {key!r}")
+            try:
+                return self.placed_orders[int(key)]
+            except (ValueError, IndexError):
+                raise ScriptError(f"No placed order {key!r}")
+
+        value = PLACEHOLDER.sub(placeholder, value)
+        return ORDER_ID.sub(lambda match: self.order_ids.get(match.group(), match.group()), value)
+
+    def run_action(self, action):
+        """Run one action and return (success, elapsed seconds, error message or None)"""
+        name = action.get("action")
+        error = None
+        start = time.perf_counter()
+        try:
+            self.input.answers = deque(self._resolve(value) for value in action.get("inputs", []))
+            with redirect_stdout(io.StringIO() if self.quiet else sys.stdout):
+                result = self.app.perform(name)
+            if self.input.answers:
+                raise ScriptError(f"{len(self.input.answers)} inputs left unused")
+        except (ScriptError, ValueError, KeyError) as e:
+            error = str(e)
+            result = None
+        elapsed = time.perf_counter() - start
+
+        if isinstance(result, Order):
+            self.placed_orders.append(result.id)
+            if action.get("order_id"):
+                self.order_ids[action["order_id"]] = result.id
+
+        sketch = self.timings.get(name)
+        if sketch is None:
+            sketch = self.timings[name] = QuantileSketch(min_value=0.01, max_value=600000.0)
+        sketch.add(elapsed * 1000)
+        if error:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return error is None, elapsed, error
+
+    def run(self, actions, speed=None, on_error=None):
+        """Run actions in order and return the number run.
+
+        With a speed, actions that carry "t" are started no earlier than t / speed
+        seconds into the run (speed=10 replays a recording ten times faster);
+        otherwise they run back to back. An "exit" action ends the run.
+        """
+        self.app.order_manager.start_eta_tracking()
+        start = time.perf_counter()
+        count = 0
+        try:
+            for action in actions:
+                if speed and "t" in action:
+                    delay = action["t"] / speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                if action.get("action") == "exit":
+                    break
+
+                success, _, error = self.run_action(action)
+                count += 1
+                if not success and on_error:
+                    on_error(count, action, error)
+        finally:
+            self.app.order_manager.stop_eta_tracking()
+        self.elapsed = time.perf_counter() - start
+        return count
+
+    def report(self):
+        """Return {action: {"count", "errors", "mean_ms", "p50_ms", "p90_ms", "p99_ms"}}"""
+        report = {}
+        for name, sketch in sorted(self.timings.items()):
+            percentiles = sketch.percentiles()
+            report[name] = {
+                "count": sketch.count,
+                "errors": self.errors.get(name, 0),
+                "mean_ms": sketch.mean(),
+                "p50_ms": percentiles[50],
+                "p90_ms": percentiles[90],
+                "p99_ms": percentiles[99]
+            }
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run scripted or recorded sessions without the interactive menus")
+    parser.add_argument("script", help="JSON lines of actions ('-' for stdin), e.g. from app.py --record")
+    parser.add_argument("restaurant_id", nargs="?", default=DEFAULT_RESTAURANT_ID)
+    parser.add_argument("--speed", type=float, help="replay recorded timing this many times faster")
+    parser.add_argument("--verbose", action="store_true", help="show the screens as they run")
+    args = parser.parse_args()
+
+    session = HeadlessSession(args.restaurant_id, quiet=not args.verbose)
+    total = session.run(load_actions(args.script), args.speed,
+                        on_error=lambda n, action, error: print(f"Action {n} ({action.get('action')}): {error}",
+                                                               file=sys.stderr))
+
+    print(f"\n{total} actions in {session.elapsed:.2f}s ({total / session.elapsed if session.elapsed else 0:.1f}/s)")
+    print(f"{'action':<24} {'count':>6} {'errors':>6} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for name, stats in session.report().items():
+        print(f"{name:<24} {stats['count']:>6} {stats['errors']:>6} {stats['mean_ms']:>7.2f}ms "
+              f"{stats['p50_ms']:>7.2f}ms {stats['p90_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms")
@@ -0,0 +1,196 @@
+import heapq
+import math
+import threading
+import time
+
+# Minutes of kitchen work per menu category; extra units of an order add EXTRA_UNIT_MINUTES each
+PREP_MINUTES_BY_CATEGORY = {
+    "Pizza": 12,
+    "Burger": 8,
+    "Main": 15,
+    "Starter": 6,
+    "Dessert": 5
+}
+DEFAULT_PREP_MINUTES = 10
+EXTRA_UNIT_MINUTES = 1
+
+# Number of orders the kitchen can prepare at once
+DEFAULT_STATIONS = 3
+
+
+def order_prep_minutes(items, categories):
+    """Estimate the kitchen time for an order's items, given {item_id: category}.
+
+    Items are cooked side by side, so the slowest item sets the pace and every
+    further unit adds a little handling time.
+    """
+    if not items:
+        return 0
+
+    slowest = max(PREP_MINUTES_BY_CATEGORY.get(categories.get(item["item_id"]), DEFAULT_PREP_MINUTES)
+                  for item in items)
+    units = sum(item["quantity"] for item in items)
+    return slowest + EXTRA_UNIT_MINUTES * max(0, units - 1)
+
+
+# Capacity-aware kitchen queue
+class KitchenScheduler:
+    """Confirmed orders waiting for one of `stations` kitchen stations.
+
+    Orders are prepared least-slack first: the order that must start soonest to
+    be ready by its promised time (due - prep) goes next, with shorter prep
+    breaking ties. Ready-time estimates replay the queue against the stations'
+    free times, so they reflect the kitchen's actual load.
+    """
+
+    def __init__(self, stations=DEFAULT_STATIONS, clock=time.time):
+        self.stations = stations
+        self._clock = clock
+        self._queued = {}  # order_id -> (latest_start, prep_seconds, sequence, order_id)
+        self._cooking = {}  # order_id -> finish time
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._queued)
+
+    def __contains__(self, order_id):
+        return order_id in self._queued or order_id in self._cooking
+
+    def enqueue(self, order_id, prep_minutes, due):
+        """Queue a confirmed order that should be ready by `due` (a timestamp)"""
+        prep_seconds = prep_minutes * 60
+        with self._lock:
+            self._sequence += 1
+            self._queued[order_id] = (due - prep_seconds, prep_seconds, self._sequence, order_id)
+
+    def start(self, order_id=None, now=None):
+        """Start preparing an order and return its id.
+
+        Without an order_id the highest-priority queued order is started if a
+        station is free; otherwise None is returned. A named order is always
+        started, since the kitchen staff already decided to cook it.
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            if order_id is None:
+                if not self._queued or len(self._cooking) >= self.stations:
+                    return None
+                order_id = min(self._queued.values())[3]
+            entry = self._queued.pop(order_id, None)
+            if entry is None:
+                return None
+            self._cooking[order_id] = now + entry[1]
+            return order_id
+
+    def complete(self, order_id):
+        """Take an order out of the kitchen, whether it finished or was cancelled"""
+        with self._lock:
+            self._queued.pop(order_id, None)
+            self._cooking.pop(order_id, None)
+
+    def queued(self):
+        """Queued order ids in the order they will be prepared"""
+        with self._lock:
+            return [entry[3] for entry in sorted(self._queued.values())]
+
+    def cooking(self):
+        with self._lock:
+            return dict(self._cooking)
+
+    def _ready_times(self, now, queued):
+        ready = {order_id: max(now, finish) for order_id, finish in self._cooking.items()}
+        # Staff may start more orders than there are stations; the first finishers only bring the
+        # kitchen back to capacity, so stations open for the queue at the `stations` latest finish times
+        free_at = sorted(ready.values())[-self.stations:] if ready else []
+        free_at += [now] * (self.stations - len(free_at))
+        heapq.heapify(free_at)
+
+        for _, prep_seconds, _, order_id in sorted(queued):
+            start = heapq.heappop(free_at)
+            ready[order_id] = start + prep_seconds
+            heapq.heappush(free_at, ready[order_id])
+        return ready
+
+    def estimate_ready_times(self, now=None):
+        """Return {order_id: estimated ready timestamp} for every order in the kitchen"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            return self._ready_times(now, self._queued.values())
+
+    def estimate_wait(self, prep_minutes, due=None, now=None):
+        """Seconds until a new order with this prep time would be ready if it were queued now.
+
+        Without a due time the order is assumed to join the back of the queue.
+        """
+        now = self._clock() if now is None else now
+        prep_seconds = prep_minutes * 60
+        probe = object()
+        with self._lock:
+            latest_start = math.inf if due is None else due - prep_seconds
+            entry = (latest_start, prep_seconds, self._sequence + 1, probe)
+            return self._ready_times(now, list(self._queued.values()) + [entry])[probe] - now
+
+
+def simulate(orders, stations=DEFAULT_STATIONS, policy="priority", horizon=None):
+    """Replay (arrival, prep_minutes, due) orders through a kitchen and return throughput and on-time stats.
+
+    policy is "priority" (KitchenScheduler's least-slack order) or "fifo".
+    Times are in seconds; horizon limits the simulated time (default: until every order is done).
+    """
+    orders = sorted(orders)
+    kitchen = KitchenScheduler(stations, clock=lambda: 0)
+    dues = {}
+    finished = []  # (finish time, order index)
+    cooking = []  # heap of (finish time, order index)
+    now = 0.0
+    next_arrival = 0
+    fifo = []
+
+    while next_arrival < len(orders) or len(kitchen) or cooking or fifo:
+        # Advance to the next arrival or completion
+        upcoming = []
+        if next_arrival < len(orders):
+            upcoming.append(orders[next_arrival][0])
+        if cooking:
+            upcoming.append(cooking[0][0])
+        if upcoming:
+            now = max(now, min(upcoming))
+        if horizon is not None and now > horizon:
+            break
+
+        while cooking and cooking[0][0] <= now:
+            finish, index = heapq.heappop(cooking)
+            kitchen.complete(index)
+            finished.append((finish, index))
+
+        while next_arrival < len(orders) and orders[next_arrival][0] <= now:
+            _, prep_minutes, due = orders[next_arrival]
+            dues[next_arrival] = due
+            if policy == "fifo":
+                fifo.append(next_arrival)
+            else:
+                kitchen.enqueue(next_arrival, prep_minutes, due)
+            next_arrival += 1
+
+        # Fill every free station
+        while len(cooking) < stations:
+            if policy == "fifo":
+                if not fifo:
+                    break
+                index = fifo.pop(0)
+            else:
+                index = kitchen.start(now=now)
+                if index is None:
+                    break
+            heapq.heappush(cooking, (now + orders[index][1] * 60, index))
+
+    span = max((finish for finish, _ in finished), default=0) - (orders[0][0] if orders else 0)
+    on_time = sum(1 for finish, index in finished if finish <= dues[index])
+    lateness = sorted(max(0.0, finish - dues[index]) for finish, index in finished)
+    return {
+        "completed": len(finished),
+        "throughput_per_hour": len(finished) / span * 3600 if span else 0.0,
+        "on_time_rate": on_time / len(finished) if finished else 0.0,
+        "p90_late_minutes": lateness[int(0.9 * (len(lateness) - 1))] / 60 if lateness else 0.0
+    }
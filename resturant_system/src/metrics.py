@@ -0,0 +1,143 @@
+import math
+import threading
+from datetime import datetime
+
+# Transitions reported as preparation and delivery times
+PREP_TRANSITION = ("preparing", "ready")
+DELIVERY_TRANSITION = ("out_for_delivery", "delivered")
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+# Fixed-size streaming quantile sketch
+class QuantileSketch:
+    """Log-bucketed histogram (HDR/DDSketch style) with a fixed number of buckets.
+
+    Every value in [min_value, max_value] is reported within `relative_accuracy`
+    of its true value; values outside the range are clamped. Memory does not
+    grow with the number of samples, and two sketches with the same settings
+    can be merged by adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1.0, max_value=86400.0):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._offset = self._raw_index(min_value)
+        self._counts = [0] * (self._raw_index(max_value) - self._offset + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def _raw_index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value, count=1):
+        value = min(max(value, self.min_value), self.max_value)
+        self._counts[self._raw_index(value) - self._offset] += count
+        self.count += count
+        self.total += value * count
+
+    def merge(self, other):
+        """Add another sketch's samples into this one"""
+        if (other.relative_accuracy, other.min_value, other.max_value) != \
+                (self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("Can only merge sketches with the same settings")
+
+        for i, bucket_count in enumerate(other._counts):
+            if bucket_count:
+                self._counts[i] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def quantile(self, q):
+        """Return the approximate value at quantile q (0..1), or None if the sketch is empty"""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for i, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen > rank:
+                # Middle of the bucket (gamma^(k-1), gamma^k] in relative terms
+                return 2 * self._gamma ** (i + self._offset) / (self._gamma + 1)
+        return self.max_value
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        return {p: self.quantile(p / 100) for p in percentiles}
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+# Delivery performance metrics
+class DeliveryMetrics:
+    """Time spent between order status transitions, kept per transition, per agent and per hour of day"""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._by_transition = {}  # (from, to) -> sketch
+        self._by_agent = {}  # (agent_id, from, to) -> sketch
+        self._by_hour = {}  # (hour, from, to) -> sketch
+        self._lock = threading.Lock()
+
+    def _sketch(self, sketches, key):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = QuantileSketch(self.relative_accuracy)
+        return sketch
+
+    def record_transition(self, from_status, to_status, seconds, agent_id=None, when=None):
+        """Record that an order spent `seconds` in `from_status` before moving to `to_status`"""
+        if when is None:
+            when = datetime.now()
+
+        with self._lock:
+            self._sketch(self._by_transition, (from_status, to_status)).add(seconds)
+            self._sketch(self._by_hour, (when.hour, from_status, to_status)).add(seconds)
+            if agent_id:
+                self._sketch(self._by_agent, (agent_id, from_status, to_status)).add(seconds)
+
+    def merge(self, other):
+        """Fold another DeliveryMetrics (e.g. from another process) into this one"""
+        with self._lock:
+            for mine, theirs in ((self._by_transition, other._by_transition),
+                                 (self._by_agent, other._by_agent),
+                                 (self._by_hour, other._by_hour)):
+                for key, sketch in theirs.items():
+                    self._sketch(mine, key).merge(sketch)
+        return self
+
+    def transition_percentiles(self, from_status, to_status, percentiles=DEFAULT_PERCENTILES):
+        sketch = self._by_transition.get((from_status, to_status))
+        return sketch.percentiles(percentiles) if sketch else None
+
+    def prep_time_percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        return self.transition_percentiles(*PREP_TRANSITION, percentiles=percentiles)
+
+    def delivery_time_percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        return self.transition_percentiles(*DELIVERY_TRANSITION, percentiles=percentiles)
+
+    def transitions(self):
+        """Return {(from, to): sketch} for every transition seen so far"""
+        with self._lock:
+            return dict(self._by_transition)
+
+    def agent_delivery_times(self):
+        """Return {agent_id: sketch} of delivery times per agent"""
+        with self._lock:
+            return {
+                agent_id: sketch for (agent_id, from_status, to_status), sketch in self._by_agent.items()
+                if (from_status, to_status) == DELIVERY_TRANSITION
+            }
+
+    def hourly(self, from_status, to_status):
+        """Return {hour: sketch} for one transition"""
+        with self._lock:
+            return {
+                hour: sketch for (hour, from_key, to_key), sketch in self._by_hour.items()
+                if (from_key, to_key) == (from_status, to_status)
+            }
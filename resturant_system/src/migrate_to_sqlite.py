@@ -2,6 +2,8 @@ import json
 import os
 import sqlite3
 
+from migrations import apply_migrations
+
 def migrate_json_to_sqlite():
     # Path to your JSON file
     json_file = "food_delivery_data.json"
@@ -21,51 +23,8 @@ def migrate_json_to_sqlite():
         conn = sqlite3.connect(db_file)
         cursor = conn.cursor()
         
-        # Create tables
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT UNIQUE,
-            password TEXT,
-            role TEXT,
-            name TEXT
-        )
-        ''')
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS menu_items (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            description TEXT,
-            price REAL,
-            category TEXT
-        )
-        ''')
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS orders (
-            id TEXT PRIMARY KEY,
-            customer_id TEXT,
-            order_type TEXT,
-            delivery_address TEXT,
-            status TEXT,
-            created_at TEXT,
-            updated_at TEXT,
-            estimated_delivery_time TEXT,
-            delivery_agent_id TEXT,
-            total_amount REAL,
-            items TEXT
-        )
-        ''')
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS delivery_agents (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            status TEXT,
-            current_order TEXT
-        )
-        ''')
+        # Create or upgrade the schema
+        apply_migrations(conn)
         
         # Migrate users
         for username, user_data in data.get("users", {}).items():
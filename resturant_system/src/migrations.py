@@ -0,0 +1,277 @@
+import argparse
+import sqlite3
+import time
+from datetime import datetime
+
+# Rows updated per transaction by backfills, so the app's own writes can get in between
+DEFAULT_BATCH_SIZE = 1000
+
+# Restaurant that rows written before multi-restaurant support belong to
+DEFAULT_RESTAURANT_ID = "default"
+
+
+# Runs migration steps against a connection
+class Migrator:
+    """Schema operations used by migrations.
+
+    Every operation is safe to repeat, so a migration interrupted part way can
+    simply be run again. In dry-run mode nothing is written; the SQL that would
+    run and the number of rows each backfill would touch are printed instead.
+    """
+
+    def __init__(self, conn, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, verbose=False, pause=0.0):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.verbose = verbose or dry_run
+        # Seconds to sleep between backfill batches on a busy database
+        self.pause = pause
+
+    def _say(self, message):
+        if self.verbose:
+            print(message)
+
+    def execute(self, sql, params=()):
+        if self.dry_run:
+            self._say(f"    would run: {' '.join(sql.split())}")
+            return None
+        return self.conn.execute(sql, params)
+
+    def columns(self, table):
+        return {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+    def table_exists(self, table):
+        row = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        return row is not None
+
+    def create_table(self, table, definition):
+        self.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definition})")
+
+    def add_column(self, table, column, column_type):
+        if column in self.columns(table):
+            return
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def create_index(self, name, table, columns):
+        self.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+    def backfill(self, table, assignments, where, params=()):
+        """Run UPDATE table SET assignments WHERE where in rowid-ordered batches.
+
+        Each batch is its own transaction, so readers and writers are only
+        blocked for one batch at a time. `where` must stop matching a row once
+        it is updated, which also makes an interrupted backfill resumable.
+        Returns the number of rows updated (or that would be updated).
+        """
+        if self.dry_run:
+            try:
+                pending = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+            except sqlite3.OperationalError:
+                # The column is added by this run, so every existing row would be touched
+                pending = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] if self.table_exists(table) else 0
+            batches = -(-pending // self.batch_size)
+            self._say(f"    would backfill {pending} rows of {table} in {batches} batches: SET {assignments}")
+            return pending
+
+        total = 0
+        last_rowid = 0
+        while True:
+            start = time.perf_counter()
+            rowids = [row[0] for row in self.conn.execute(
+                f"SELECT rowid FROM {table} WHERE rowid > ? AND ({where}) ORDER BY rowid LIMIT ?",
+                (last_rowid,) + tuple(params) + (self.batch_size,)
+            ).fetchall()]
+            if not rowids:
+                break
+
+            self.conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE rowid BETWEEN ? AND ? AND ({where})",
+                (rowids[0], rowids[-1]) + tuple(params)
+            )
+            self.conn.commit()
+            total += len(rowids)
+            last_rowid = rowids[-1]
+            self._say(f"    backfilled {total} rows of {table} ({(time.perf_counter() - start) * 1000:.1f} ms for this batch)")
+
+            if self.pause:
+                time.sleep(self.pause)
+        return total
+
+
+# Migration steps, in order. Never edit a step that has shipped; add a new one instead.
+# Order items are stored as a JSON string.
+
+def _initial_schema(m):
+    m.create_table("users", """
+        id TEXT PRIMARY KEY,
+        username TEXT UNIQUE,
+        password TEXT,
+        role TEXT,
+        name TEXT
+    """)
+    m.create_table("menu_items", """
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        description TEXT,
+        price REAL,
+        category TEXT
+    """)
+    m.create_table("orders", """
+        id TEXT PRIMARY KEY,
+        customer_id TEXT,
+        order_type TEXT,
+        delivery_address TEXT,
+        status TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        estimated_delivery_time TEXT,
+        delivery_agent_id TEXT,
+        total_amount REAL,
+        items TEXT
+    """)
+    m.create_table("delivery_agents", """
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        status TEXT,
+        current_order TEXT
+    """)
+
+
+def _agent_locations(m):
+    m.add_column("delivery_agents", "latitude", "REAL")
+    m.add_column("delivery_agents", "longitude", "REAL")
+
+
+def _menu_versions(m):
+    # One row per published menu version; orders remember the version they were priced against
+    m.create_table("menu_versions", """
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        published_at TEXT
+    """)
+    m.add_column("orders", "menu_version", "INTEGER")
+
+
+def _row_versions(m):
+    for table in ("users", "menu_items", "orders", "delivery_agents"):
+        m.add_column(table, "version", "INTEGER NOT NULL DEFAULT 0")
+        # Rows that predate versioning count as their first version
+        m.backfill(table, "version = 1", "version = 0")
+
+
+def _restaurant_partitions(m):
+    for table in ("menu_items", "orders", "delivery_agents"):
+        m.add_column(table, "restaurant_id", f"TEXT NOT NULL DEFAULT '{DEFAULT_RESTAURANT_ID}'")
+    m.create_index("idx_menu_items_restaurant", "menu_items", "restaurant_id")
+    m.create_index("idx_orders_restaurant", "orders", "restaurant_id, status")
+    m.create_index("idx_delivery_agents_restaurant", "delivery_agents", "restaurant_id, status")
+
+
+def _order_lookup_indexes(m):
+    # Customer order history and agent order lists
+    m.create_index("idx_orders_customer", "orders", "customer_id")
+    m.create_index("idx_orders_agent", "orders", "delivery_agent_id")
+
+
+def _order_created_index(m):
+    # Date-range exports read orders in created_at order
+    m.create_index("idx_orders_created_at", "orders", "created_at")
+
+
+def _agent_routes(m):
+    # Agents carry a JSON list of order ids in drop order; current_order stays the next drop
+    m.add_column("delivery_agents", "route", "TEXT")
+    m.backfill("delivery_agents", "route = '["' || current_order || '"]'",
+               "route IS NULL AND current_order IS NOT NULL")
+
+
+def _change_log(m):
+    # Ids of the rows each transaction changed, written in that transaction; NULL changes means anything may have
+    m.create_table("change_log", """
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT,
+        changes TEXT
+    """)
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "agent locations", _agent_locations),
+    (3, "menu versions", _menu_versions),
+    (4, "row versions", _row_versions),
+    (5, "restaurant partitions", _restaurant_partitions),
+    (6, "order lookup indexes", _order_lookup_indexes),
+    (7, "order created_at index", _order_created_index),
+    (8, "agent routes", _agent_routes),
+    (9, "change log", _change_log)
+]
+
+
+def applied_versions(conn):
+    """Return {version: name} of the migrations already applied to a database"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'").fetchone()
+    if not exists:
+        return {}
+    return dict(conn.execute("SELECT version, name FROM schema_migrations").fetchall())
+
+
+def current_version(conn):
+    return max(applied_versions(conn), default=0)
+
+
+def apply_migrations(conn, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, verbose=False, pause=0.0, migrations=None):
+    """Bring a database up to date and return [(version, name, seconds)] for each migration run"""
+    migrations = MIGRATIONS if migrations is None else migrations
+    migrator = Migrator(conn, dry_run, batch_size, verbose, pause)
+
+    if not dry_run:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT,
+            duration_ms REAL
+        )
+        """)
+
+    applied = applied_versions(conn)
+    results = []
+    for version, name, step in migrations:
+        if version in applied:
+            continue
+
+        migrator._say(f"{'Pending' if dry_run else 'Applying'} migration {version}: {name}")
+        start = time.perf_counter()
+        step(migrator)
+        elapsed = time.perf_counter() - start
+
+        if not dry_run:
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                (version, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), elapsed * 1000)
+            )
+            conn.commit()
+            migrator._say(f"  done in {elapsed * 1000:.1f} ms")
+        results.append((version, name, elapsed))
+
+    if results and not dry_run and migrator.table_exists("change_log"):
+        # Backfills are not logged row by row, so tell open stores to reload everything
+        conn.execute("INSERT INTO change_log (token, changes) VALUES (NULL, NULL)")
+        conn.commit()
+    if not results:
+        migrator._say(f"Schema is up to date (version {current_version(conn)})")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations to a food delivery database")
+    parser.add_argument("db_file", nargs="?", default="food_delivery.db")
+    parser.add_argument("--dry-run", action="store_true", help="show what would change without writing")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per backfill transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between backfill batches")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db_file)
+    try:
+        apply_migrations(connection, args.dry_run, args.batch_size, verbose=True, pause=args.pause)
+    finally:
+        connection.close()
@@ -0,0 +1,156 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    from .migrations import DEFAULT_RESTAURANT_ID
+except ImportError:
+    from migrations import DEFAULT_RESTAURANT_ID
+
+# Read-only connections kept for reports
+REPORT_POOL_SIZE = 2
+
+# Seconds a single report query may run (and wait for a connection) before it is abandoned
+REPORT_TIME_BUDGET = 2.0
+
+# SQLite VM steps between checks of the time budget
+PROGRESS_STEPS = 1000
+
+
+class ReportTimeout(Exception):
+    """Raised when a report query runs past its time budget or no reporting connection frees up in time"""
+
+
+# Pool of read-only SQLite connections
+class ReadOnlyPool:
+    """Connections opened with mode=ro, separate from the DataStore's read-write connection.
+
+    With the database in WAL mode a report reads a snapshot without blocking
+    order writes, and a slow report can only hold up other reports. Every
+    query runs under a time budget enforced by SQLite's progress handler.
+    """
+
+    def __init__(self, db_file, size=REPORT_POOL_SIZE, budget=REPORT_TIME_BUDGET):
+        self.db_file = db_file
+        self.size = size
+        self.budget = budget
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        uri = f"file:{quote(os.path.abspath(self.db_file))}?mode=ro"
+        # Autocommit, so a report only holds a read snapshot while it asks for one
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _acquire(self, wait):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._opened) < self.size:
+                conn = self._connect()
+                self._opened.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.budget if wait is None else wait)
+        except queue.Empty:
+            raise ReportTimeout("All reporting connections are busy")
+
+    @contextmanager
+    def connection(self, wait=None):
+        """Borrow a read-only connection for the duration of the with block"""
+        conn = self._acquire(wait)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _run(self, conn, sql, params, budget):
+        budget = self.budget if budget is None else budget
+        deadline = time.perf_counter() + budget
+        conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise ReportTimeout(f"Report query ran past its {budget:.1f}s budget")
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def query(self, sql, params=(), budget=None):
+        """Run one query on a pooled connection and return its rows"""
+        with self.connection(budget) as conn:
+            return self._run(conn, sql, params, budget)
+
+    @contextmanager
+    def snapshot(self, budget=None):
+        """Yield a query function whose queries all read the same snapshot of the database"""
+        with self.connection(budget) as conn:
+            conn.execute("BEGIN")
+            yield lambda sql, params=(): self._run(conn, sql, params, budget)
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened = []
+            self._idle = queue.LifoQueue()
+
+
+# Restaurant reports served from the read-only pool
+class Reports:
+    def __init__(self, pool, restaurant_id=DEFAULT_RESTAURANT_ID):
+        self.pool = pool
+        self.restaurant_id = restaurant_id
+
+    def orders(self, limit=None):
+        """The restaurant's orders as row dicts, newest first"""
+        sql = "SELECT * FROM orders WHERE restaurant_id = ? ORDER BY created_at DESC, id"
+        params = (self.restaurant_id,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [dict(row) for row in self.pool.query(sql, params)]
+
+    def order_summary(self):
+        """Order count and revenue per status, plus overall totals"""
+        rows = self.pool.query(
+            "SELECT status, COUNT(*) AS orders, COALESCE(SUM(total_amount), 0) AS revenue "
+            "FROM orders WHERE restaurant_id = ? GROUP BY status",
+            (self.restaurant_id,)
+        )
+        by_status = {row["status"]: {"orders": row["orders"], "revenue": row["revenue"]} for row in rows}
+        # Cancelled orders are not revenue
+        counted = [totals for status, totals in by_status.items() if status != "cancelled"]
+        orders = sum(totals["orders"] for totals in counted)
+        revenue = sum(totals["revenue"] for totals in counted)
+        return {
+            "by_status": by_status,
+            "orders": orders,
+            "revenue": revenue,
+            "average_order_value": revenue / orders if orders else 0.0
+        }
+
+    def agents(self):
+        """The restaurant's delivery agents with the number of orders each has delivered"""
+        rows = self.pool.query(
+            "SELECT a.*, COUNT(o.id) AS delivered FROM delivery_agents a "
+            "LEFT JOIN orders o ON o.delivery_agent_id = a.id AND o.status = 'delivered' "
+            "WHERE a.restaurant_id = ? GROUP BY a.id ORDER BY a.name",
+            (self.restaurant_id,)
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,140 @@
+import heapq
+
+try:
+    from .spatial_index import RESTAURANT_LOCATION, distance_km
+except ImportError:
+    from spatial_index import RESTAURANT_LOCATION, distance_km
+
+# Most drops an agent takes on one trip
+MAX_BATCH_SIZE = 3
+
+# Orders are only batched with an order whose address is within this distance
+BATCH_RADIUS_KM = 2.5
+
+# Average delivery speed through the city and time to hand an order over
+DELIVERY_SPEED_KMH = 20
+HANDOVER_MINUTES = 5
+
+
+def route_length_km(start, locations):
+    """Length of the path from start through the locations in order (no return leg)"""
+    total = 0.0
+    previous = start
+    for location in locations:
+        total += distance_km(previous, location)
+        previous = location
+    return total
+
+
+def _improvements(route):
+    """Routes one move away: a segment reversed (2-opt) or a single drop moved elsewhere"""
+    for i in range(len(route) - 1):
+        for j in range(i + 1, len(route)):
+            yield route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+    for i in range(len(route)):
+        rest = route[:i] + route[i + 1:]
+        for j in range(len(route)):
+            if j != i:
+                yield rest[:j] + [route[i]] + rest[j:]
+
+
+def plan_route(start, stops):
+    """Order the drops {key: (latitude, longitude)} of one trip and return the keys in visiting order.
+
+    Nearest neighbour builds a first route from start, then 2-opt reversals and
+    single-drop moves are applied while they shorten it. Batches are a handful
+    of drops, so trying every move is cheap.
+    """
+    remaining = dict(stops)
+    route = []
+    position = start
+    while remaining:
+        key = min(remaining, key=lambda k: distance_km(position, remaining[k]))
+        position = remaining.pop(key)
+        route.append(key)
+
+    def length(keys):
+        return route_length_km(start, [stops[key] for key in keys])
+
+    best = length(route)
+    improved = True
+    while improved:
+        improved = False
+        for candidate in _improvements(route):
+            candidate_length = length(candidate)
+            if candidate_length < best - 1e-9:
+                route, best, improved = candidate, candidate_length, True
+                break
+    return route
+
+
+def pick_batch(seed, candidates, max_batch=MAX_BATCH_SIZE, radius_km=BATCH_RADIUS_KM):
+    """Return the seed key plus the nearest candidates {key: location} within radius_km of it"""
+    seed_location = candidates[seed]
+    nearby = sorted((distance_km(seed_location, location), key) for key, location in candidates.items()
+                    if key != seed and distance_km(seed_location, location) <= radius_km)
+    return [seed] + [key for _, key in nearby[:max_batch - 1]]
+
+
+def trip_minutes(stops, route, start=RESTAURANT_LOCATION):
+    """Minutes to drive a route from start and hand over every drop, plus the drive back"""
+    locations = [stops[key] for key in route]
+    distance = route_length_km(start, locations) + (distance_km(locations[-1], start) if locations else 0)
+    return distance / DELIVERY_SPEED_KMH * 60 + HANDOVER_MINUTES * len(route)
+
+
+def simulate(orders, num_agents, max_batch=MAX_BATCH_SIZE, radius_km=BATCH_RADIUS_KM):
+    """Dispatch (ready_minute, (latitude, longitude)) orders to agents waiting at the restaurant.
+
+    Each free agent takes the oldest waiting order plus, when batching, up to
+    max_batch - 1 neighbours of it, drives the planned route and returns.
+    max_batch=1 is the one-order-per-agent baseline. Returns delivered orders
+    per agent-hour, mean minutes from ready to handover and total km driven.
+    """
+    orders = sorted(orders)
+    free_at = [(0.0, agent) for agent in range(num_agents)]
+    heapq.heapify(free_at)
+    waiting = {}
+    next_order = 0
+    delivered = 0
+    total_wait = 0.0
+    total_km = 0.0
+    finish = 0.0
+
+    while next_order < len(orders) or waiting:
+        now, agent = heapq.heappop(free_at)
+        if not waiting:
+            # Nothing to take yet: wait for the next order to come out of the kitchen
+            now = max(now, orders[next_order][0])
+        while next_order < len(orders) and orders[next_order][0] <= now:
+            waiting[next_order] = orders[next_order]
+            next_order += 1
+
+        seed = min(waiting)
+        locations = {key: location for key, (_, location) in waiting.items()}
+        batch = pick_batch(seed, locations, max_batch, radius_km) if max_batch > 1 else [seed]
+        route = plan_route(RESTAURANT_LOCATION, {key: locations[key] for key in batch})
+
+        # Time each handover along the route
+        elapsed = 0.0
+        previous = RESTAURANT_LOCATION
+        for key in route:
+            elapsed += distance_km(previous, locations[key]) / DELIVERY_SPEED_KMH * 60 + HANDOVER_MINUTES
+            total_wait += now + elapsed - waiting[key][0]
+            previous = locations[key]
+            del waiting[key]
+
+        delivered += len(route)
+        total_km += route_length_km(RESTAURANT_LOCATION, [locations[key] for key in route]) + \
+            distance_km(previous, RESTAURANT_LOCATION)
+        back = now + trip_minutes(locations, route)
+        finish = max(finish, back)
+        heapq.heappush(free_at, (back, agent))
+
+    agent_hours = num_agents * finish / 60
+    return {
+        "delivered": delivered,
+        "orders_per_agent_hour": delivered / agent_hours if agent_hours else 0.0,
+        "mean_wait_minutes": total_wait / delivered if delivered else 0.0,
+        "km_driven": total_km
+    }
@@ -0,0 +1,163 @@
+import hashlib
+import math
+from functools import lru_cache
+
+# Location of the restaurant; new delivery agents start here
+RESTAURANT_LOCATION = (17.3850, 78.4867)
+
+# Local geocoding table for known addresses (normalized address -> (latitude, longitude))
+GEOCODE_TABLE = {
+    "123 test st": (17.4065, 78.4772),
+    "banjara hills": (17.4156, 78.4347),
+    "jubilee hills": (17.4326, 78.4071),
+    "hitech city": (17.4435, 78.3772),
+    "secunderabad": (17.4399, 78.4983),
+    "charminar": (17.3616, 78.4747),
+    "begumpet": (17.4447, 78.4664),
+    "kukatpally": (17.4849, 78.4138)
+}
+
+# Unknown addresses are placed deterministically within this many degrees of the restaurant
+STUB_RADIUS_DEGREES = 0.1
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320
+
+
+def _normalize_address(address):
+    return " ".join(address.lower().replace(",", " ").split())
+
+
+@lru_cache(maxsize=4096)
+def geocode(address):
+    """Resolve an address to (latitude, longitude) using the local table, falling back to a stub"""
+    if not address:
+        return RESTAURANT_LOCATION
+
+    normalized = _normalize_address(address)
+    if normalized in GEOCODE_TABLE:
+        return GEOCODE_TABLE[normalized]
+
+    # Stub: hash the address to a stable point near the restaurant
+    digest = hashlib.md5(normalized.encode("utf-8")).digest()
+    lat_offset = (int.from_bytes(digest[:4], "big") / 0xFFFFFFFF * 2 - 1) * STUB_RADIUS_DEGREES
+    lon_offset = (int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF * 2 - 1) * STUB_RADIUS_DEGREES
+    return (RESTAURANT_LOCATION[0] + lat_offset, RESTAURANT_LOCATION[1] + lon_offset)
+
+
+def _project(lat, lon):
+    """Project latitude/longitude onto a flat km grid around the restaurant (fine at city scale)"""
+    origin_lat, origin_lon = RESTAURANT_LOCATION
+    x = (lon - origin_lon) * KM_PER_DEGREE_LON * math.cos(math.radians(origin_lat))
+    y = (lat - origin_lat) * KM_PER_DEGREE_LAT
+    return x, y
+
+
+def distance_km(a, b):
+    """Approximate distance in km between two (latitude, longitude) points"""
+    ax, ay = _project(*a)
+    bx, by = _project(*b)
+    return math.hypot(ax - bx, ay - by)
+
+
+# Uniform grid spatial index
+class GridIndex:
+    """Buckets points into square cells so nearest-neighbour lookups only scan nearby cells"""
+
+    def __init__(self, cell_size_km=1.0):
+        self.cell_size_km = cell_size_km
+        self._cells = {}  # (cx, cy) -> {key: (x, y)}
+        self._points = {}  # key -> (cell, location)
+        # Bounding box of cells ever used (min_x, max_x, min_y, max_y); only grows
+        self._bounds = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def keys(self):
+        return self._points.keys()
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size_km), math.floor(y / self.cell_size_km))
+
+    def insert(self, key, location):
+        """Add a point, or move it if the key is already indexed"""
+        if key in self._points:
+            self.remove(key)
+
+        x, y = _project(*location)
+        cell = self._cell(x, y)
+        self._cells.setdefault(cell, {})[key] = (x, y)
+        self._points[key] = (cell, location)
+
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            self._bounds = [min(self._bounds[0], cell[0]), max(self._bounds[1], cell[0]),
+                            min(self._bounds[2], cell[1]), max(self._bounds[3], cell[1])]
+
+    def remove(self, key):
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return False
+
+        cell = entry[0]
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+        return True
+
+    def get_location(self, key):
+        entry = self._points.get(key)
+        return entry[1] if entry else None
+
+    def nearest(self, location):
+        """Return (key, distance_km) of the closest indexed point, or None if the index is empty"""
+        if not self._points:
+            return None
+
+        x, y = _project(*location)
+        cx, cy = self._cell(x, y)
+        best_key = None
+        best_dist = float("inf")
+        ring = 0
+
+        # Search square rings of cells outwards until no closer point can exist
+        while True:
+            for cell in self._ring_cells(cx, cy, ring):
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                for key, (px, py) in bucket.items():
+                    dist = math.hypot(px - x, py - y)
+                    if dist < best_dist:
+                        best_key, best_dist = key, dist
+
+            # Every point outside this ring is at least `ring * cell_size` away
+            if best_key is not None and best_dist <= ring * self.cell_size_km:
+                return best_key, best_dist
+
+            ring += 1
+            # Once the ring covers every occupied cell, nothing else can be found
+            if ring > self._max_ring(cx, cy):
+                return best_key, best_dist
+
+    def _max_ring(self, cx, cy):
+        min_x, max_x, min_y, max_y = self._bounds
+        return max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+
+    @staticmethod
+    def _ring_cells(cx, cy, ring):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
@@ -5,6 +5,13 @@ import json
 import uuid
 import sqlite3
 import time
+import threading
+import ast
+import csv
+import gzip
+import shutil
+import struct
+import tempfile
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
 
@@ -17,12 +24,32 @@ try:
         User, UserRole, MenuItem, Order, OrderStatus, OrderType, 
         UserManager, DataStore, MenuManager, OrderManager, DeliveryManager
     )
+    from src.eta_scheduler import ETAScheduler
+    from src.spatial_index import GridIndex, geocode, distance_km
+    from src.metrics import QuantileSketch
+    from src.admission import AdmissionController, AdmissionRejected
+    from src.migrations import MIGRATIONS, apply_migrations, applied_versions
+    from src.export import export_orders
+    from src.kitchen import KitchenScheduler, simulate
+    from src.routing import plan_route, route_length_km
+    from src.headless import HeadlessSession
+    from src.reporting import ReadOnlyPool, Reports, ReportTimeout
 except ImportError:
     try:
         from classes import (
             User, UserRole, MenuItem, Order, OrderStatus, OrderType, 
             UserManager, DataStore, MenuManager, OrderManager, DeliveryManager
         )
+        from eta_scheduler import ETAScheduler
+        from spatial_index import GridIndex, geocode, distance_km
+        from metrics import QuantileSketch
+        from admission import AdmissionController, AdmissionRejected
+        from migrations import MIGRATIONS, apply_migrations, applied_versions
+        from export import export_orders
+        from kitchen import KitchenScheduler, simulate
+        from routing import plan_route, route_length_km
+        from headless import HeadlessSession
+        from reporting import ReadOnlyPool, Reports, ReportTimeout
     except ImportError:
         print("ERROR: Could not import classes module. Check your module structure.")
         sys.exit(1)
@@ -819,5 +846,909 @@ class TestFoodDeliverySystem(unittest.TestCase):
             self.assertTrue(success)
             self.assertEqual(user.name, new_name)
             
+    def test_bulk_update_order_status(self):
+        """Test moving several orders to a new status at once"""
+        self.data_store.data = self.data_store._load_data()
+        
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        self.assertTrue(success)
+        
+        _, delivery_order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.DELIVERY, "123 Test St"
+        )
+        _, takeaway_order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.burger.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        
+        outcomes = self.order_manager.bulk_update_order_status(
+            [delivery_order.id, takeaway_order.id, "nonexistent_id"], OrderStatus.CONFIRMED
+        )
+        self.assertEqual([success for _, success, _ in outcomes], [True, True, False])
+        
+        # Takeaway orders can never go out for delivery
+        outcomes = self.order_manager.bulk_update_order_status(
+            [delivery_order.id, takeaway_order.id], OrderStatus.OUT_FOR_DELIVERY
+        )
+        self.assertTrue(outcomes[0][1])
+        self.assertFalse(outcomes[1][1])
+        
+        # Invalid transitions are rejected
+        outcomes = self.order_manager.bulk_update_order_status([takeaway_order.id], OrderStatus.PLACED)
+        self.assertFalse(outcomes[0][1])
+        
+        self.data_store.data = self.data_store._load_data()
+        self.assertEqual(self.order_manager.get_order(delivery_order.id).status, OrderStatus.OUT_FOR_DELIVERY)
+        self.assertEqual(self.order_manager.get_order(takeaway_order.id).status, OrderStatus.CONFIRMED)
+    
+    def test_bulk_update_releases_delivery_agents(self):
+        """Test that finishing orders in bulk frees their delivery agents"""
+        self.data_store.data = self.data_store._load_data()
+        
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        agent_id = next(iter(self.data_store.get_delivery_agents()))
+        
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.DELIVERY, "123 Test St"
+        )
+        self.order_manager.update_order_status(order.id, OrderStatus.OUT_FOR_DELIVERY, agent_id)
+        
+        outcomes = self.order_manager.bulk_update_order_status([order.id], OrderStatus.DELIVERED)
+        self.assertTrue(outcomes[0][1])
+        
+        agents = self.data_store.get_delivery_agents()
+        self.assertEqual(agents[agent_id]["status"], "available")
+        self.assertIsNone(agents[agent_id]["current_order"])
+
+    def test_eta_scheduler_fires_overdue_callbacks(self):
+        """Test that the ETA scheduler reports overdue orders in ETA order"""
+        fired = []
+        scheduler = ETAScheduler(on_overdue=lambda order_id, eta: fired.append(order_id), clock=lambda: 1000)
+        
+        scheduler.track("late", 900)
+        scheduler.track("later", 950)
+        scheduler.track("on_time", 2000)
+        scheduler.track("moved", 800)
+        scheduler.track("moved", 5000)  # Rescheduled, old entry must be ignored
+        scheduler.track("done", 700)
+        scheduler.untrack("done")
+        
+        self.assertEqual(scheduler.fire_overdue(), ["late", "later"])
+        self.assertEqual(fired, ["late", "later"])
+        self.assertTrue(scheduler.is_overdue("late"))
+        self.assertFalse(scheduler.is_overdue("moved"))
+        
+        remaining = scheduler.remaining_minutes(["on_time", "moved", "unknown"])
+        self.assertEqual(remaining, {"on_time": 16, "moved": 66, "unknown": None})
+    
+    def test_eta_tracking_follows_order_status(self):
+        """Test that order ETAs are tracked and recomputed as the status changes"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        scheduler = self.order_manager.eta_scheduler
+        self.assertTrue(scheduler.is_tracked(order.id))
+        self.assertEqual(self.order_manager.get_times_remaining([order])[order.id],
+                         self.order_manager.get_time_remaining(order.id))
+        
+        # A takeaway order that is ready can be picked up right away
+        self.order_manager.update_order_status(order.id, OrderStatus.READY)
+        self.assertEqual(scheduler.remaining_minutes([order.id])[order.id], 0)
+        
+        self.order_manager.update_order_status(order.id, OrderStatus.PICKED_UP)
+        self.assertFalse(scheduler.is_tracked(order.id))
+
+    def test_grid_index_nearest(self):
+        """Test that the grid index finds the same nearest point as a full scan"""
+        import random
+        rng = random.Random(7)
+        index = GridIndex(cell_size_km=0.5)
+        points = {}
+        for i in range(300):
+            location = (17.385 + rng.uniform(-0.2, 0.2), 78.4867 + rng.uniform(-0.2, 0.2))
+            points[i] = location
+            index.insert(i, location)
+        for i in range(0, 300, 2):
+            index.remove(i)
+            del points[i]
+        
+        for _ in range(50):
+            query = (17.385 + rng.uniform(-0.3, 0.3), 78.4867 + rng.uniform(-0.3, 0.3))
+            key, dist = index.nearest(query)
+            expected = min(points, key=lambda k: distance_km(points[k], query))
+            self.assertAlmostEqual(dist, distance_km(points[expected], query))
+        
+        self.assertIsNone(GridIndex().nearest(query))
+    
+    def test_assign_nearest_delivery_agent(self):
+        """Test that orders get the closest available agent"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        
+        # Park every agent far away, then one right at the delivery address
+        agents = self.data_store.get_delivery_agents()
+        for agent in agents.values():
+            agent.update({"status": "available", "current_order": None, "latitude": 17.0, "longitude": 78.0})
+        self.data_store.save_data()
+        self.user_manager.register_user("near_agent", "password", UserRole.DELIVERY_AGENT, "Near Agent")
+        near_agent_id = next(agent_id for agent_id, agent in self.data_store.get_delivery_agents().items()
+                             if agent["name"] == "Near Agent")
+        self.delivery_manager.update_agent_location(near_agent_id, *geocode("Banjara Hills"))
+        
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.DELIVERY, "Banjara Hills"
+        )
+        success, agent_id = self.delivery_manager.assign_delivery_agent(order.id)
+        self.assertTrue(success)
+        self.assertEqual(agent_id, near_agent_id)
+        self.assertEqual(self.order_manager.get_order(order.id).delivery_agent_id, near_agent_id)
+        
+        # Delivering the order leaves the agent at the customer's address
+        self.order_manager.update_order_status(order.id, OrderStatus.DELIVERED)
+        agent = self.data_store.get_delivery_agents()[near_agent_id]
+        self.assertEqual(agent["status"], "available")
+        self.assertEqual((agent["latitude"], agent["longitude"]), geocode("Banjara Hills"))
+
+    def test_agent_index_follows_agent_changes(self):
+        """Test that the agent index is updated as agents change, not rebuilt on every assignment"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        for i in range(30):
+            self.user_manager.register_user(f"pool_agent_{i}", "password", UserRole.DELIVERY_AGENT, f"Pool Agent {i}")
+        available = {agent["id"] for agent in self.delivery_manager.get_available_agents()}
+        self.assertEqual(set(self.data_store.get_agent_index("default").keys()), available)
+        
+        agent_id = next(iter(available))
+        self.delivery_manager.update_agent_location(agent_id, *geocode("Kukatpally"))
+        self.assertEqual(self.data_store.get_agent_index("default").get_location(agent_id), geocode("Kukatpally"))
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.DELIVERY, "Kukatpally"
+        )
+        
+        # Assigning looks up only nearby agents instead of locating every one
+        located = []
+        with patch(DataStore.__module__ + ".agent_location", side_effect=lambda agent: located.append(agent) or (0, 0)):
+            success, assigned = self.delivery_manager.assign_delivery_agent(order.id)
+        self.assertEqual((success, assigned), (True, agent_id))
+        self.assertEqual(located, [])
+        self.assertNotIn(agent_id, self.data_store.get_agent_index("default"))
+        
+        # Finishing the drop puts the agent back where it delivered
+        self.order_manager.update_order_status(order.id, OrderStatus.DELIVERED)
+        self.assertEqual(self.data_store.get_agent_index("default").get_location(agent_id), geocode("Kukatpally"))
+    
+
+    def test_quantile_sketch_accuracy_and_merge(self):
+        """Test that sketch percentiles stay within the relative accuracy and merge correctly"""
+        import random
+        rng = random.Random(3)
+        values = [rng.uniform(60, 3600) for _ in range(5000)]
+        
+        first, second = QuantileSketch(), QuantileSketch()
+        for value in values[:2500]:
+            first.add(value)
+        for value in values[2500:]:
+            second.add(value)
+        first.merge(second)
+        self.assertEqual(first.count, 5000)
+        
+        values.sort()
+        for p in (50, 90, 99):
+            exact = values[int(p / 100 * (len(values) - 1))]
+            self.assertAlmostEqual(first.quantile(p / 100), exact, delta=exact * 0.02)
+        
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+        with self.assertRaises(ValueError):
+            first.merge(QuantileSketch(relative_accuracy=0.05))
+    
+    def test_status_transitions_feed_metrics(self):
+        """Test that order status updates record time spent per transition"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.order_manager.update_order_status(order.id, OrderStatus.PREPARING)
+        
+        # Pretend the order has been in the kitchen for ten minutes
+        orders = self.data_store.get_orders()
+        started = datetime.now() - timedelta(minutes=10)
+        orders[order.id]["updated_at"] = started.strftime("%Y-%m-%d %H:%M:%S")
+        self.data_store.save_data()
+        
+        self.order_manager.bulk_update_order_status([order.id], OrderStatus.READY)
+        
+        prep_times = self.order_manager.metrics.prep_time_percentiles()
+        self.assertAlmostEqual(prep_times[50], 600, delta=600 * 0.02)
+        self.assertIn(("placed", "preparing"), self.order_manager.metrics.transitions())
+        self.assertIsNone(self.order_manager.metrics.delivery_time_percentiles())
+
+    def test_order_identity_map(self):
+        """Test that each order is hydrated once per read snapshot"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 2}], OrderType.DELIVERY, "123 Test St"
+        )
+        
+        listed = {o.id: o for o in self.order_manager.get_customer_orders(customer.id)}
+        snapshot = self.data_store.snapshot_id
+        
+        # ETA lookups for listed orders reuse the listing's objects without reloading
+        self.order_manager.get_time_remaining(order.id)
+        self.assertEqual(self.data_store.snapshot_id, snapshot)
+        self.assertIs(self.order_manager._identity_map[order.id], listed[order.id])
+        
+        # Reads that find nothing changed stay on the same snapshot
+        self.assertIs(self.order_manager.get_order(order.id), listed[order.id])
+        
+        # A new snapshot builds fresh objects
+        self.data_store.data = self.data_store._load_data()
+        self.assertIsNot(self.order_manager.get_order(order.id), listed[order.id])
+    
+    def test_order_items_decoded_lazily(self):
+        """Test that order items loaded from the database are decoded on first access"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 2}], OrderType.DELIVERY, "123 Test St"
+        )
+        
+        # Reload so the row comes from the database rather than our own write
+        self.data_store.data = self.data_store._load_data()
+        order_data = self.data_store.get_orders()[order.id]
+        self.assertIsInstance(order_data["items"], str)
+        
+        loaded = Order.from_dict(order_data)
+        self.assertIsInstance(loaded._items, str)
+        self.assertEqual(loaded.items[0]["quantity"], 2)
+        self.assertIsInstance(loaded._items, list)
+        
+        # Saving untouched rows keeps the items intact
+        self.data_store.save_data()
+        self.assertEqual(self.order_manager.get_order(order.id).items, loaded.items)
+
+    def test_menu_snapshots_are_versioned(self):
+        """Test that menu edits publish new immutable versions and orders record their version"""
+        snapshot = self.data_store.get_menu_snapshot()
+        self.assertIn(self.pizza.id, snapshot.items)
+        with self.assertRaises(TypeError):
+            snapshot.items[self.pizza.id]["price"] = 1.0
+        
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.assertEqual(order.menu_version, snapshot.version)
+        
+        # An edit publishes a new version and leaves the old snapshot untouched
+        self.menu_manager.update_item(self.pizza.id, price=99.0)
+        new_snapshot = self.data_store.get_menu_snapshot()
+        self.assertGreater(new_snapshot.version, snapshot.version)
+        self.assertEqual(new_snapshot.items[self.pizza.id]["price"], 99.0)
+        self.assertEqual(snapshot.items[self.pizza.id]["price"], self.pizza.price)
+        
+        _, new_order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.assertEqual(new_order.total_amount, 99.0)
+        self.assertEqual(self.order_manager.get_order(new_order.id).menu_version, new_snapshot.version)
+        
+        # Readers don't go back to SQLite
+        with patch.object(self.data_store, "get_menu_items", side_effect=AssertionError("menu reloaded")):
+            self.assertEqual(self.menu_manager.get_item(self.pizza.id).price, 99.0)
+            self.assertTrue(len(self.menu_manager.get_all_items()) >= 3)
+        
+        # A publish that fails adds nothing and says so
+        with patch.object(self.data_store, "_read_menu", side_effect=sqlite3.OperationalError("database is locked")), \
+                patch("builtins.print"):
+            self.assertIsNone(self.menu_manager.add_item("Lost Soup", "Never saved", 5.0, "Starter"))
+        self.assertNotIn("Lost Soup", [item.name for item in self.menu_manager.get_all_items()])
+        self.assertEqual(self.data_store.get_menu_snapshot().version, new_snapshot.version)
+
+    def _open_peer_store(self):
+        """Open a second DataStore on the test database, as another process would"""
+        peer = object.__new__(DataStore)
+        peer.db_file = self.test_db_file
+        peer.conn = sqlite3.connect(peer.db_file)
+        peer.conn.row_factory = sqlite3.Row
+        peer.data = peer._load_data()
+        self.addCleanup(peer.conn.close)
+        return peer
+    
+    def test_stale_write_is_rejected(self):
+        """Test that a save based on an outdated row does not overwrite another session's change"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        peer = self._open_peer_store()
+        
+        # The peer confirms the order first
+        peer.data["orders"][order.id]["status"] = OrderStatus.CONFIRMED.value
+        self.assertTrue(peer.save_data())
+        
+        # Our cache still holds the old row, so cancelling it must fail
+        self.data_store.data["orders"][order.id]["status"] = OrderStatus.CANCELLED.value
+        self.assertFalse(self.data_store.save_data())
+        self.assertIn(("orders", order.id), self.data_store.last_conflicts)
+        
+        # The peer's change survived and our cache was reloaded with it
+        self.assertEqual(self.data_store.data["orders"][order.id]["status"], OrderStatus.CONFIRMED.value)
+        self.assertEqual(self.data_store.data["orders"][order.id]["version"], 2)
+        
+        # Retrying from the fresh data goes through
+        success, message = self.order_manager.update_order_status(order.id, OrderStatus.CANCELLED)
+        self.assertTrue(success, message)
+    
+    def test_refresh_reloads_only_changed_rows(self):
+        """Test that changes committed by another session are picked up row by row"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.data_store.refresh()
+        untouched = self.data_store.data["users"]["test_admin"]
+        
+        peer = self._open_peer_store()
+        peer.data["orders"][order.id]["status"] = OrderStatus.CONFIRMED.value
+        self.assertTrue(peer.save_data())
+        self.assertTrue(peer.publish_menu_change(updates={self.pizza.id: {"price": 14.99}}))
+        
+        # Refreshing must not fall back to a full reload
+        with patch.object(DataStore, "_load_data", side_effect=AssertionError("full reload")):
+            orders = self.data_store.get_orders()
+            self.assertEqual(orders[order.id]["status"], OrderStatus.CONFIRMED.value)
+            self.assertIs(self.data_store.data["users"]["test_admin"], untouched)
+            self.assertEqual(self.menu_manager.get_item(self.pizza.id).price, 14.99)
+            
+            # Nothing changed since, so the next read does no work
+            snapshot = self.data_store.snapshot_id
+            self.data_store.get_orders()
+            self.assertEqual(self.data_store.snapshot_id, snapshot)
+
+    def test_refresh_sees_changes_committed_before_own_write(self):
+        """Test that a peer's change is still picked up after we commit one of our own on top of it"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        _, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.data_store.refresh()
+        peer = self._open_peer_store()
+        peer.data["orders"][order.id]["status"] = OrderStatus.CONFIRMED.value
+        self.assertTrue(peer.save_data())
+        
+        # Our own write lands in the log after the peer's entry, which we have not read yet
+        self.data_store.data["users"]["test_admin"]["name"] = "Renamed Admin"
+        self.assertTrue(self.data_store.save_rows(users=["test_admin"]))
+        
+        with patch.object(DataStore, "_load_data", side_effect=AssertionError("full reload")):
+            self.assertEqual(self.data_store.get_orders()[order.id]["status"], OrderStatus.CONFIRMED.value)
+            self.assertEqual(self.data_store.data["users"]["test_admin"]["name"], "Renamed Admin")
+        
+        # A peer change whose log entry was trimmed can't be reloaded row by row
+        peer.refresh()
+        peer.data["orders"][order.id]["status"] = OrderStatus.READY.value
+        with patch.object(DataStore, "CHANGE_LOG_KEEP", 0):
+            self.assertTrue(peer.save_data())
+        self.assertEqual(self.data_store.get_orders()[order.id]["status"], OrderStatus.READY.value)
+    
+
+    def test_restaurants_are_partitioned(self):
+        """Test that menus, orders and agent pools are scoped to their restaurant"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        other_menu = MenuManager("other")
+        other_orders = OrderManager("other")
+        other_delivery = DeliveryManager("other")
+        curry = other_menu.add_item("Other Curry", "From another kitchen", 8.5, "Main")
+        
+        # Each restaurant only sees its own menu
+        self.assertEqual([item.id for item in other_menu.get_all_items()], [curry.id])
+        self.assertNotIn(curry.id, [item.id for item in self.menu_manager.get_all_items()])
+        self.assertIsNone(self.menu_manager.get_item(curry.id))
+        self.assertFalse(self.menu_manager.remove_item(curry.id)[0])
+        
+        # Orders can only use the restaurant's own items
+        success, message = other_orders.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.DELIVERY, "Charminar"
+        )
+        self.assertFalse(success)
+        success, order = other_orders.create_order(
+            customer.id, [{"item_id": curry.id, "quantity": 2}], OrderType.DELIVERY, "Charminar"
+        )
+        self.assertTrue(success)
+        self.assertEqual(order.restaurant_id, "other")
+        self.assertEqual([o.id for o in other_orders.get_all_orders()], [order.id])
+        self.assertNotIn(order.id, [o.id for o in self.order_manager.get_all_orders()])
+        self.assertFalse(self.order_manager.update_order_status(order.id, OrderStatus.CONFIRMED)[0])
+        
+        # The other restaurant has no agents of its own yet
+        self.assertEqual(other_delivery.assign_delivery_agent(order.id), (False, "No delivery agents available"))
+        UserManager("other").register_user("other_agent", "password", UserRole.DELIVERY_AGENT, "Other Agent")
+        success, agent_id = other_delivery.assign_delivery_agent(order.id)
+        self.assertTrue(success)
+        self.assertEqual(self.data_store.get_delivery_agents()[agent_id]["restaurant_id"], "other")
+        self.assertNotIn(agent_id, [agent["id"] for agent in self.delivery_manager.get_available_agents()])
+    
+    def test_restaurants_can_be_sharded(self):
+        """Test that with sharding on, each restaurant's data lives in its own database file"""
+        shard_dir = os.path.dirname(self.test_db_file)
+        shard_file = os.path.join(shard_dir, "food_delivery_sharded.db")
+        
+        def cleanup():
+            for shard in DataStore._shards.values():
+                shard.close()
+            DataStore._shards = {}
+            for path in (shard_file, shard_file + "-wal", shard_file + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        with patch.multiple(DataStore, shard_by_restaurant=True, shard_directory=shard_dir, _shards={}):
+            self.addCleanup(cleanup)
+            menu_manager = MenuManager("sharded")
+            order_manager = OrderManager("sharded")
+            self.assertIs(menu_manager.data_store, order_manager.data_store)
+            self.assertIsNot(menu_manager.data_store, self.data_store)
+            self.assertEqual(menu_manager.data_store.db_file, shard_file)
+            
+            # The default restaurant stays in the main database
+            self.assertIs(MenuManager().data_store, self.data_store)
+            
+            soup = menu_manager.add_item("Shard Soup", "Hot", 4.0, "Starter")
+            success, customer = self.user_manager.authenticate("test_customer", "password")
+            success, order = order_manager.create_order(
+                customer.id, [{"item_id": soup.id, "quantity": 1}], OrderType.TAKEAWAY
+            )
+            self.assertTrue(success)
+            self.assertNotIn(order.id, self.data_store.get_orders())
+            self.assertNotIn(soup.id, self.data_store.get_menu_snapshot().items)
+            self.assertEqual(order_manager.get_order(order.id).total_amount, 4.0)
+            
+            # Exporting one restaurant reads its shard
+            output_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, output_dir)
+            self.assertEqual(export_orders(output_dir, formats=("csv",), restaurant_id="sharded"), (1, 1))
+            
+            with self.assertRaises(ValueError):
+                DataStore("../elsewhere")
+
+    def test_register_agent_writes_user_and_agent_together(self):
+        """Test that a delivery agent's user row isn't kept when its agent row fails to save"""
+        write_rows = DataStore._write_rows
+        
+        def fail_agents(store, cursor, table, rows, deleted_ids, conflicts):
+            if table == "delivery_agents" and rows:
+                raise sqlite3.OperationalError("disk I/O error")
+            return write_rows(store, cursor, table, rows, deleted_ids, conflicts)
+        
+        # Same database: one transaction, so the user row rolls back with the agent row
+        with patch.object(DataStore, "_write_rows", fail_agents):
+            success, _ = self.user_manager.register_user("lost_agent", "password", UserRole.DELIVERY_AGENT)
+        self.assertFalse(success)
+        self.assertNotIn("lost_agent", self.data_store._load_data()["users"])
+        
+        shard_dir = os.path.dirname(self.test_db_file)
+        shard_file = os.path.join(shard_dir, "food_delivery_agents.db")
+        
+        def cleanup():
+            for shard in DataStore._shards.values():
+                shard.close()
+            DataStore._shards = {}
+            for path in (shard_file, shard_file + "-wal", shard_file + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        with patch.multiple(DataStore, shard_by_restaurant=True, shard_directory=shard_dir, _shards={}):
+            self.addCleanup(cleanup)
+            user_manager = UserManager("agents")
+            self.assertIsNot(user_manager.agent_store, user_manager.data_store)
+            
+            # Another shard: the user row is taken back out
+            with patch.object(user_manager.agent_store, "save_rows", return_value=False):
+                success, _ = user_manager.register_user("lost_agent", "password", UserRole.DELIVERY_AGENT)
+            self.assertFalse(success)
+            self.assertNotIn("lost_agent", self.data_store.get_users())
+            self.assertNotIn("lost_agent", self.data_store._load_data()["users"])
+            
+            # So registering again works
+            success, _ = user_manager.register_user("lost_agent", "password", UserRole.DELIVERY_AGENT)
+            self.assertTrue(success)
+            agent_id = self.data_store.get_users()["lost_agent"]["id"]
+            self.assertIn(agent_id, user_manager.agent_store._load_data()["delivery_agents"])
+
+    def test_admission_controller_queues_then_rejects(self):
+        """Test that callers beyond the concurrency limit wait in line and are rejected once it is full"""
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5.0)
+        release = threading.Event()
+        holding = threading.Event()
+        
+        def hold_slot():
+            with controller.admit():
+                holding.set()
+                release.wait(5)
+        
+        def queued():
+            with controller.admit():
+                pass
+        
+        holder = threading.Thread(target=hold_slot)
+        holder.start()
+        holding.wait(5)
+        waiter = threading.Thread(target=queued)
+        waiter.start()
+        for _ in range(100):
+            if controller.stats()["queue_depth"] == 1:
+                break
+            time.sleep(0.01)
+        self.assertEqual(controller.stats()["queue_depth"], 1)
+        
+        # The line is full: the next caller is turned away at once
+        start = time.monotonic()
+        with self.assertRaises(AdmissionRejected) as rejected:
+            with controller.admit():
+                pass
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        
+        release.set()
+        holder.join(5)
+        waiter.join(5)
+        stats = controller.stats()
+        self.assertEqual((stats["admitted"], stats["rejected"], stats["queue_depth"]), (2, 1, 0))
+        self.assertEqual(stats["peak_queue_depth"], 1)
+        self.assertIsNotNone(stats["wait_ms"][50])
+        
+        # Waiting longer than max_wait is also a rejection
+        controller.configure(max_wait=0.05)
+        errors = []
+        with controller.admit():
+            waiter = threading.Thread(target=lambda: errors.append(self._admit_error(controller)))
+            waiter.start()
+            waiter.join(5)
+        self.assertIsInstance(errors[0], AdmissionRejected)
+        self.assertEqual(errors[0].reason, "timed out waiting")
+    
+    @staticmethod
+    def _admit_error(controller):
+        try:
+            with controller.admit():
+                return None
+        except AdmissionRejected as e:
+            return e
+    
+    def test_create_order_rejected_when_intake_full(self):
+        """Test that create_order fails fast with a retry hint while the intake is saturated"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        self.order_manager.intake.configure(max_concurrent=1, max_queue=0)
+        
+        with self.order_manager.intake.admit():
+            success, message = self.order_manager.create_order(
+                customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+            )
+        self.assertFalse(success)
+        self.assertRegex(message, r"try again in \d+ seconds")
+        self.assertEqual(self.order_manager.get_intake_stats()["rejected"], 1)
+        
+        # Once the slot is free orders go through again
+        success, order = self.order_manager.create_order(
+            customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+        )
+        self.assertTrue(success)
+
+    def test_create_order_survives_concurrent_reload(self):
+        """Test that an order is kept when another thread reloads the cache while it is being created"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        to_dict = Order.to_dict
+        
+        def to_dict_then_reload(order):
+            row = to_dict(order)
+            # What a conflict in another thread does to the shared cache meanwhile
+            self.data_store.data = self.data_store._load_data()
+            return row
+        
+        with patch.object(Order, "to_dict", to_dict_then_reload):
+            success, order = self.order_manager.create_order(
+                customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY
+            )
+        self.assertTrue(success)
+        self.assertIn(order.id, self.data_store.get_orders())
+        self.assertEqual(self.order_manager.get_order(order.id).total_amount, self.pizza.price)
+        
+        # A row dropped from the cache before it is saved is refused, not a KeyError
+        with patch("builtins.print"):
+            self.assertFalse(self.data_store.save_rows(orders=["missing-order"]))
+    
+    def test_migrations_upgrade_legacy_database(self):
+        """Test that migrations bring a pre-versioning database up to date in batches"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE orders (id TEXT PRIMARY KEY, customer_id TEXT, order_type TEXT, "
+                     "delivery_address TEXT, status TEXT, created_at TEXT, updated_at TEXT, "
+                     "estimated_delivery_time TEXT, delivery_agent_id TEXT, total_amount REAL, items TEXT)")
+        conn.executemany("INSERT INTO orders (id, status) VALUES (?, 'placed')", [(str(i),) for i in range(25)])
+        conn.commit()
+        
+        # A dry run reports the pending work without changing anything
+        with patch("builtins.print"):
+            planned = apply_migrations(conn, dry_run=True, batch_size=10)
+        self.assertEqual([version for version, _, _ in planned], [version for version, _, _ in MIGRATIONS])
+        self.assertEqual(applied_versions(conn), {})
+        self.assertNotIn("version", {row[1] for row in conn.execute("PRAGMA table_info(orders)")})
+        
+        with patch("builtins.print"):
+            applied = apply_migrations(conn, batch_size=10, verbose=True)
+        self.assertEqual(len(applied), len(MIGRATIONS))
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+        self.assertTrue({"menu_version", "version", "restaurant_id"} <= columns)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM orders WHERE version = 1 AND restaurant_id = 'default'")
+                         .fetchone()[0], 25)
+        
+        # Applied migrations are recorded and not run again
+        self.assertEqual(set(applied_versions(conn)), {version for version, _, _ in MIGRATIONS})
+        self.assertEqual(apply_migrations(conn), [])
+        conn.close()
+    
+    def test_migrations_backfill_in_batches(self):
+        """Test that a backfill commits one batch at a time"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, price REAL, price_cents INTEGER)")
+        conn.executemany("INSERT INTO items (price) VALUES (?)", [(i + 0.5,) for i in range(23)])
+        conn.commit()
+        
+        def backfill_cents(m):
+            m.backfill("items", "price_cents = CAST(price * 100 AS INTEGER)", "price_cents IS NULL")
+        
+        with patch("builtins.print") as printed:
+            apply_migrations(conn, batch_size=10, verbose=True, migrations=[(1, "price in cents", backfill_cents)])
+        batches = [call.args[0] for call in printed.call_args_list if "backfilled" in call.args[0]]
+        self.assertEqual(len(batches), 3)
+        self.assertIn("backfilled 23 rows", batches[-1])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM items WHERE price_cents IS NULL").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT price_cents FROM items WHERE id = 3").fetchone()[0], 250)
+        conn.close()
+
+    @staticmethod
+    def _read_npy(path):
+        """Read a 1-d .npy file written by the exporter into (dtype, values) without NumPy"""
+        with open(path, "rb") as f:
+            assert f.read(8) == b"\x93NUMPY\x01\x00"
+            header_length = struct.unpack("<H", f.read(2))[0]
+            header = ast.literal_eval(f.read(header_length).decode("latin1"))
+            data = f.read()
+        rows = header["shape"][0]
+        dtype = header["descr"]
+        if dtype.startswith("|S"):
+            width = int(dtype[2:])
+            return dtype, [data[i * width:(i + 1) * width].rstrip(b"\0").decode() for i in range(rows)]
+        code = {"<f8": "d", "<i4": "i", "<i8": "q", "<M8[s]": "q"}[dtype]
+        return dtype, list(struct.unpack(f"<{rows}{code}", data))
+    
+    def test_export_orders_streams_columnar_files(self):
+        """Test that orders and line items are exported in chunks to CSV.gz and .npy columns"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        self.data_store.data["orders"] = {}
+        self.data_store.save_data()
+        for quantity in (1, 2, 3):
+            self.order_manager.create_order(
+                customer.id, [{"item_id": self.pizza.id, "quantity": quantity}], OrderType.TAKEAWAY
+            )
+        # One old order that date filters should leave out
+        orders = self.data_store.get_orders()
+        old_id = next(iter(orders))
+        orders[old_id]["created_at"] = "2020-01-01 12:00:00"
+        self.data_store.save_data()
+        
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        
+        # A chunk size of 1 still exports every order
+        self.assertEqual(export_orders(output_dir, chunk_size=1, data_store=self.data_store), (3, 3))
+        
+        with gzip.open(os.path.join(output_dir, "orders.csv.gz"), "rt", newline="") as f:
+            exported = list(csv.DictReader(f))
+        self.assertEqual(exported[0]["id"], old_id)
+        self.assertEqual(sorted(float(row["total_amount"]) for row in exported), [12.99, 25.98, 38.97])
+        
+        dtype, ids = self._read_npy(os.path.join(output_dir, "orders", "id.npy"))
+        self.assertEqual((dtype, ids), ("|S36", [row["id"] for row in exported]))
+        dtype, created = self._read_npy(os.path.join(output_dir, "orders", "created_at.npy"))
+        self.assertEqual(created[0], 1577880000)
+        dtype, quantities = self._read_npy(os.path.join(output_dir, "order_items", "quantity.npy"))
+        self.assertEqual(sorted(quantities), [1, 2, 3])
+        
+        # Only orders created in the range are exported
+        self.assertEqual(export_orders(output_dir, created_from="2021-01-01", formats=("npy",),
+                                       data_store=self.data_store), (2, 2))
+        self.assertEqual(len(self._read_npy(os.path.join(output_dir, "orders", "id.npy"))[1]), 2)
+        self.assertEqual(export_orders(output_dir, created_to="2021-01-01", formats=("csv",),
+                                       data_store=self.data_store), (1, 1))
+
+    def test_kitchen_scheduler_orders_by_slack_and_capacity(self):
+        """Test that the kitchen cooks least-slack orders first and respects station capacity"""
+        kitchen = KitchenScheduler(stations=1, clock=lambda: 0)
+        kitchen.enqueue("relaxed", 10, 3600)
+        kitchen.enqueue("urgent", 20, 1800)
+        kitchen.enqueue("quick", 5, 1800)
+        
+        self.assertEqual(kitchen.queued(), ["urgent", "quick", "relaxed"])
+        self.assertEqual(kitchen.estimate_ready_times(), {"urgent": 1200, "quick": 1500, "relaxed": 2100})
+        self.assertEqual(kitchen.estimate_wait(5), 2400)
+        
+        # One station: nothing else starts until the first order is done
+        self.assertEqual(kitchen.start(), "urgent")
+        self.assertIsNone(kitchen.start())
+        kitchen.complete("urgent")
+        self.assertEqual(kitchen.start(), "quick")
+        
+        # Over capacity, the first order to finish only brings the kitchen back to its stations
+        busy = KitchenScheduler(stations=2, clock=lambda: 0)
+        for order_id, prep_minutes in (("a", 10), ("b", 20), ("c", 30)):
+            busy.enqueue(order_id, prep_minutes, 3600)
+            busy.start(order_id)
+        busy.enqueue("next", 5, 3600)
+        self.assertEqual(busy.estimate_ready_times()["next"], 1500)
+        
+        # On a busy line the scheduler keeps more orders on time than first-come first-served
+        orders = [(i * 240, 5 + (i * 7) % 20, i * 240 + (20 + (i * 11) % 40) * 60) for i in range(60)]
+        fifo = simulate(orders, stations=2, policy="fifo")
+        priority = simulate(orders, stations=2, policy="priority")
+        self.assertEqual(fifo["completed"], priority["completed"])
+        self.assertGreaterEqual(priority["on_time_rate"], fifo["on_time_rate"])
+
+    def test_kitchen_queue_feeds_order_etas(self):
+        """Test that confirmed orders get queue-based ETAs that move as the kitchen queue changes"""
+        self.data_store.data = self.data_store._load_data()
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        order_manager = OrderManager(kitchen_stations=1)
+        
+        _, first = order_manager.create_order(customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY)
+        _, second = order_manager.create_order(customer.id, [{"item_id": self.pizza.id, "quantity": 1}], OrderType.TAKEAWAY)
+        order_manager.update_order_status(first.id, OrderStatus.CONFIRMED)
+        order_manager.update_order_status(second.id, OrderStatus.CONFIRMED)
+        
+        # The second pizza waits for the only station
+        now = time.time()
+        self.assertAlmostEqual(order_manager.get_order(second.id).estimated_delivery_time, now + 24 * 60, delta=5)
+        self.assertEqual(order_manager.start_next_preparation(), (True, first.id))
+        self.assertEqual(order_manager.start_next_preparation(), (False, "All kitchen stations are busy"))
+        
+        # Cancelling the first order moves the second one up, and the new ETA is saved
+        order_manager.update_order_status(first.id, OrderStatus.CANCELLED)
+        saved = self.data_store._load_data()["orders"][second.id]
+        self.assertAlmostEqual(float(saved["estimated_delivery_time"]), now + 12 * 60, delta=5)
+
+    def test_plan_route_finds_short_drop_order(self):
+        """Test that nearest neighbour plus 2-opt matches the best drop order on small batches"""
+        import itertools
+        import random
+        rng = random.Random(3)
+        start = (17.385, 78.4867)
+        for _ in range(20):
+            stops = {i: (17.385 + rng.uniform(-0.05, 0.05), 78.4867 + rng.uniform(-0.05, 0.05)) for i in range(5)}
+            route = plan_route(start, stops)
+            self.assertEqual(sorted(route), sorted(stops))
+            best = min(route_length_km(start, [stops[i] for i in order]) for order in itertools.permutations(stops))
+            # 2-opt is a heuristic, but on five drops it stays within a few percent of the optimum
+            self.assertLessEqual(route_length_km(start, [stops[i] for i in route]), best * 1.05)
+
+    def test_dispatch_batches_ready_orders(self):
+        """Test that neighbouring ready orders share one agent, who stays busy until the last drop"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        orders = OrderManager("batching")
+        delivery = DeliveryManager("batching")
+        wrap = MenuManager("batching").add_item("Batch Wrap", "", 6.0, "Main")
+        UserManager("batching").register_user("batch_agent", "password", UserRole.DELIVERY_AGENT, "Batch Agent")
+        
+        placed = []
+        for address in ("Banjara Hills", "Jubilee Hills", "Charminar"):
+            _, order = orders.create_order(customer.id, [{"item_id": wrap.id, "quantity": 1}], OrderType.DELIVERY, address)
+            placed.append(order.id)
+        for status in (OrderStatus.CONFIRMED, OrderStatus.PREPARING, OrderStatus.READY):
+            orders.bulk_update_order_status(placed[:2], status)
+        
+        success, dispatched = delivery.dispatch_ready_orders(max_batch=3, radius_km=4.0)
+        self.assertTrue(success)
+        self.assertEqual(len(dispatched), 1)
+        agent_id, route = dispatched[0]
+        # Drops are ordered from the restaurant outwards
+        self.assertEqual(route, placed[:2])
+        
+        # Only one agent, so an order that becomes ready later waits for the next dispatch
+        orders.update_order_status(placed[2], OrderStatus.READY)
+        self.assertIsNone(orders.get_order(placed[2]).delivery_agent_id)
+        self.assertEqual(delivery.dispatch_ready_orders(), (True, []))
+        
+        orders.update_order_status(placed[0], OrderStatus.DELIVERED)
+        agent = self.data_store._load_data()["delivery_agents"][agent_id]
+        self.assertEqual((agent["status"], agent["current_order"]), ("busy", placed[1]))
+        orders.update_order_status(placed[1], OrderStatus.DELIVERED)
+        agent = self.data_store._load_data()["delivery_agents"][agent_id]
+        self.assertEqual((agent["status"], agent["current_order"], json.loads(agent["route"])), ("available", None, []))
+
+    def test_headless_session_runs_and_replays_scripts(self):
+        """Test that scripted actions drive the CLI screens and recorded sessions replay onto new orders"""
+        import io
+        script = [
+            {"action": "login", "inputs": ["test_customer", "password"]},
+            {"action": "place_order", "inputs": ["{item:Test Pizza}", "2", "done", "2"]},
+            {"action": "logout"},
+            {"action": "login", "inputs": ["test_manager", "password"]},
+            {"action": "update_status", "inputs": ["{order:-1}", "1"]},
+            {"action": "track_order", "inputs": ["{order:-1}"]},
+            {"action": "logout"}
+        ]
+        recording = io.StringIO()
+        session = HeadlessSession()
+        session.app._record_file = recording
+        errors = []
+        self.assertEqual(session.run(script, on_error=lambda n, action, error: errors.append((n, error))), 7)
+        
+        # Tracking is a customer screen, so the manager cannot run it
+        self.assertEqual(errors, [(6, "Action track_order is not available to restaurant_manager")])
+        report = session.report()
+        self.assertEqual((report["login"]["count"], report["login"]["errors"]), (2, 0))
+        self.assertEqual(report["track_order"]["errors"], 1)
+        order = self.order_manager.get_order(session.placed_orders[0])
+        self.assertEqual((order.status, order.items[0]["quantity"]), (OrderStatus.CONFIRMED, 2))
+        
+        # The recording holds the actions that ran, with resolved inputs
+        recorded = [json.loads(line) for line in recording.getvalue().splitlines()]
+        self.assertEqual([entry["action"] for entry in recorded],
+                         ["login", "place_order", "logout", "login", "update_status", "logout"])
+        self.assertEqual(recorded[1]["order_id"], order.id)
+        self.assertEqual(recorded[4]["inputs"], [order.id, "1"])
+        
+        # Replaying it creates and confirms a new order
+        replay = HeadlessSession()
+        self.assertEqual(replay.run(recorded, speed=1000), 6)
+        self.assertEqual(replay.errors, {})
+        replayed = self.order_manager.get_order(replay.placed_orders[0])
+        self.assertNotEqual(replayed.id, order.id)
+        self.assertEqual(replayed.status, OrderStatus.CONFIRMED)
+
+    def test_reports_run_on_read_only_connections(self):
+        """Test that reports read through their own read-only pool and stay within their time budget"""
+        success, customer = self.user_manager.authenticate("test_customer", "password")
+        orders = OrderManager("reporting")
+        fries = MenuManager("reporting").add_item("Report Fries", "", 4.0, "Starter")
+        placed = [orders.create_order(customer.id, [{"item_id": fries.id, "quantity": quantity}], OrderType.TAKEAWAY)[1]
+                  for quantity in (1, 2, 3)]
+        orders.update_order_status(placed[0].id, OrderStatus.CANCELLED)
+        
+        pool = self.data_store.get_reporting_pool()
+        summary = Reports(pool, "reporting").order_summary()
+        self.assertEqual((summary["orders"], summary["revenue"]), (2, 20.0))
+        self.assertEqual(summary["by_status"]["cancelled"], {"orders": 1, "revenue": 4.0})
+        self.assertEqual(sorted(row["id"] for row in Reports(pool, "reporting").orders()),
+                         sorted(order.id for order in placed))
+        
+        # Report connections cannot write
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.query("DELETE FROM orders")
+        
+        # A runaway query is stopped at its budget, and a busy pool turns reports away
+        runaway = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+        start = time.perf_counter()
+        with self.assertRaises(ReportTimeout):
+            pool.query(runaway, budget=0.05)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        
+        small_pool = ReadOnlyPool(self.test_db_file, size=1, budget=0.05)
+        with small_pool.connection():
+            with self.assertRaises(ReportTimeout):
+                small_pool.query("SELECT 1")
+        self.assertEqual(small_pool.query("SELECT 1")[0][0], 1)
+        small_pool.close()
+        
+        # Paused exports hold no connection between chunks, so reports still get one straight away
+        exports = [self.data_store.iter_order_rows(chunk_size=1, restaurant_id="reporting") for _ in range(3)]
+        first_chunks = [next(export) for export in exports]
+        self.assertEqual(Reports(pool, "reporting").order_summary()["orders"], 2)
+        exported = [row["id"] for row in first_chunks[0]] + [row["id"] for chunk in exports[0] for row in chunk]
+        self.assertEqual(exported, [row["id"] for row in pool.query(
+            "SELECT id FROM orders WHERE restaurant_id = 'reporting' ORDER BY created_at, id")])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
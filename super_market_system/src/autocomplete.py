@@ -0,0 +1,216 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import re
+from product import Product
+from product_search import ProductIndex
+
+# Completions each trie node keeps ready, and so the most suggest() can return
+SUGGESTIONS = 5
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase text with runs of whitespace collapsed to one space and no leading space"""
+    return WHITESPACE.sub(" ", text.lower()).lstrip()
+
+
+class _Node:
+    __slots__ = ("children", "word", "score", "top")
+
+    def __init__(self):
+        self.children: Dict[str, Tuple[str, '_Node']] = {}  # first character -> (edge label, child)
+        self.word: Optional[str] = None  # the completion ending here, if any
+        self.score = 0
+        self.top: List[Tuple[int, str]] = []  # best (-score, word) in this subtree, best first
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = 0
+    for char_a, char_b in zip(a, b):
+        if char_a != char_b:
+            break
+        length += 1
+    return length
+
+
+class PrefixTrie:
+    """A radix trie of scored completions whose nodes hold their subtree's best completions.
+
+    Edges carry whole strings, so a node only exists where completions branch
+    or end. Changing a completion refreshes the nodes on its path from their
+    children's lists, and a lookup walks the prefix and returns the list it
+    lands on.
+    """
+
+    def __init__(self, k: int = SUGGESTIONS):
+        self.k = k
+        self._root = _Node()
+        self.size = 0
+
+    def _refresh(self, node: _Node) -> None:
+        entries = [(-node.score, node.word)] if node.word is not None else []
+        for _, child in node.children.values():
+            entries.extend(child.top)
+        node.top = heapq.nsmallest(self.k, entries)
+
+    def set(self, word: str, score: int, refresh: bool = True) -> None:
+        """Add a completion or change its score; with refresh=False call refresh_all() afterwards"""
+        node = self._root
+        path = [node]
+        rest = word
+        while rest:
+            edge = node.children.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.children[rest[0]] = (rest, child)
+                node = child
+                path.append(node)
+                break
+            label, child = edge
+            common = _common_prefix_length(label, rest)
+            if common < len(label):
+                # Split the edge where the new completion leaves it
+                middle = _Node()
+                middle.children[label[common]] = (label[common:], child)
+                node.children[rest[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            path.append(node)
+            rest = rest[common:]
+
+        if node.word is None:
+            self.size += 1
+        node.word = word
+        node.score = score
+        if refresh:
+            for node in reversed(path):
+                self._refresh(node)
+
+    def remove(self, word: str) -> None:
+        """Drop a completion, pruning the nodes it no longer needs"""
+        node = self._root
+        path = []  # (parent, first character of the edge, node)
+        rest = word
+        while rest:
+            edge = node.children.get(rest[0])
+            if edge is None or not rest.startswith(edge[0]):
+                return
+            path.append((node, rest[0], edge[1]))
+            node = edge[1]
+            rest = rest[len(edge[0]):]
+        if node.word is None:
+            return
+
+        node.word = None
+        node.score = 0
+        self.size -= 1
+        for parent, key, child in reversed(path):
+            if child.word is None and not child.children:
+                del parent.children[key]
+            elif child.word is None and len(child.children) == 1:
+                # Merge a node that no longer branches into the edge above it
+                (label, grandchild), = child.children.values()
+                parent.children[key] = (parent.children[key][0] + label, grandchild)
+            else:
+                self._refresh(child)
+        self._refresh(self._root)
+
+    def refresh_all(self) -> None:
+        """Recompute every node's best completions, children first"""
+        stack = [(self._root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._refresh(node)
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for _, child in node.children.values())
+
+    def complete(self, prefix: str, k: Optional[int] = None) -> List[str]:
+        """The best completions starting with prefix, best first (ties alphabetical)"""
+        node = self._root
+        rest = prefix
+        while rest:
+            edge = node.children.get(rest[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if label.startswith(rest):
+                # The prefix ends part way along this edge
+                node = child
+                break
+            if not rest.startswith(label):
+                return []
+            node = child
+            rest = rest[len(label):]
+        return [word for _, word in node.top[:self.k if k is None else k]]
+
+
+class AutocompleteIndex(ProductIndex):
+    """Suggestions for product names and categories, most popular first.
+
+    A completion's popularity is the number of units sold of the products
+    with that name or in that category. Sales survive re-indexing, so
+    reassigning the product list keeps them.
+    """
+
+    def __init__(self, products: Iterable[Product] = (), k: int = SUGGESTIONS):
+        self.k = k
+        self._sales: Dict[str, int] = {}  # product_id -> units sold
+        self._bulk = False
+        super().__init__(products)
+
+    def _clear(self) -> None:
+        self._trie = PrefixTrie(self.k)
+        self._weights: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+
+    def reset(self, products: Iterable[Product]) -> None:
+        # Build the trie in one pass instead of refreshing paths per product
+        self._bulk = True
+        try:
+            super().reset(products)
+        finally:
+            self._bulk = False
+        self._trie.refresh_all()
+
+    def _completions(self, name: str, category: str) -> Set[str]:
+        return {completion for completion in (normalize(name), normalize(category)) if completion}
+
+    def _adjust(self, completion: str, products: int, units: int) -> None:
+        self._counts[completion] = self._counts.get(completion, 0) + products
+        self._weights[completion] = self._weights.get(completion, 0) + units
+        if self._counts[completion] > 0:
+            self._trie.set(completion, self._weights[completion], refresh=not self._bulk)
+        else:
+            del self._counts[completion]
+            del self._weights[completion]
+            self._trie.remove(completion)
+
+    def _index(self, doc: int, name: str, category: str) -> None:
+        units = self._sales.get(self._products[doc].product_id, 0)
+        for completion in self._completions(name, category):
+            self._adjust(completion, 1, units)
+
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        units = self._sales.get(self._products[doc].product_id, 0)
+        for completion in self._completions(name, category):
+            self._adjust(completion, -1, -units)
+
+    def record_sale(self, product: Product, quantity: int) -> None:
+        """Count units of a product sold towards its name's and category's popularity"""
+        self._sales[product.product_id] = self._sales.get(product.product_id, 0) + quantity
+        doc = self._doc_ids.get(id(product))
+        if doc is not None:
+            for completion in self._completions(*self._texts[doc]):
+                self._adjust(completion, 0, quantity)
+
+    def set_sales(self, sales: Dict[str, int]) -> None:
+        """Replace the units sold per product id and re-rank every completion"""
+        self._sales = dict(sales)
+        self.reset([self._products[doc] for doc in sorted(self._products)])
+
+    def suggest(self, prefix: str, k: Optional[int] = None) -> List[str]:
+        """Up to k (at most SUGGESTIONS) completions of prefix, most popular first"""
+        return self._trie.complete(normalize(prefix), k)
@@ -0,0 +1,491 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+import estore
+from estore import EStore
+from journal import FSYNC_POLICIES
+from product import Product
+from customer import Customer
+
+
+def _fresh_store(directory: str, storage: str = "json") -> EStore:
+    """Create an EStore whose data directory lives under `directory`"""
+    # EStore reads and writes data/ in the working directory
+    os.chdir(directory)
+    EStore._instance = None
+    return EStore.get_instance(storage)
+
+
+def benchmark_lookups(num_products: int = 100000, num_users: int = 10000, lookups: int = 20000,
+                      seed: int = 42) -> None:
+    """Compare linear-scan and indexed get_product / get_user on a large catalogue"""
+    rng = random.Random(seed)
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            store = _fresh_store(directory)
+            store.products = [Product(f"Product {i}", f"Category {i % 50}", rng.uniform(1, 500), rng.randint(0, 100))
+                              for i in range(num_products)]
+            store.users = [Customer(f"Customer {i}", f"customer{i}@example.com", "password")
+                           for i in range(num_users)]
+            product_ids = [rng.choice(store.products).product_id for _ in range(lookups)]
+            emails = [f"customer{rng.randrange(num_users)}@example.com" for _ in range(lookups)]
+
+            def linear_product(product_id):
+                for product in store.products:
+                    if product.product_id == product_id:
+                        return product
+                return None
+
+            def linear_user(email):
+                for user in store.users:
+                    if user.email == email:
+                        return user
+                return None
+
+            def run(label, lookup, keys, sample):
+                # The linear scan is timed on a sample so the benchmark finishes in reasonable time
+                keys = keys[:sample]
+                start = time.perf_counter()
+                for key in keys:
+                    assert lookup(key) is not None
+                elapsed = time.perf_counter() - start
+                print(f"{label:<22} {elapsed / len(keys) * 1e6:>12.2f} us/lookup")
+
+            print(f"\n== Lookups: {num_products} products, {num_users} users ==")
+            run("get_product linear", linear_product, product_ids, 200)
+            run("get_product indexed", store.get_product, product_ids, lookups)
+            run("get_user linear", linear_user, emails, 2000)
+            run("get_user indexed", store.get_user, emails, lookups)
+        finally:
+            os.chdir(previous_dir)
+            EStore._instance = None
+
+
+def _write_history(num_orders: int, num_customers: int, seed: int) -> None:
+    """Write data/*.json with customers and orders, each order with a payment and a delivery"""
+    rng = random.Random(seed)
+    customers = [Customer(f"Customer {i}", f"customer{i}@example.com", "password").to_dict()
+                 for i in range(num_customers)]
+    products = [Product(f"Product {i}", "General", 10.0, 100).to_dict() for i in range(1000)]
+    orders, payments, deliveries = [], [], []
+    for _ in range(num_orders):
+        order_id, payment_id, delivery_id = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+        payments.append({"payment_id": payment_id, "order_id": order_id, "method": "Credit Card",
+                         "status": "Completed"})
+        deliveries.append({"delivery_id": delivery_id, "order_id": order_id, "status": "Processing",
+                           "expected_date": "2025-01-01"})
+        orders.append({
+            "order_id": order_id,
+            "customer_id": rng.choice(customers)["user_id"],
+            "items": [{"product_id": rng.choice(products)["product_id"], "quantity": 1}],
+            "payment_method": "Credit Card",
+            "status": "Confirmed",
+            "total_price": 10.0,
+            "date": "2024-12-29 12:00:00",
+            "discount_applied": None,
+            "payment_id": payment_id,
+            "delivery_id": delivery_id
+        })
+
+    os.makedirs("data", exist_ok=True)
+    for name, records in (("users", customers), ("products", products), ("orders", orders),
+                          ("payments", payments), ("deliveries", deliveries), ("discounts", [])):
+        with open(f"data/{name}.json", "w") as f:
+            json.dump(records, f)
+
+
+def benchmark_load(order_counts=(10000, 100000, 1000000), seed: int = 42) -> None:
+    """Time EStore startup (load_data) as the order history grows"""
+    previous_dir = os.getcwd()
+    print("\n== Startup load ==")
+    for num_orders in order_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                os.chdir(directory)
+                _write_history(num_orders, max(1, num_orders // 20), seed)
+                EStore._instance = None
+                start = time.perf_counter()
+                store = EStore.get_instance()
+                elapsed = time.perf_counter() - start
+                linked = sum(1 for order in store.orders if order.payment and order.delivery)
+                print(f"{num_orders:>9} orders {elapsed:>8.2f} s {elapsed / num_orders * 1e6:>8.2f} us/order "
+                      f"({linked} fully linked)")
+            finally:
+                os.chdir(previous_dir)
+                EStore._instance = None
+
+
+def benchmark_persistence(catalog_sizes=(1000, 10000, 100000), mutations: int = 200) -> None:
+    """Per-mutation cost of add_product (journal or SQLite) against rewriting every file, as the catalogue grows"""
+    previous_dir = os.getcwd()
+    previous_fsync = estore.JOURNAL_FSYNC
+    print(f"\n== Persistence: add_product, mean of {mutations} ==")
+    for num_products in catalog_sizes:
+        for storage, fsync in [("json", fsync) for fsync in FSYNC_POLICIES] + [("sqlite", None)]:
+            with tempfile.TemporaryDirectory() as directory:
+                try:
+                    estore.JOURNAL_FSYNC = fsync or previous_fsync
+                    store = _fresh_store(directory, storage)
+                    store.products = [Product(f"Product {i}", "General", 10.0, 100) for i in range(num_products)]
+                    store.compact()
+
+                    start = time.perf_counter()
+                    for i in range(mutations):
+                        store.add_product(Product(f"New product {i}", "General", 10.0, 100))
+                    elapsed = time.perf_counter() - start
+                    label = f"journal fsync={fsync}" if fsync else storage
+                    print(f"{num_products:>7} products {label:<22} {elapsed / mutations * 1000:>9.3f} ms/mutation")
+
+                    if fsync == FSYNC_POLICIES[-1]:
+                        # What every mutation used to cost
+                        start = time.perf_counter()
+                        store.save_data()
+                        print(f"{num_products:>7} products {'full rewrite':<22} "
+                              f"{(time.perf_counter() - start) * 1000:>9.3f} ms/mutation")
+                finally:
+                    if store.database:
+                        store.database.close()
+                    os.chdir(previous_dir)
+                    estore.JOURNAL_FSYNC = previous_fsync
+                    EStore._instance = None
+
+
+BRANDS = ["Acme", "Dolly", "Brightline", "Kiddo", "Nordic", "Sunny", "Tinker", "Vista", "Maple", "Orbit"]
+ADJECTIVES = ["red", "blue", "green", "soft", "large", "small", "wooden", "classic", "deluxe", "mini",
+              "organic", "dark", "crunchy", "wireless", "portable", "golden", "silver", "fluffy"]
+NOUNS = ["teddy bear", "doll", "ball", "kite", "puzzle", "chocolate", "cookie", "headphones", "speaker",
+         "notebook", "pencil", "backpack", "lamp", "mug", "blanket", "robot", "train set", "tea", "coffee"]
+CATEGORIES = ["Toys", "Food", "Electronics", "Stationery", "Home", "Clothing", "Books", "Garden"]
+
+
+def _catalogue(num_products: int, seed: int = 42):
+    """Products named like "Acme wooden puzzle K7-4821" across a handful of categories"""
+    rng = random.Random(seed)
+    return [Product(f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} "
+                    f"{rng.choice('ABCDEFGHJK')}{rng.randint(1, 9)}-{rng.randint(1000, 9999)}",
+                    rng.choice(CATEGORIES), round(rng.uniform(1, 500), 2), rng.randint(0, 100))
+            for _ in range(num_products)]
+
+
+def benchmark_search(num_products: int = 1000000, seed: int = 42) -> None:
+    """Compare scanning and trigram-indexed search_product on a large catalogue"""
+    previous_dir = os.getcwd()
+    queries = ["k7-48", "B3-1234", "acme wooden puzzle", "fluffy teddy", "chocolate", "garden", "zebra", "tv"]
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            store = _fresh_store(directory)
+            products = _catalogue(num_products, seed)
+            start = time.perf_counter()
+            store.products = products
+            print(f"\n== Search: {num_products} products (indexed in {time.perf_counter() - start:.1f} s) ==")
+
+            def scan(query):
+                query = query.lower()
+                return [product for product in store.products
+                        if query in product.name.lower() or query in product.category.lower()]
+
+            for query in queries:
+                start = time.perf_counter()
+                expected = scan(query)
+                scanned = time.perf_counter() - start
+                # Right after the scan, then the median of repeats with the index in cache
+                timings = []
+                for _ in range(5):
+                    start = time.perf_counter()
+                    results = store.search_product(query)
+                    timings.append(time.perf_counter() - start)
+                assert results == expected
+                print(f"{query!r:<22} {len(results):>8} results  scan {scanned * 1000:>9.2f} ms  "
+                      f"index {timings[0] * 1000:>9.3f} ms first {sorted(timings)[2] * 1000:>9.3f} ms median")
+        finally:
+            os.chdir(previous_dir)
+            EStore._instance = None
+
+
+def benchmark_fuzzy(num_products: int = 1000000, seed: int = 42) -> None:
+    """Time typo-tolerant search, against comparing the query with every indexed word"""
+    from product_search import edit_distance, typo_allowance, tokens
+
+    previous_dir = os.getcwd()
+    queries = ["chocolte", "teddy baer", "wireles headphnes", "acme wooden puzle", "k7 4821", "zebra"]
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            store = _fresh_store(directory)
+            store.products = _catalogue(num_products, seed)
+            vocabulary = list(store.fuzzy_search._postings)
+            print(f"\n== Fuzzy search: {num_products} products, {len(vocabulary)} distinct words ==")
+
+            for query in queries:
+                start = time.perf_counter()
+                for word in tokens(query):
+                    [other for other in vocabulary if edit_distance(word, other) <= typo_allowance(word)]
+                brute = time.perf_counter() - start
+
+                start = time.perf_counter()
+                results = store.search_product(query, fuzzy=True, limit=10)
+                elapsed = time.perf_counter() - start
+                top = results[0].name if results else "-"
+                print(f"{query!r:<22} word matching every word {brute * 1000:>8.1f} ms  "
+                      f"fuzzy search {elapsed * 1000:>8.1f} ms  top: {top}")
+        finally:
+            os.chdir(previous_dir)
+            EStore._instance = None
+
+
+def benchmark_autocomplete(num_products: int = 1000000, sales: int = 100000, seed: int = 42) -> None:
+    """Time prefix suggestions and sale updates on a large catalogue, against scanning every name"""
+    from autocomplete import AutocompleteIndex, normalize
+
+    rng = random.Random(seed)
+    products = _catalogue(num_products, seed)
+    start = time.perf_counter()
+    index = AutocompleteIndex(products)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(sales):
+        index.record_sale(rng.choice(products), rng.randint(1, 3))
+    per_sale = (time.perf_counter() - start) / sales
+    print(f"\n== Autocomplete: {num_products} products (built in {built:.1f} s, "
+          f"{index._trie.size} completions), {per_sale * 1e6:.1f} us per recorded sale ==")
+
+    for prefix in ["a", "ac", "acme w", "acme wooden p", "nordic blue tea k7-4", "ele", "zz"]:
+        start = time.perf_counter()
+        names = {}
+        for product in products:
+            for completion in (normalize(product.name), normalize(product.category)):
+                if completion.startswith(prefix):
+                    names[completion] = names.get(completion, 0) + index._sales.get(product.product_id, 0)
+        expected = [name for _, name in sorted((-units, name) for name, units in names.items())[:5]]
+        scanned = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            suggestions = index.suggest(prefix)
+        elapsed = (time.perf_counter() - start) / 1000
+        assert suggestions == expected
+        print(f"{prefix!r:<24} scan {scanned * 1000:>9.1f} ms  trie {elapsed * 1e6:>7.1f} us  {suggestions[:2]}")
+
+
+def benchmark_browse(num_products: int = 1000000, updates: int = 10000, seed: int = 42) -> None:
+    """Time price-range, sort-by-price and category-count queries, against scanning and sorting the catalogue"""
+    from price_index import PriceIndex
+
+    rng = random.Random(seed)
+    products = _catalogue(num_products, seed)
+    start = time.perf_counter()
+    index = PriceIndex(products)
+    print(f"\n== Browse: {num_products} products (indexed in {time.perf_counter() - start:.1f} s) ==")
+
+    queries = [("Electronics", None, 200.0, False), ("Toys", 100.0, 101.0, False), (None, 499.0, None, False),
+               (None, None, None, True), ("Garden", None, None, True)]
+    for category, min_price, max_price, descending in queries:
+        start = time.perf_counter()
+        expected = sorted((product for product in products
+                           if (category is None or product.category == category)
+                           and (min_price is None or product.price >= min_price)
+                           and (max_price is None or product.price <= max_price)),
+                          key=lambda product: product.price, reverse=descending)[:20]
+        scanned = time.perf_counter() - start
+        start = time.perf_counter()
+        results = index.browse(category, min_price, max_price, descending=descending, limit=20)
+        browsed = time.perf_counter() - start
+        start = time.perf_counter()
+        total = index.count(category, min_price, max_price)
+        counted = time.perf_counter() - start
+        assert [product.price for product in results] == [product.price for product in expected]
+        order = "dearest" if descending else "cheapest"
+        print(f"{str(category):<12} {str(min_price):>6}-{str(max_price):<6} {total:>8} matches  "
+              f"scan+sort {scanned * 1000:>7.1f} ms  {order} 20 {browsed * 1e6:>6.1f} us  count {counted * 1e6:>5.1f} us")
+
+    start = time.perf_counter()
+    expected = {}
+    for product in products:
+        if product.price <= 100:
+            expected[product.category] = expected.get(product.category, 0) + 1
+    scanned = time.perf_counter() - start
+    start = time.perf_counter()
+    assert index.facets(max_price=100) == dict(sorted(expected.items()))
+    print(f"category counts under $100: scan {scanned * 1000:.1f} ms  index {(time.perf_counter() - start) * 1e6:.1f} us")
+
+    changed = rng.sample(products, updates)
+    start = time.perf_counter()
+    for product in changed:
+        product.price = round(rng.uniform(1, 500), 2)
+        product.stock = rng.randint(0, 3)
+        index.update(product)
+    print(f"price and stock updates: {(time.perf_counter() - start) / updates * 1e6:.1f} us each")
+
+
+def benchmark_paging(num_products: int = 200000, seed: int = 42) -> None:
+    """Time listing one page of products against formatting the whole catalogue, and walking every page"""
+    from dollmart_main import ProductPager
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            store = _fresh_store(directory)
+            store.products = _catalogue(num_products, seed)
+
+            def describe(number, product):
+                print(f"{number}. {product.name} - ${product.price:.2f} ({product.stock} in stock)")
+
+            stdout, sys.stdout = sys.stdout, io.StringIO()
+            try:
+                start = time.perf_counter()
+                for number, product in enumerate(store.products, 1):
+                    describe(number, product)
+                everything = time.perf_counter() - start
+                start = time.perf_counter()
+                ProductPager(store.products_after, describe).show()
+                first_page = time.perf_counter() - start
+            finally:
+                sys.stdout = stdout
+            print(f"\n== Paging: {num_products} products ==")
+            print(f"list every product {everything * 1000:>9.1f} ms  first page {first_page * 1000:>7.3f} ms")
+
+            pages, cursor = 0, None
+            start = time.perf_counter()
+            while True:
+                page, cursor = store.products_after(cursor)
+                pages += 1
+                if cursor is None:
+                    break
+            walked = time.perf_counter() - start
+            start = time.perf_counter()
+            for offset in range(0, num_products, num_products // 100):
+                store.page_products(offset)
+            print(f"cursor pages {walked / pages * 1e6:>6.1f} us each ({pages} pages)  "
+                  f"offset pages {(time.perf_counter() - start) / 100 * 1e6:>6.1f} us each")
+
+            # Deleting products between requests leaves cursors valid
+            for product in store.products[::2][:num_products // 4]:
+                store.products.remove(product)
+            pages, cursor = 0, None
+            start = time.perf_counter()
+            while True:
+                page, cursor = store.products_after(cursor)
+                pages += 1
+                if cursor is None:
+                    break
+            print(f"after deleting {num_products // 4}: cursor pages "
+                  f"{(time.perf_counter() - start) / pages * 1e6:.1f} us each ({pages} pages)")
+        finally:
+            os.chdir(previous_dir)
+            EStore._instance = None
+
+
+def benchmark_reservations(thread_counts=(1, 2, 4, 8, 16), checkouts: int = 2000, num_products: int = 200,
+                           stock: int = 20, payment_latency: float = 0.002, abandon_rate: float = 0.1,
+                           seed: int = 42) -> None:
+    """Race checkouts across threads: unlocked check-then-take, one global lock, and stock reservations.
+
+    Each checkout picks a cart (some products far more popular than others),
+    secures the stock, waits payment_latency for the payment, then takes
+    the stock, or abandons the cart at abandon_rate. With reservations the
+    stock is taken by Customer.place_order, so orders are processed and
+    journalled from every thread.
+    """
+    import threading
+    from stock_reservations import StockReservations
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            store = _fresh_store(directory)
+
+            def unlocked(cart, abandon):
+                # The old place_order: every line is checked, then every line taken
+                products = [(store.get_product(item["product_id"]), item["quantity"]) for item in cart]
+                if any(product.stock < quantity for product, quantity in products):
+                    return False
+                time.sleep(payment_latency)
+                if abandon:
+                    return False
+                for product, quantity in products:
+                    product.stock -= quantity
+                return True
+
+            global_lock = threading.Lock()
+
+            def locked(cart, abandon):
+                # Safe, but the lock is held through the payment
+                with global_lock:
+                    return unlocked(cart, abandon)
+
+            shopper = Customer("Shopper", "shopper@example.com", "password")
+            shopper.login("password")
+
+            def reserved(cart, abandon):
+                try:
+                    reservation = store.reserve_stock(cart)
+                except ValueError:
+                    return False
+                time.sleep(payment_latency)
+                # Abandoned carts are left to expire; the rest are placed as orders end to end
+                return not abandon and shopper.place_order(store, cart, "Credit Card", reservation) is not None
+
+            print(f"\n== Reservations: {checkouts} checkouts, {num_products} products x {stock} units, "
+                  f"{payment_latency * 1000:.0f} ms payment, {abandon_rate:.0%} abandoned ==")
+            for name, checkout in [("unlocked", unlocked), ("global lock", locked), ("reservations", reserved)]:
+                for threads in thread_counts:
+                    store.products = [Product(f"Product {i}", "General", 10.0, stock) for i in range(num_products)]
+                    store.reservations = StockReservations(ttl=payment_latency * 5)
+                    ids = [product.product_id for product in store.products]
+                    sold = dict.fromkeys(ids, 0)
+                    counts = {"orders": 0}
+                    tally = threading.Lock()
+
+                    def worker(index):
+                        rng = random.Random(seed + index)
+                        for _ in range(checkouts // threads):
+                            lines = rng.randint(1, 3)
+                            # A fifth of the products get half the demand
+                            cart = [{"product_id": rng.choice(ids[:num_products // 5] if rng.random() < 0.5 else ids),
+                                     "quantity": rng.randint(1, 2)} for _ in range(lines)]
+                            if checkout(cart, rng.random() < abandon_rate):
+                                with tally:
+                                    counts["orders"] += 1
+                                    for item in cart:
+                                        sold[item["product_id"]] += item["quantity"]
+
+                    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+                    start = time.perf_counter()
+                    # Placing an order prints its progress
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        for thread in workers:
+                            thread.start()
+                        for thread in workers:
+                            thread.join()
+                    elapsed = time.perf_counter() - start
+                    oversold = sum(max(0, units - stock) for units in sold.values())
+                    print(f"{name:<13} {threads:>3} threads  {counts['orders'] / elapsed:>8.0f} orders/s  "
+                          f"{counts['orders']:>5} orders  {sum(sold.values()):>5} units sold  {oversold:>4} oversold")
+        finally:
+            os.chdir(previous_dir)
+            EStore._instance = None
+
+
+BENCHMARKS = {
+    "lookups": benchmark_lookups,
+    "load": benchmark_load,
+    "persistence": benchmark_persistence,
+    "search": benchmark_search,
+    "fuzzy": benchmark_fuzzy,
+    "autocomplete": benchmark_autocomplete,
+    "browse": benchmark_browse,
+    "paging": benchmark_paging,
+    "reservations": benchmark_reservations
+}
+
+if __name__ == "__main__":
+    # Run the named benchmarks, or all of them
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
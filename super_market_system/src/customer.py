@@ -5,29 +5,40 @@ class Customer(User):
         super().__init__(name, email, password)
         self.order_history = []
 
-    def place_order(self, e_store: 'EStore', items: List[Dict], payment_method: str) -> Optional['Order']:
-        """Place a new order"""
+    def place_order(self, e_store: 'EStore', items: List[Dict], payment_method: str,
+                    reservation: Optional['Reservation'] = None) -> Optional['Order']:
+        """Place a new order, taking the stock held by reservation or reserving it now"""
         if not self.is_logged_in:
             print("Please log in to place an order.")
             return None
         from order import Order
-        # Validate items are in stock
-        for item in items:
-            product = e_store.get_product(item["product_id"])
-            if not product:
-                print(f"Product with ID {item['product_id']} not found.")
+        # Hold the stock for every item, or fail without taking any
+        if reservation is None:
+            try:
+                reservation = e_store.reserve_stock(items)
+            except ValueError as error:
+                print(error)
                 return None
-            if product.stock < item["quantity"]:
-                print(f"Insufficient stock for {product.name}. Available: {product.stock}")
+        else:
+            # A reservation made earlier must hold exactly the units ordered
+            quantities = {}
+            for item in items:
+                quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+            if reservation.quantities() != quantities:
+                e_store.release_reservation(reservation)
+                print("Your reserved stock doesn't match the items ordered. Please place the order again.")
                 return None
 
         # Create order
         order = Order(self, items, payment_method)
 
         # Update stock
-        for item in items:
-            product = e_store.get_product(item["product_id"])
-            product.update_stock(-item["quantity"])
+        if not e_store.commit_reservation(reservation):
+            if reservation.short_of:
+                print(f"{reservation.short_of.name} no longer has enough stock. Please place the order again.")
+            else:
+                print("Your reserved stock has expired. Please place the order again.")
+            return None
 
         # Add to order history
         self.order_history.append(order.order_id)
@@ -1,18 +1,78 @@
+import argparse
 import os
 import json
 import uuid
 import datetime
 from abc import ABC, abstractmethod
-from typing import List, Dict, Union, Optional
+from typing import Any, Callable, List, Dict, Union, Optional, Tuple
 from user import User
 from customer import Customer
 from retail_store import RetailStore
 from order import Order
+from product import Product
 from discount import Discount
 from payment import Payment
 from admin import Admin
 from delivery import Delivery
-from estore import EStore
+from estore import EStore, PAGE_SIZE, STORAGE_ENGINE, STORAGE_ENGINES
+from product_search import FUZZY_LIMIT
+
+
+class ProductPager:
+    """Shows products a page at a time and maps the numbers shown back to them.
+
+    fetch(cursor) returns a page of products and the cursor of the next page
+    (None after the last page); the first page is fetched with cursor None.
+    Only the current page is fetched and formatted, and its numbers keep
+    pointing at the same products until the user turns the page.
+    """
+
+    def __init__(self, fetch: Callable[[Any], Tuple[List[Product], Any]], describe: Callable[[int, Product], None]):
+        self._fetch = fetch
+        self._describe = describe
+        self._cursors = [None]  # cursor of each page up to the current one
+        self._starts = [0]  # products before each of those pages
+        self.page, self._next = fetch(None)
+
+    def show(self) -> None:
+        """Print the current page"""
+        for number, product in enumerate(self.page, self._starts[-1] + 1):
+            self._describe(number, product)
+        moves = []
+        if self._next is not None:
+            moves.append("n: next page")
+        if len(self._cursors) > 1:
+            moves.append("p: previous page")
+        print(f"-- Page {len(self._cursors)}" + (f" ({', '.join(moves)})" if moves else "") + " --")
+
+    def choose(self, prompt: str) -> int:
+        """Ask for a product number, turning pages on n and p; raises ValueError for anything else"""
+        while True:
+            choice = input(prompt).strip().lower()
+            if choice == "n" and self._next is not None:
+                self._cursors.append(self._next)
+                self._starts.append(self._starts[-1] + len(self.page))
+            elif choice == "p" and len(self._cursors) > 1:
+                self._cursors.pop()
+                self._starts.pop()
+            else:
+                return int(choice)
+            self.page, self._next = self._fetch(self._cursors[-1])
+            self.show()
+
+    def product(self, number: int) -> Optional[Product]:
+        """The product shown with this number on the current page, or None"""
+        position = number - self._starts[-1] - 1
+        return self.page[position] if 0 <= position < len(self.page) else None
+
+
+def list_pages(products: List[Product]) -> Callable[[Optional[int]], Tuple[List[Product], Optional[int]]]:
+    """A ProductPager fetch over an already computed list, using offsets as cursors"""
+    def fetch(offset: Optional[int]) -> Tuple[List[Product], Optional[int]]:
+        offset = offset or 0
+        end = offset + PAGE_SIZE
+        return products[offset:end], end if end < len(products) else None
+    return fetch
 
 
 class DollMartCLI:
@@ -37,48 +97,50 @@ class DollMartCLI:
             elif choice == "3":
                 self._search_products()
             elif choice == "4":
+                self._browse_products()
+            elif choice == "5":
                 if self._check_login():
                     if isinstance(self.current_user, Customer):
                         self._place_order()
                     else:
                         print("Only customers can place orders.")
-            elif choice == "5":
+            elif choice == "6":
                 if self._check_login():
                     if isinstance(self.current_user, Customer):
                         self.current_user.view_order_history(self.e_store)
                     else:
                         print("Only customers can view order history.")
-            elif choice == "6":
+            elif choice == "7":
                 if self._check_login():
                     if isinstance(self.current_user, RetailStore):
                         self.current_user.manage_products(self.e_store)
                     else:
                         print("Only retail store owners can manage products.")
-            elif choice == "7":
+            elif choice == "8":
                 if self._check_login():
                     if isinstance(self.current_user, RetailStore):
                         self.current_user.view_orders(self.e_store)
                     else:
                         print("Only retail store owners can view orders.")
-            elif choice == "8":
+            elif choice == "9":
                 if self._check_login():
                     if isinstance(self.current_user, RetailStore):
                         self.current_user.manage_delivery(self.e_store)
                     else:
                         print("Only retail store owners can manage deliveries.")
-            elif choice == "9":
-                if self.current_user:
-                    self.current_user.logout()
-                    self.current_user = None
-                    print("Logged out successfully.")
-                else:
-                    print("You are not logged in.")
             elif choice == "10":
                 if self._check_login():
                     if isinstance(self.current_user, Admin):
                         self.current_user.view_retail_stores(self.e_store)
                     else:
                         print("Only admins can view retail stores.")
+            elif choice == "11":
+                if self.current_user:
+                    self.current_user.logout()
+                    self.current_user = None
+                    print("Logged out successfully.")
+                else:
+                    print("You are not logged in.")
             elif choice == "0":
                 print("Thank you for using DollMart CLI. Goodbye!")
                 break
@@ -91,19 +153,20 @@ class DollMartCLI:
         print("1. Register")
         print("2. Login")
         print("3. Search Products")
+        print("4. Browse Products by Category and Price")
 
         if self.current_user:
-            print("4. Place Order")
-            print("5. View Order History")
+            print("5. Place Order")
+            print("6. View Order History")
 
             if isinstance(self.current_user, RetailStore):
-                print("6. Manage Products")
-                print("7. View Orders")
-                print("8. Manage Deliveries")
+                print("7. Manage Products")
+                print("8. View Orders")
+                print("9. Manage Deliveries")
             elif isinstance(self.current_user, Admin):
                 print("10. View Retail Stores")
 
-            print("9. Logout")
+            print("11. Logout")
 
         print("0. Exit")
 
@@ -168,31 +231,86 @@ class DollMartCLI:
     def _search_products(self) -> None:
         """Search for products"""
         print("\n==== Search Products ====")
-        query = input("Enter search query (or leave blank to see all products): ")
-
-        if query:
+        query = input("Enter search query (start with ~ to allow typos, end with * for suggestions, "
+                      "or leave blank to see all products): ")
+
+        if query.endswith("*"):
+            query = self._pick_suggestion(query[:-1])
+            if not query:
+                return
+
+        if query.startswith("~"):
+            # Typo-tolerant search, closest matches first
+            fetch = list_pages(self.e_store.search_product(query[1:], fuzzy=True, limit=FUZZY_LIMIT))
+        elif query:
             products = self.e_store.search_product(query)
+            if not products:
+                # Fall back to the closest spellings
+                products = self.e_store.search_product(query, fuzzy=True, limit=FUZZY_LIMIT)
+                if products:
+                    print(f"No exact matches for '{query}'. Showing closest matches:")
+            fetch = list_pages(products)
         else:
-            products = self.e_store.products
+            fetch = self.e_store.products_after
 
-        if not products:
+        self._show_products(fetch, "Search Results")
+
+    def _browse_products(self) -> None:
+        """Browse products by category and price range, sorted by price"""
+        print("\n==== Browse Products ====")
+        counts = self.e_store.category_counts()
+        categories = list(counts)
+        print(f"0. All categories ({sum(counts.values())})")
+        for i, category in enumerate(categories, 1):
+            print(f"{i}. {category} ({counts[category]})")
+
+        try:
+            choice = int(input("Enter category number: "))
+            if choice < 0 or choice > len(categories):
+                raise ValueError
+            min_price = input("Enter minimum price (or leave blank): ").strip()
+            min_price = float(min_price) if min_price else None
+            max_price = input("Enter maximum price (or leave blank): ").strip()
+            max_price = float(max_price) if max_price else None
+        except ValueError:
+            print("Invalid input.")
+            return
+        descending = input("Sort by price (1. Low to high, 2. High to low): ") == "2"
+        in_stock = input("Only show products in stock? (y/n): ").lower() == "y"
+
+        category = categories[choice - 1] if choice else None
+
+        def fetch(offset: Optional[int]) -> Tuple[List[Product], Optional[int]]:
+            # One extra product tells whether there is a next page
+            offset = offset or 0
+            products = self.e_store.browse_products(category, min_price, max_price, in_stock, descending,
+                                                    limit=PAGE_SIZE + 1, offset=offset)
+            return products[:PAGE_SIZE], offset + PAGE_SIZE if len(products) > PAGE_SIZE else None
+
+        self._show_products(fetch, category or "All Products")
+
+    @staticmethod
+    def _describe_product(number: int, product: Product) -> None:
+        print(f"{number}. {product.name}")
+        print(f"   Category: {product.category}")
+        print(f"   Price: ${product.price:.2f}")
+        print(f"   In Stock: {product.stock}")
+        print("   -------------------")
+
+    def _show_products(self, fetch: Callable, title: str) -> None:
+        """List products a page at a time (see ProductPager) and show the details of the one picked"""
+        pager = ProductPager(fetch, self._describe_product)
+        if not pager.page:
             print("No products found.")
             return
 
-        print("\n==== Search Results ====")
-        for i, product in enumerate(products, 1):
-            print(f"{i}. {product.name}")
-            print(f"   Category: {product.category}")
-            print(f"   Price: ${product.price:.2f}")
-            print(f"   In Stock: {product.stock}")
-            print("   -------------------")
+        print(f"\n==== {title} ====")
+        pager.show()
 
         # View details for a specific product
-        choice = input("Enter product number for details (or 0 to go back): ")
         try:
-            choice = int(choice)
-            if choice > 0 and choice <= len(products):
-                product = products[choice - 1]
+            product = pager.product(pager.choose("Enter product number for details (or 0 to go back): "))
+            if product:
                 print(f"\nProduct ID: {product.product_id}")
                 print(f"Name: {product.name}")
                 print(f"Category: {product.category}")
@@ -201,6 +319,25 @@ class DollMartCLI:
         except ValueError:
             pass
 
+    def _pick_suggestion(self, prefix: str) -> str:
+        """Show completions of a partial query and return the one picked, or "" to go back"""
+        suggestions = self.e_store.suggest_products(prefix)
+        if not suggestions:
+            print("No suggestions found.")
+            return ""
+
+        print("\n==== Suggestions ====")
+        for i, suggestion in enumerate(suggestions, 1):
+            print(f"{i}. {suggestion}")
+
+        try:
+            choice = int(input("Enter suggestion number to search for (or 0 to go back): "))
+        except ValueError:
+            return ""
+        if choice < 1 or choice > len(suggestions):
+            return ""
+        return suggestions[choice - 1]
+
     def _place_order(self) -> None:
         """Place a new order"""
         if not isinstance(self.current_user, Customer):
@@ -209,36 +346,37 @@ class DollMartCLI:
 
         # Display available products
         print("\n==== Available Products ====")
-        products = self.e_store.products
-        if not products:
+        pager = ProductPager(self.e_store.products_after, lambda number, product: print(
+            f"{number}. {product.name} - ${product.price:.2f} ({product.stock} in stock)"))
+        if not pager.page:
             print("No products available.")
             return
+        pager.show()
 
-        for i, product in enumerate(products, 1):
-            print(f"{i}. {product.name} - ${product.price:.2f} ({product.stock} in stock)")
-
-        # Build cart
+        # Build cart; the numbers refer to the page on screen until it is turned
         cart = []
         while True:
             try:
-                product_idx = int(input("\nEnter product number to add to cart (0 to finish): "))
+                product_idx = pager.choose("\nEnter product number to add to cart (0 to finish): ")
                 if product_idx == 0:
                     break
-                if product_idx < 1 or product_idx > len(products):
+                product = pager.product(product_idx)
+                if product is None:
                     print("Invalid product number.")
                     continue
 
-                product = products[product_idx - 1]
-                if product.stock == 0:
+                # Stock held by other checkouts isn't for sale
+                available = self.e_store.available_stock(product)
+                if available == 0:
                     print(f"Sorry, {product.name} is out of stock.")
                     continue
 
-                quantity = int(input(f"Enter quantity for {product.name} (max {product.stock}): "))
+                quantity = int(input(f"Enter quantity for {product.name} (max {available}): "))
                 if quantity <= 0:
                     print("Quantity must be positive.")
                     continue
-                if quantity > product.stock:
-                    print(f"Only {product.stock} available.")
+                if quantity > available:
+                    print(f"Only {available} available.")
                     continue
 
                 cart.append({
@@ -287,6 +425,14 @@ class DollMartCLI:
             print("Order cancelled.")
             return
 
+        # Hold the stock while the payment method is chosen
+        try:
+            reservation = self.e_store.reserve_stock(cart)
+        except ValueError as error:
+            print(error)
+            print("Order cancelled.")
+            return
+
         # Select payment method
         print("\n==== Payment Method ====")
         print("1. Credit Card")
@@ -301,13 +447,14 @@ class DollMartCLI:
         }
 
         if payment_choice not in payment_methods:
+            self.e_store.release_reservation(reservation)
             print("Invalid payment method. Order cancelled.")
             return
 
         payment_method = payment_methods[payment_choice]
 
         # Place order
-        order = self.current_user.place_order(self.e_store, cart, payment_method)
+        order = self.current_user.place_order(self.e_store, cart, payment_method, reservation)
         if order:
             print(f"\nOrder placed successfully!")
             print(f"Order ID: {order.order_id}")
@@ -319,5 +466,11 @@ class DollMartCLI:
 # --- Run the Application ---
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DollMart command line store")
+    parser.add_argument("--storage", choices=STORAGE_ENGINES, default=STORAGE_ENGINE,
+                        help="persist to data/*.json plus a journal, or to data/dollmart.db")
+    args = parser.parse_args()
+
+    EStore.get_instance(args.storage)
     cli = DollMartCLI()
     cli.start()
\ No newline at end of file
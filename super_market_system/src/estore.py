@@ -1,9 +1,10 @@
 
 # --- Main E-Store System ---
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 import json
 import datetime
+import threading
 from product import Product
 from admin import Admin
 from customer import Customer
@@ -13,21 +14,73 @@ from discount import Discount
 from payment import Payment
 from delivery import Delivery
 from user import User
+from indexed_list import IndexedList
+from product_search import TrigramIndex, FuzzyIndex
+from autocomplete import AutocompleteIndex
+from price_index import PriceIndex
+from product_pages import ProductPages
+from stock_reservations import StockReservations, Reservation
+from journal import Journal, FSYNC_INTERVAL
+from sqlite_store import SqliteStore
 import uuid
+
+# Where data is persisted: "json" (snapshot files plus a journal) or "sqlite"
+STORAGE_ENGINES = ("json", "sqlite")
+STORAGE_ENGINE = os.environ.get("DOLLMART_STORAGE", "json")
+DATABASE_FILE = "data/dollmart.db"
+
+# Mutations since the last snapshot, replayed on startup
+JOURNAL_FILE = "data/journal.log"
+JOURNAL_FSYNC = FSYNC_INTERVAL
+
+# The journal is compacted into a new snapshot once it holds this many records,
+# or as many records as the last snapshot if that is more
+COMPACT_MIN_RECORDS = 1000
+
+# Products per page when listing them a page at a time
+PAGE_SIZE = 10
+
+# Journal record kind -> (EStore list, id attribute)
+RECORD_KINDS = {
+    "user": ("users", "user_id"),
+    "product": ("products", "product_id"),
+    "order": ("orders", "order_id"),
+    "payment": ("payments", "payment_id"),
+    "delivery": ("deliveries", "delivery_id"),
+    "discount": ("discounts", "discount_id")
+}
+
+
 class EStore:
     _instance = None
 
     @classmethod
-    def get_instance(cls) -> 'EStore':
-        """Singleton pattern to ensure only one EStore instance exists"""
+    def get_instance(cls, storage: Optional[str] = None) -> 'EStore':
+        """Singleton pattern to ensure only one EStore instance exists.
+
+        storage picks the engine the first instance persists to (default STORAGE_ENGINE).
+        """
         if cls._instance is None:
-            cls._instance = EStore()    
+            cls._instance = EStore(storage)
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, storage: Optional[str] = None):
         if EStore._instance is not None:
             raise Exception("This class is a singleton! Use get_instance() instead.")
-
+        storage = storage or STORAGE_ENGINE
+        if storage not in STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine: {storage}. Valid engines are: {', '.join(STORAGE_ENGINES)}")
+        self.storage = storage
+
+        # Products, users and orders are indexed by product_id, lowercase email and order_id;
+        # the product indexes below follow every change to the products list
+        self.product_search = TrigramIndex()
+        self.fuzzy_search = FuzzyIndex()
+        self.autocomplete = AutocompleteIndex()
+        self.price_index = PriceIndex()
+        self.product_pages = ProductPages()
+        self._product_indexes = [self.product_search, self.fuzzy_search, self.autocomplete, self.price_index,
+                                 self.product_pages]
         self.users = []
         self.products = []
         self.orders = []
@@ -35,53 +88,178 @@ class EStore:
         self.payments = []
         self.deliveries = []
         self.retail_stores = []  # Add this line
+        self.reservations = StockReservations()
+        # Orders can be placed from several threads; the lists, indexes and journal change under this lock
+        self._lock = threading.RLock()
+        self.journal = Journal(JOURNAL_FILE, JOURNAL_FSYNC) if storage == "json" else None
+        self.database = SqliteStore(DATABASE_FILE) if storage == "sqlite" else None
+        self._snapshot_size = 0
         # Create default admin user
         admin = Admin("Admin", "admin@dollmart.com", "admin123")
         self.users.append(admin)
         # Load data if it exists
         self.load_data()
-    def search_product(self, query: str) -> List[Product]:
-        """Search for products by name or category"""
-        query = query.lower()
-        results = []
-        for product in self.products:
-            if query in product.name.lower() or query in product.category.lower():
-                results.append(product)
-        return results
+
+    @property
+    def products(self) -> IndexedList:
+        return self._products
+
+    @products.setter
+    def products(self, products: List[Product]) -> None:
+        self._products = IndexedList(lambda product: product.product_id, products, self._product_indexes)
+
+    @property
+    def users(self) -> IndexedList:
+        return self._users
+
+    @users.setter
+    def users(self, users: List[User]) -> None:
+        self._users = IndexedList(lambda user: user.email.lower(), users)
+
+    @property
+    def orders(self) -> IndexedList:
+        return self._orders
+
+    @orders.setter
+    def orders(self, orders: List[Order]) -> None:
+        self._orders = IndexedList(lambda order: order.order_id, orders)
+
+    def search_product(self, query: str, fuzzy: bool = False, limit: Optional[int] = None) -> List[Product]:
+        """Search for products by name or category.
+
+        By default returns every product whose name or category contains the
+        query. With fuzzy=True, words may be misspelt and the closest matches
+        come first. limit caps the number of results either way.
+        """
+        if fuzzy:
+            return self.fuzzy_search.search(query, limit)
+        results = self.product_search.search(query)
+        return results if limit is None else results[:limit]
+
+    def suggest_products(self, prefix: str, k: Optional[int] = None) -> List[str]:
+        """Product names and categories starting with prefix, best sellers first"""
+        return self.autocomplete.suggest(prefix, k)
+
+    def browse_products(self, category: Optional[str] = None, min_price: Optional[float] = None,
+                        max_price: Optional[float] = None, in_stock: bool = False, descending: bool = False,
+                        limit: Optional[int] = None, offset: int = 0) -> List[Product]:
+        """List products by price, cheapest first unless descending.
+
+        category (any case) narrows to one category, min_price and max_price
+        bound the price inclusively, and in_stock leaves out products with
+        no stock. offset skips that many of the results before the limit.
+        """
+        return self.price_index.browse(category, min_price, max_price, in_stock, descending, limit, offset)
+
+    def category_counts(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+                        in_stock: bool = False) -> Dict[str, int]:
+        """Number of products in each category within the price range, by category name"""
+        return self.price_index.facets(min_price, max_price, in_stock)
+
+    def page_products(self, offset: int = 0, limit: int = PAGE_SIZE) -> List[Product]:
+        """Up to limit products from position offset of the product list"""
+        return self.products[offset:offset + limit]
+
+    def products_after(self, cursor: Optional[str] = None,
+                       limit: int = PAGE_SIZE) -> Tuple[List[Product], Optional[str]]:
+        """Return up to limit products following cursor, and the cursor of the next page.
+
+        Pass None for the first page. The next cursor is None after the last
+        page. A cursor names the last product of its page, so adding or
+        deleting products elsewhere doesn't shift the pages that follow.
+        """
+        doc = -1
+        if cursor is not None:
+            saved_doc, product_id = cursor.split(":", 1)
+            product = self.products.get(product_id)
+            doc = self.product_pages.doc(product) if product else None
+            if doc is None:
+                # The product is gone, but its document id still marks its place
+                doc = int(saved_doc)
+        page = self.product_pages.after(doc, limit + 1)
+        if len(page) <= limit:
+            return [product for _, product in page], None
+        page = page[:limit]
+        last_doc, last = page[-1]
+        return [product for _, product in page], f"{last_doc}:{last.product_id}"
 
     def add_product(self, product: Product) -> None:
         """Add a new product to the store"""
-        self.products.append(product)
-        self.save_data()
+        with self._lock:
+            self.products.append(product)
+            self._log("add_product", put=[("product", product)])
+
+    def update_product(self, product: Product) -> None:
+        """Record changes made to a product in place"""
+        with self._lock:
+            self._reindex_product(product)
+            self._log("update_product", put=[("product", product)])
+
+    def _reindex_product(self, product: Product) -> None:
+        for index in self._product_indexes:
+            index.update(product)
 
     def get_product(self, product_id: str) -> Optional[Product]:
         """Get a product by ID"""
-        for product in self.products:
-            if product.product_id == product_id:
-                return product
-        return None
+        return self.products.get(product_id)
 
     def delete_product(self, product_id: str) -> bool:
         """Delete a product by ID"""
-        for i, product in enumerate(self.products):
-            if product.product_id == product_id:
-                del self.products[i]
-                self.save_data()
-                return True
-        return False
+        with self._lock:
+            product = self.products.get(product_id)
+            if product is None:
+                return False
+            self.products.remove(product)
+            self._log("delete_product", delete=[("product", product_id)])
+            return True
+
+    def reserve_stock(self, items: List[Dict], ttl: Optional[float] = None) -> Reservation:
+        """Hold stock for every order item or for none (see StockReservations.reserve).
+
+        Raises ValueError for an unknown product or a quantity that isn't
+        positive, and InsufficientStock if a product is short. The hold lasts
+        ttl seconds (default RESERVATION_TTL) unless committed or released.
+        """
+        lines = []
+        for item in items:
+            product = self.get_product(item["product_id"])
+            if product is None:
+                raise ValueError(f"Product with ID {item['product_id']} not found.")
+            lines.append((product, item["quantity"]))
+        return self.reservations.reserve(lines, ttl)
+
+    def commit_reservation(self, reservation: Reservation) -> bool:
+        """Take reserved stock out of the products; False if the reservation expired, was settled or is short.
+
+        Safe to call from several threads. The product indexes and the
+        journal catch up when the order is processed.
+        """
+        return self.reservations.commit(reservation)
+
+    def release_reservation(self, reservation: Reservation) -> bool:
+        """Give reserved stock back, e.g. for an abandoned checkout"""
+        return self.reservations.release(reservation)
+
+    def set_stock(self, product: Product, stock: int) -> bool:
+        """Set a product's stock, unless that is below the units reserved by checkouts in progress.
+
+        Takes the product's reservation lock, so concurrent commits aren't
+        lost. Record the change with update_product afterwards.
+        """
+        return self.reservations.set_stock(product, stock)
+
+    def available_stock(self, product: Product) -> int:
+        """Units of a product in stock and not reserved by a checkout in progress"""
+        return self.reservations.available(product)
 
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get an order by ID"""
-        for order in self.orders:
-            if order.order_id == order_id:
-                return order
-        return None
+        return self.orders.get(order_id)
 
     def process_order(self, order: Order) -> None:
         """Process a new order"""
         # Create payment
         payment = Payment(order.order_id, order.payment_method)
-        self.payments.append(payment)
         order.payment = payment
 
         # Process payment
@@ -90,166 +268,237 @@ class EStore:
 
             # Create delivery
             delivery_date = datetime.datetime.now() + datetime.timedelta(days=3)
-            delivery = Delivery(order.order_id, delivery_date.strftime("%Y-%m-%d"))
-            self.deliveries.append(delivery)
-            order.delivery = delivery
+            order.delivery = Delivery(order.order_id, delivery_date.strftime("%Y-%m-%d"))
         else:
             order.status = "Payment Failed"
 
-        # Add order to the system
-        self.orders.append(order)
-        self.save_data()
+        with self._lock:
+            self.payments.append(payment)
+            if order.delivery:
+                self.deliveries.append(order.delivery)
+
+            # Add order to the system
+            self.orders.append(order)
+            # Stock was taken when the order was placed
+            products = [self.get_product(item["product_id"]) for item in order.items]
+            for product, item in zip(products, order.items):
+                if product:
+                    self._reindex_product(product)
+                    if order.status != "Payment Failed":
+                        self.autocomplete.record_sale(product, item["quantity"])
+            self._log("process_order", put=[("product", product) for product in products if product] +
+                      self._order_puts(order))
+
+    def update_order(self, order: Order) -> None:
+        """Record changes made to an order or its delivery in place"""
+        with self._lock:
+            self._log("update_order", put=self._order_puts(order))
+
+    def _order_puts(self, order: Order) -> List:
+        puts = [("payment", order.payment)] if order.payment else []
+        if order.delivery:
+            puts.append(("delivery", order.delivery))
+        return puts + [("order", order)]
 
     def get_user(self, email: str) -> Optional[User]:
-        """Get a user by email"""
-        for user in self.users:
-            if user.email == email:
-                return user
-        return None
+        """Get a user by email (case-insensitive)"""
+        return self.users.get(email.lower())
 
     def add_user(self, user: User) -> None:
         """Add a new user to the system"""
-        self.users.append(user)
-        self.save_data()
+        with self._lock:
+            self.users.append(user)
+            self._log("add_user", put=[("user", user)])
+
+    def _log(self, op: str, put: List = (), delete: List = ()) -> None:
+        """Persist one mutation: a row per record in SQLite, or a journal line compacted when it has grown too long"""
+        if self.database:
+            self.database.write([(kind, obj.to_dict()) for kind, obj in put], delete)
+            return
+
+        record = {"op": op}
+        if put:
+            record["put"] = [[kind, obj.to_dict()] for kind, obj in put]
+        if delete:
+            record["delete"] = [[kind, key] for kind, key in delete]
+        self.journal.append(record)
+        if self.journal.count >= max(COMPACT_MIN_RECORDS, self._snapshot_size):
+            self.compact()
+
+    def compact(self) -> None:
+        """Write a snapshot of everything and empty the journal"""
+        with self._lock:
+            self.save_data()
+            if self.journal:
+                self.journal.truncate()
 
     def save_data(self) -> None:
-        """Save data to files"""
-        os.makedirs("data", exist_ok=True)
-
-        # Save users
-        with open("data/users.json", "w") as f:
-            users_data = [user.to_dict() for user in self.users]
-            json.dump(users_data, f, indent=4)
-
-        # Save products
-        with open("data/products.json", "w") as f:
-            products_data = [product.to_dict() for product in self.products]
-            json.dump(products_data, f, indent=4)
-
-        # Save orders (simplified to avoid circular references)
-        with open("data/orders.json", "w") as f:
-            orders_data = [order.to_dict() for order in self.orders]
-            json.dump(orders_data, f, indent=4)
-
-        # Save payments
-        with open("data/payments.json", "w") as f:
-            payments_data = [payment.to_dict() for payment in self.payments]
-            json.dump(payments_data, f, indent=4)
-
-        # Save deliveries
-        with open("data/deliveries.json", "w") as f:
-            deliveries_data = [delivery.to_dict() for delivery in self.deliveries]
-            json.dump(deliveries_data, f, indent=4)
-
-        # Save discounts
-        with open("data/discounts.json", "w") as f:
-            discounts_data = [discount.to_dict() for discount in self.discounts]
-            json.dump(discounts_data, f, indent=4)
+        """Save a snapshot of all data to files, or rewrite every database table"""
+        with self._lock:
+            if self.database:
+                self.database.replace_all({kind: [record.to_dict() for record in getattr(self, name)]
+                                           for kind, (name, _) in RECORD_KINDS.items()})
+                return
+
+            os.makedirs("data", exist_ok=True)
+
+            # Orders are saved with ids in place of their customer, payment and delivery
+            for name, records in (("users", self.users), ("products", self.products), ("orders", self.orders),
+                                  ("payments", self.payments), ("deliveries", self.deliveries),
+                                  ("discounts", self.discounts)):
+                # Write beside the old file and swap it in, so a crash leaves one whole version
+                path = f"data/{name}.json"
+                with open(path + ".tmp", "w") as f:
+                    json.dump([record.to_dict() for record in records], f, indent=4)
+                os.replace(path + ".tmp", path)
+            self._snapshot_size = sum(len(getattr(self, name)) for name, _ in RECORD_KINDS.values())
 
     def load_data(self) -> None:
-        """Load data from files"""
-        if not os.path.exists("data"):
-            return
-
-        # Load products
-        if os.path.exists("data/products.json"):
-            with open("data/products.json", "r") as f:
-                try:
-                    products_data = json.load(f)
-                    self.products = [Product.from_dict(data) for data in products_data]
-                except json.JSONDecodeError:
-                    pass
-
-        # Load users
-        if os.path.exists("data/users.json"):
-            with open("data/users.json", "r") as f:
-                try:
-                    users_data = json.load(f)
-                    self.users = []
-                    self.retail_stores = []
-                    for data in users_data:
-                        user_type = data.get("type", "User")
-                        if user_type == "Customer":
-                            self.users.append(Customer.from_dict(data))
-                        elif user_type == "RetailStore":
-                            retail_store = RetailStore.from_dict(data)
-                            self.users.append(retail_store)
-                            self.retail_stores.append(retail_store)
-                        elif user_type == "Admin":
-                            self.users.append(Admin.from_dict(data))
-                        else:
-                            self.users.append(User.from_dict(data))
-                except json.JSONDecodeError:
-                    pass
-
-        # Load discounts
-        if os.path.exists("data/discounts.json"):
-            with open("data/discounts.json", "r") as f:
-                try:
-                    discounts_data = json.load(f)
-                    self.discounts = [Discount.from_dict(data) for data in discounts_data]
-                except json.JSONDecodeError:
-                    pass
-
-        # Load payments
-        if os.path.exists("data/payments.json"):
-            with open("data/payments.json", "r") as f:
-                try:
-                    payments_data = json.load(f)
-                    self.payments = [Payment.from_dict(data) for data in payments_data]
-                except json.JSONDecodeError:
-                    pass
-
-        # Load deliveries
-        if os.path.exists("data/deliveries.json"):
-            with open("data/deliveries.json", "r") as f:
-                try:
-                    deliveries_data = json.load(f)
-                    self.deliveries = [Delivery.from_dict(data) for data in deliveries_data]
-                except json.JSONDecodeError:
-                    pass
-
-        # Load orders (partial load due to object references)
-        if os.path.exists("data/orders.json"):
-            with open("data/orders.json", "r") as f:
-                try:
-                    orders_data = json.load(f)
-                    for data in orders_data:
-                        # Find customer by ID
-                        customer = None
-                        for user in self.users:
-                            if isinstance(user, Customer) and user.user_id == data["customer_id"]:
-                                customer = user
-                                break
-
-                        if customer:
-                            # Create order with minimal data
-                            order = Order.__new__(Order)
-                            order.customer = customer
-                            order.items = data["items"]
-                            order.payment_method = data["payment_method"]
-                            order.order_id = data["order_id"]
-                            order.status = data["status"]
-                            order.total_price = data["total_price"]  # Use saved value instead of recalculating
-                            order.date = data["date"]
-                            order.discount_applied = None
-                            order.payment = None
-                            order.delivery = None
-
-                            # Link to payment
-                            if data["payment_id"]:
-                                for payment in self.payments:
-                                    if payment.payment_id == data["payment_id"]:
-                                        order.payment = payment
-                                        break
-
-                            # Link to delivery
-                            if data["delivery_id"]:
-                                for delivery in self.deliveries:
-                                    if delivery.delivery_id == data["delivery_id"]:
-                                        order.delivery = delivery
-                                        break
-
-                            self.orders.append(order)
-                except json.JSONDecodeError:
-                    pass
\ No newline at end of file
+        """Load data from the database, or from the snapshot files and journal"""
+        if self.database:
+            records = self.database.load()
+            self._load_records(records)
+            if not records["user"]:
+                # Keep the default admin in a new database
+                self.database.write(put=[("user", user.to_dict()) for user in self.users])
+        elif os.path.exists("data"):
+            records = {}
+            for kind, (name, _) in RECORD_KINDS.items():
+                path = f"data/{name}.json"
+                if os.path.exists(path):
+                    with open(path, "r") as f:
+                        try:
+                            records[kind] = json.load(f)
+                        except json.JSONDecodeError:
+                            pass
+            self._load_records(records)
+
+            self._snapshot_size = sum(len(getattr(self, name)) for name, _ in RECORD_KINDS.values())
+            self._replay_journal()
+
+        # Rank suggestions by what has sold so far
+        units_sold = {}
+        for order in self.orders:
+            if order.status != "Payment Failed":
+                for item in order.items:
+                    units_sold[item["product_id"]] = units_sold.get(item["product_id"], 0) + item["quantity"]
+        if units_sold:
+            self.autocomplete.set_sales(units_sold)
+
+    def _load_records(self, records: Dict[str, List[Dict]]) -> None:
+        """Rebuild the store from {kind: [record dicts]}; kinds without records keep their defaults"""
+        if records.get("product"):
+            self.products = [Product.from_dict(data) for data in records["product"]]
+
+        if records.get("user"):
+            self.users = []
+            self.retail_stores = []
+            for data in records["user"]:
+                user = self._user_from_dict(data)
+                self.users.append(user)
+                if isinstance(user, RetailStore):
+                    self.retail_stores.append(user)
+
+        if records.get("discount"):
+            self.discounts = [Discount.from_dict(data) for data in records["discount"]]
+        if records.get("payment"):
+            self.payments = [Payment.from_dict(data) for data in records["payment"]]
+        if records.get("delivery"):
+            self.deliveries = [Delivery.from_dict(data) for data in records["delivery"]]
+
+        # Orders last, since they link to users, payments and deliveries
+        if records.get("order"):
+            self.orders.extend(self._link_orders(records["order"]))
+
+    @staticmethod
+    def _user_from_dict(data: Dict) -> User:
+        user_type = data.get("type", "User")
+        if user_type == "Customer":
+            return Customer.from_dict(data)
+        if user_type == "RetailStore":
+            return RetailStore.from_dict(data)
+        if user_type == "Admin":
+            return Admin.from_dict(data)
+        return User.from_dict(data)
+
+    def _by_id(self, kind: str) -> Dict:
+        """Map ids to records of one kind; the first record with an id wins, as a scan of the list would find it"""
+        name, id_attribute = RECORD_KINDS[kind]
+        records = {}
+        for record in getattr(self, name):
+            records.setdefault(getattr(record, id_attribute), record)
+        return records
+
+    @staticmethod
+    def _order_from_dict(data: Dict, users: Dict, payments: Dict, deliveries: Dict) -> Optional[Order]:
+        """Rebuild a saved order from id maps, or None if its customer is gone"""
+        customer = users.get(data["customer_id"])
+        if not isinstance(customer, Customer):
+            return None
+
+        # Create order with minimal data
+        order = Order.__new__(Order)
+        order.customer = customer
+        order.items = data["items"]
+        order.payment_method = data["payment_method"]
+        order.order_id = data["order_id"]
+        order.status = data["status"]
+        order.total_price = data["total_price"]  # Use saved value instead of recalculating
+        order.date = data["date"]
+        order.discount_applied = None
+        order.payment = payments.get(data["payment_id"]) if data["payment_id"] else None
+        order.delivery = deliveries.get(data["delivery_id"]) if data["delivery_id"] else None
+        return order
+
+    def _link_orders(self, orders_data: List[Dict]) -> List[Order]:
+        """Rebuild saved orders, resolving customer, payment and delivery ids in one pass"""
+        users, payments, deliveries = self._by_id("user"), self._by_id("payment"), self._by_id("delivery")
+        orders = []
+        for data in orders_data:
+            order = self._order_from_dict(data, users, payments, deliveries)
+            if order:
+                orders.append(order)
+        return orders
+
+    def _replay_journal(self) -> None:
+        """Apply the journal's mutations on top of the loaded snapshot.
+
+        Replaying a record twice has no further effect, so a crash between
+        writing a snapshot and emptying the journal loses nothing.
+        """
+        ids = None
+        for record in self.journal.records():
+            if ids is None:
+                ids = {kind: self._by_id(kind) for kind in RECORD_KINDS}
+
+            for kind, key in record.get("delete", []):
+                obj = ids[kind].pop(key, None)
+                if obj is not None:
+                    getattr(self, RECORD_KINDS[kind][0]).remove(obj)
+
+            for kind, data in record.get("put", []):
+                if kind == "user":
+                    obj = self._user_from_dict(data)
+                elif kind == "order":
+                    obj = self._order_from_dict(data, ids["user"], ids["payment"], ids["delivery"])
+                else:
+                    obj = {"product": Product, "payment": Payment, "delivery": Delivery,
+                           "discount": Discount}[kind].from_dict(data)
+                if obj is None:
+                    continue
+
+                name, id_attribute = RECORD_KINDS[kind]
+                existing = ids[kind].get(getattr(obj, id_attribute))
+                if existing is not None:
+                    # Update in place so references from other records stay valid
+                    existing.__dict__.update(obj.__dict__)
+                    if kind == "product":
+                        self._reindex_product(existing)
+                    continue
+
+                ids[kind][getattr(obj, id_attribute)] = obj
+                getattr(self, name).append(obj)
+                if isinstance(obj, RetailStore):
+                    self.retail_stores.append(obj)
+                if kind == "order" and obj.order_id not in obj.customer.order_history:
+                    obj.customer.order_history.append(obj.order_id)
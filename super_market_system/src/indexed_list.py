@@ -0,0 +1,98 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class IndexedList(list):
+    """A list that keeps a dict from key(item) to the items with that key.
+
+    Every list mutation updates the index, so existing callers can keep
+    appending, deleting and iterating while lookups by key stay O(1).
+    Items sharing a key are kept in insertion order and get() returns the
+    first of them, like a scan over the list would.
+
+    Watchers (objects with add(item), remove(item) and reset(items)) are
+    told about every change, so secondary indexes can follow the list too.
+    """
+
+    def __init__(self, key: Callable[[Any], Any], items: Iterable = (), watchers: Iterable = ()):
+        super().__init__(items)
+        self._key = key
+        self._watchers = list(watchers)
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._index: Dict[Any, List] = {}
+        for item in self:
+            self._index.setdefault(self._key(item), []).append(item)
+        for watcher in self._watchers:
+            watcher.reset(self)
+
+    def _add(self, item: Any) -> None:
+        self._index.setdefault(self._key(item), []).append(item)
+        for watcher in self._watchers:
+            watcher.add(item)
+
+    def _discard(self, item: Any) -> None:
+        key = self._key(item)
+        bucket = self._index.get(key, [])
+        for i, other in enumerate(bucket):
+            if other is item:
+                del bucket[i]
+                break
+        if not bucket:
+            self._index.pop(key, None)
+        for watcher in self._watchers:
+            watcher.remove(item)
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Get the first item with this key, or None"""
+        bucket = self._index.get(key)
+        return bucket[0] if bucket else None
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        self._add(item)
+
+    def extend(self, items: Iterable) -> None:
+        items = list(items)
+        super().extend(items)
+        for item in items:
+            self._add(item)
+
+    def __iadd__(self, items: Iterable) -> 'IndexedList':
+        self.extend(items)
+        return self
+
+    def insert(self, position: int, item: Any) -> None:
+        super().insert(position, item)
+        # Keeps get() returning the first item in list order
+        self._reindex()
+
+    def remove(self, item: Any) -> None:
+        position = self.index(item)
+        self._discard(super().pop(position))
+
+    def pop(self, position: int = -1) -> Any:
+        item = super().pop(position)
+        self._discard(item)
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._reindex()
+
+    def __delitem__(self, position) -> None:
+        super().__delitem__(position)
+        self._reindex()
+
+    def __setitem__(self, position, value) -> None:
+        super().__setitem__(position, value)
+        self._reindex()
+
+    # Sorting and reversing keep the same items, but get() follows list order
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._reindex()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reindex()
@@ -0,0 +1,81 @@
+from typing import Dict, Iterator
+import json
+import os
+import time
+
+# When appended records are forced to disk
+FSYNC_ALWAYS = "always"      # after every record
+FSYNC_INTERVAL = "interval"  # at most once per interval, on the next append
+FSYNC_NEVER = "never"        # left to the operating system
+
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+
+class Journal:
+    """An append-only log of JSON records, one compact record per line.
+
+    A record is only trusted once its line is complete, so a write torn by a
+    crash is dropped (and trimmed from the file) the next time the journal
+    is read.
+    """
+
+    def __init__(self, path: str, fsync: str = FSYNC_INTERVAL, interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}. Valid policies are: {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync = fsync
+        self.interval = interval
+        self.count = 0
+        self._last_sync = time.monotonic()
+
+    def _should_sync(self) -> bool:
+        if self.fsync == FSYNC_ALWAYS:
+            return True
+        if self.fsync == FSYNC_INTERVAL:
+            return time.monotonic() - self._last_sync >= self.interval
+        return False
+
+    def append(self, record: Dict) -> None:
+        """Append one record to the end of the journal"""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(line)
+            if self._should_sync():
+                f.flush()
+                os.fsync(f.fileno())
+                self._last_sync = time.monotonic()
+        self.count += 1
+
+    def records(self) -> Iterator[Dict]:
+        """Yield the complete records in the journal, oldest first"""
+        self.count = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Drop a torn last write so the next append starts on a fresh line
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+
+        for line in data[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.count += 1
+            yield record
+
+    def truncate(self) -> None:
+        """Empty the journal once its records are part of a snapshot"""
+        if os.path.exists(self.path):
+            with open(self.path, "w") as f:
+                f.flush()
+                os.fsync(f.fileno())
+        self.count = 0
+        self._last_sync = time.monotonic()
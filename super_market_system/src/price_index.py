@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+import heapq
+from product import Product
+from product_search import ProductIndex
+
+# Sorts after every document id, so (price, LAST) bounds all entries at that price
+LAST = float("inf")
+
+
+class PriceIndex(ProductIndex):
+    """Products sorted by price within each category, for browsing by price range.
+
+    Each category (ignoring case) keeps a list of (price, doc id) kept sorted
+    with bisect, and a second list of just its products in stock. A price
+    range is two binary searches into one list, so range queries, sorting by
+    price and counting a category's products in a range take logarithmic time
+    plus the results returned. Browsing every category merges the categories'
+    ranges lazily, which keeps each list, and so each insertion, small.
+    Equal prices keep list order.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self._bulk = False
+        super().__init__(products)
+
+    def _clear(self) -> None:
+        # Category (lowercase) -> sorted (price, doc id)
+        self._sorted: Dict[str, List[Tuple[float, int]]] = {}
+        self._stocked: Dict[str, List[Tuple[float, int]]] = {}
+        self._entries: Dict[int, Tuple[str, float, bool]] = {}  # doc id -> (category, price, in stock) as indexed
+        self._labels: Dict[str, str] = {}  # lowercase category -> category as first added
+
+    def reset(self, products: Iterable[Product]) -> None:
+        # Append everything and sort each list once instead of inserting one by one
+        self._bulk = True
+        try:
+            super().reset(products)
+        finally:
+            self._bulk = False
+        for entries in list(self._sorted.values()) + list(self._stocked.values()):
+            entries.sort()
+
+    @staticmethod
+    def _entry(product: Product) -> Tuple[str, float, bool]:
+        return product.category.lower(), product.price, product.stock > 0
+
+    def _insert(self, lists: Dict, category: str, entry: Tuple[float, int]) -> None:
+        entries = lists.setdefault(category, [])
+        if self._bulk:
+            entries.append(entry)
+        else:
+            insort(entries, entry)
+
+    @staticmethod
+    def _delete(lists: Dict, category: str, entry: Tuple[float, int]) -> None:
+        entries = lists[category]
+        del entries[bisect_left(entries, entry)]
+        if not entries:
+            del lists[category]
+
+    def _index(self, doc: int, name: str, category: str) -> None:
+        product = self._products[doc]
+        category, price, in_stock = self._entries[doc] = self._entry(product)
+        self._labels.setdefault(category, product.category)
+        self._insert(self._sorted, category, (price, doc))
+        if in_stock:
+            self._insert(self._stocked, category, (price, doc))
+
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        category, price, in_stock = self._entries.pop(doc)
+        self._delete(self._sorted, category, (price, doc))
+        if in_stock:
+            self._delete(self._stocked, category, (price, doc))
+        if category not in self._sorted:
+            del self._labels[category]
+
+    def update(self, product: Product) -> None:
+        """Re-index a product whose category, price or stock changed, keeping its place among equal prices"""
+        doc = self._doc_ids.get(id(product))
+        if doc is None or self._entries[doc] == self._entry(product):
+            return
+        self._unindex(doc, *self._texts[doc])
+        self._texts[doc] = (product.name.lower(), product.category.lower())
+        self._index(doc, *self._texts[doc])
+
+    def _ranges(self, category: Optional[str], min_price: Optional[float], max_price: Optional[float],
+                in_stock: bool) -> List[Tuple[List[Tuple[float, int]], int, int]]:
+        """(sorted list, start, end) of the price range in the category's list, or in every category's"""
+        lists = self._stocked if in_stock else self._sorted
+        if category is None:
+            chosen = lists.values()
+        else:
+            chosen = [lists[category.lower()]] if category.lower() in lists else []
+        ranges = []
+        for entries in chosen:
+            start = 0 if min_price is None else bisect_left(entries, (min_price,))
+            end = len(entries) if max_price is None else bisect_right(entries, (max_price, LAST))
+            if start < end:
+                ranges.append((entries, start, end))
+        return ranges
+
+    def browse(self, category: Optional[str] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, in_stock: bool = False, descending: bool = False,
+               limit: Optional[int] = None, offset: int = 0) -> List[Product]:
+        """Products within [min_price, max_price], cheapest first (or dearest with descending), skipping offset"""
+        def walk(entries: List[Tuple[float, int]], start: int, end: int) -> Iterator[Tuple[float, int]]:
+            positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+            return (entries[position] for position in positions)
+
+        merged = heapq.merge(*(walk(*found) for found in self._ranges(category, min_price, max_price, in_stock)),
+                             reverse=descending)
+        return [self._products[doc] for _, doc in islice(merged, offset, None if limit is None else offset + limit)]
+
+    def count(self, category: Optional[str] = None, min_price: Optional[float] = None,
+              max_price: Optional[float] = None, in_stock: bool = False) -> int:
+        """Number of products browse() would return without a limit"""
+        return sum(end - start for _, start, end in self._ranges(category, min_price, max_price, in_stock))
+
+    def facets(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+               in_stock: bool = False) -> Dict[str, int]:
+        """Products per category within the price range, by category name; empty categories are left out"""
+        counts = {}
+        for category in sorted(self._labels):
+            count = self.count(category, min_price, max_price, in_stock)
+            if count:
+                counts[self._labels[category]] = count
+        return counts
@@ -0,0 +1,45 @@
+from typing import List, Optional, Tuple
+from bisect import bisect_right
+from product import Product
+from product_search import ProductIndex
+
+
+class ProductPages(ProductIndex):
+    """The product list in order, read a page at a time after a given document id.
+
+    Document ids only grow as products are appended, so the ids in list
+    order are sorted and the start of a page is a binary search away.
+    Removed products are skipped when read and swept out once they make
+    up half of the ids.
+    """
+
+    def _clear(self) -> None:
+        self._order: List[int] = []  # doc ids in list order, including removed ones not swept yet
+        self._removed = 0
+
+    def _index(self, doc: int, name: str, category: str) -> None:
+        self._order.append(doc)
+
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        self._removed += 1
+        if self._removed * 2 > len(self._order):
+            self._order = [other for other in self._order if other in self._products and other != doc]
+            self._removed = 0
+
+    def update(self, product: Product) -> None:
+        """Names and categories don't affect list order, so there is nothing to re-index"""
+
+    def doc(self, product: Product) -> Optional[int]:
+        """The document id of a product in the list, or None"""
+        return self._doc_ids.get(id(product))
+
+    def after(self, doc: int, limit: int) -> List[Tuple[int, Product]]:
+        """(doc id, product) for up to limit products following document id doc, in list order"""
+        page = []
+        for position in range(bisect_right(self._order, doc), len(self._order)):
+            if len(page) == limit:
+                break
+            other = self._order[position]
+            if other in self._products:
+                page.append((other, self._products[other]))
+        return page
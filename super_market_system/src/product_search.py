@@ -0,0 +1,292 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from abc import ABC, abstractmethod
+import heapq
+import re
+from product import Product
+
+# Length of the character n-grams product names are indexed by
+GRAM_SIZE = 3
+
+# Posting lists stop being intersected once this few candidates are left to check directly
+CHECK_BELOW = 64
+
+# Results returned by a fuzzy search unless asked otherwise
+FUZZY_LIMIT = 10
+
+WORD = re.compile(r"\w+")
+
+
+def grams(text: str) -> Set[str]:
+    """The distinct trigrams of text"""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def short_grams(text: str) -> Set[str]:
+    """The distinct substrings of text shorter than a trigram"""
+    return {text[i:i + size] for size in range(1, GRAM_SIZE) for i in range(len(text) - size + 1)}
+
+
+def tokens(text: str) -> Set[str]:
+    """The distinct lowercase words of text"""
+    return set(WORD.findall(text.lower()))
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance: insertions, deletions and substitutions to turn a into b"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def typo_allowance(word: str) -> int:
+    """Edits a query word may be away from a product word: none for short words, more for long ones"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 6:
+        return 1
+    return 2
+
+
+class ProductIndex(ABC):
+    """Base for indexes that follow a product list (see IndexedList watchers).
+
+    Products get increasing document ids as they are added, so sorting
+    document ids gives back the order of the list. Subclasses keep their
+    own structures in _clear, _index and _unindex.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self.reset(products)
+
+    def reset(self, products: Iterable[Product]) -> None:
+        """Index these products from scratch"""
+        self._products: Dict[int, Product] = {}
+        self._texts: Dict[int, Tuple[str, str]] = {}  # doc id -> (name, category) as indexed
+        self._doc_ids: Dict[int, int] = {}  # id(product) -> doc id
+        self._next_doc = 0
+        self._clear()
+        for product in products:
+            self.add(product)
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Start the index's structures over empty"""
+
+    @abstractmethod
+    def _index(self, doc: int, name: str, category: str) -> None:
+        """Add a document with its lowercase name and category"""
+
+    @abstractmethod
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        """Remove a document, given the name and category it was indexed with"""
+
+    def add(self, product: Product) -> None:
+        doc = self._next_doc
+        self._next_doc += 1
+        self._products[doc] = product
+        self._doc_ids[id(product)] = doc
+        self._texts[doc] = (product.name.lower(), product.category.lower())
+        self._index(doc, *self._texts[doc])
+
+    def remove(self, product: Product) -> None:
+        doc = self._doc_ids.pop(id(product), None)
+        if doc is None:
+            return
+        self._unindex(doc, *self._texts.pop(doc))
+        del self._products[doc]
+
+    def update(self, product: Product) -> None:
+        """Re-index a product whose name or category changed, keeping its place in the results"""
+        doc = self._doc_ids.get(id(product))
+        if doc is None:
+            return
+        texts = (product.name.lower(), product.category.lower())
+        if self._texts[doc] != texts:
+            self._unindex(doc, *self._texts[doc])
+            self._texts[doc] = texts
+            self._index(doc, *texts)
+
+
+class TrigramIndex(ProductIndex):
+    """Substring search over product names and categories.
+
+    Lowercased names are indexed by their trigrams: a query of three or more
+    characters can only be in names that contain all of its trigrams, so the
+    smallest posting lists are intersected and the few candidates left are
+    checked. Names are also indexed by their one- and two-character
+    substrings, so a shorter query is a single lookup. Categories are few, so
+    they map straight to their products and are matched by scanning the
+    distinct category names.
+    """
+
+    def _clear(self) -> None:
+        self._postings: Dict[str, Set[int]] = {}
+        self._short_postings: Dict[str, Set[int]] = {}
+        self._categories: Dict[str, Set[int]] = {}
+
+    def _index(self, doc: int, name: str, category: str) -> None:
+        for gram in grams(name):
+            self._postings.setdefault(gram, set()).add(doc)
+        for gram in short_grams(name):
+            self._short_postings.setdefault(gram, set()).add(doc)
+        self._categories.setdefault(category, set()).add(doc)
+
+    @staticmethod
+    def _drop(postings: Dict[str, Set[int]], gram: str, doc: int) -> None:
+        members = postings[gram]
+        members.discard(doc)
+        if not members:
+            del postings[gram]
+
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        for gram in grams(name):
+            self._drop(self._postings, gram, doc)
+        for gram in short_grams(name):
+            self._drop(self._short_postings, gram, doc)
+        self._drop(self._categories, category, doc)
+
+    def search(self, query: str) -> List[Product]:
+        """Products whose name or category contains query, ignoring case"""
+        query = query.lower()
+        if not query:
+            return [self._products[doc] for doc in sorted(self._products)]
+
+        docs = set()
+        for category, members in self._categories.items():
+            if query in category:
+                docs |= members
+
+        if len(query) >= GRAM_SIZE:
+            postings = sorted((self._postings.get(gram, set()) for gram in grams(query)), key=len)
+            candidates = postings[0]
+            for other in postings[1:]:
+                if len(candidates) <= CHECK_BELOW:
+                    break
+                candidates = candidates & other
+        else:
+            candidates = self._short_postings.get(query, set())
+
+        if len(query) <= GRAM_SIZE:
+            # Every candidate contains the query as one of its grams
+            docs |= candidates
+        else:
+            # Grams can appear in a name in any order or place, so candidates are checked
+            docs.update(doc for doc in candidates - docs if query in self._texts[doc][0])
+        return [self._products[doc] for doc in sorted(docs)]
+
+
+class BKTree:
+    """Words arranged by edit distance, so the words near a query word are found without comparing it to them all.
+
+    Each child hangs off its parent on an edge labelled with their distance.
+    By the triangle inequality, a search within `allowance` of a word only
+    follows edges within `allowance` of that word's distance to the parent.
+    """
+
+    def __init__(self):
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self.size = 0
+
+    def add(self, word: str) -> None:
+        if self._root is None:
+            self._root = (word, {})
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word: str, allowance: int) -> List[Tuple[int, str]]:
+        """(distance, word) for every word within allowance edits of word"""
+        found = []
+        pending = [self._root] if self._root else []
+        while pending:
+            node_word, children = pending.pop()
+            distance = edit_distance(word, node_word)
+            if distance <= allowance:
+                found.append((distance, node_word))
+            for edge, child in children.items():
+                if distance - allowance <= edge <= distance + allowance:
+                    pending.append(child)
+        return found
+
+
+class FuzzyIndex(ProductIndex):
+    """Typo-tolerant, ranked search over the words of product names and categories.
+
+    Every distinct word goes into a BK-tree and keeps the products that
+    contain it. Each query word is matched to the indexed words within its
+    typo allowance. A product's score is the mean, over the query words, of
+    its best match similarity (1 - edits / word length). A BK-tree can't
+    drop a word, so words whose products are all gone are marked dead and
+    skipped, and the tree is rebuilt from the live words once half of it
+    is dead.
+    """
+
+    def _clear(self) -> None:
+        self._words = BKTree()
+        self._postings: Dict[str, Set[int]] = {}
+        self._dead: Set[str] = set()  # words still in the tree that no product has
+
+    def _index(self, doc: int, name: str, category: str) -> None:
+        for word in tokens(name) | tokens(category):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                if word in self._dead:
+                    self._dead.discard(word)
+                else:
+                    self._words.add(word)
+            postings.add(doc)
+
+    def _unindex(self, doc: int, name: str, category: str) -> None:
+        for word in tokens(name) | tokens(category):
+            postings = self._postings[word]
+            postings.discard(doc)
+            if not postings:
+                del self._postings[word]
+                self._dead.add(word)
+        if len(self._dead) * 2 > self._words.size:
+            self._words = BKTree()
+            for word in self._postings:
+                self._words.add(word)
+            self._dead = set()
+
+    def search(self, query: str, limit: Optional[int] = FUZZY_LIMIT) -> List[Product]:
+        """Products best matching the words of query, most similar first (ties in list order)"""
+        words = tokens(query)
+        if not words:
+            return []
+
+        scores: Dict[int, float] = {}
+        for word in words:
+            best: Dict[int, float] = {}
+            matches = [(1 - distance / max(len(word), len(match)), match)
+                       for distance, match in self._words.search(word, typo_allowance(word))
+                       if match not in self._dead]
+            # Weakest matches first, so better ones overwrite them
+            for similarity, match in sorted(matches):
+                best.update(dict.fromkeys(self._postings[match], similarity / len(words)))
+            if not scores:
+                scores = best
+                continue
+            for doc, similarity in best.items():
+                scores[doc] = scores.get(doc, 0.0) + similarity
+
+        ranked = ((score, -doc) for doc, score in scores.items())
+        ranked = sorted(ranked, reverse=True) if limit is None else heapq.nlargest(limit, ranked)
+        return [self._products[-doc] for _, doc in ranked]
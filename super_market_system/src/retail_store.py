@@ -1,6 +1,7 @@
 from customer import Customer
 from typing import Dict
 import uuid
+import datetime
 from product import Product
 from delivery import Delivery
 from order import Order
@@ -105,12 +106,18 @@ class RetailStore(Customer):
         stock_str = input(f"Enter new stock quantity (current: {product.stock}), or press Enter to keep current: ")
         if stock_str:
             try:
-                new_stock = int(stock_str)
-                # Update stock relative to current value
-                product.update_stock(new_stock - product.stock)
+                stock = int(stock_str)
             except ValueError:
                 print("Invalid stock quantity. Stock must be a number.")
-
+            else:
+                try:
+                    # Set under the product's reservation lock, so orders being committed aren't lost
+                    if not e_store.set_stock(product, stock):
+                        print("Stock can't go below the units reserved by checkouts in progress.")
+                except ValueError as error:
+                    print(f"Invalid stock quantity. {error}")
+
+        e_store.update_product(product)
         print(f"Product '{product.name}' updated successfully!")
 
     def _delete_product(self, e_store: 'EStore') -> None:
@@ -179,11 +186,11 @@ class RetailStore(Customer):
                     delivery = d
                     break
 
-            if not delivery:
-                # Create new delivery if it doesn't exist
+            created = not delivery
+            if created:
+                # Create new delivery if it doesn't exist; it is only kept once a status is chosen
                 delivery_date = datetime.datetime.now() + datetime.timedelta(days=3)
                 delivery = Delivery(order.order_id, delivery_date.strftime("%Y-%m-%d"))
-                e_store.deliveries.append(delivery)
 
             print(f"\nUpdating delivery for Order ID: {order.order_id}")
             print(f"Current status: {delivery.status}")
@@ -203,6 +210,10 @@ class RetailStore(Customer):
 
             if status_choice in status_map:
                 new_status = status_map[status_choice]
+                if created:
+                    e_store.deliveries.append(delivery)
+                    # Link it so update_order records the delivery and the order's delivery_id
+                    order.delivery = delivery
                 delivery.update_status(new_status)
 
                 # Update order status too
@@ -210,6 +221,7 @@ class RetailStore(Customer):
                     order.status = "Delivered"
                 else:
                     order.status = "In Transit"
+                e_store.update_order(order)
 
                 print(f"Delivery status updated to: {new_status}")
             else:
@@ -0,0 +1,164 @@
+from typing import Dict, List, Tuple
+import json
+import os
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    type TEXT NOT NULL,
+    store_name TEXT,
+    business_id TEXT
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    payment_method TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_price REAL NOT NULL,
+    date TEXT NOT NULL,
+    discount_applied TEXT,
+    payment_id TEXT,
+    delivery_id TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_customer ON orders (customer_id);
+
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_id TEXT NOT NULL REFERENCES orders (order_id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (order_id, line_no)
+);
+CREATE INDEX IF NOT EXISTS order_lines_product ON order_lines (product_id);
+
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id TEXT PRIMARY KEY,
+    order_id TEXT NOT NULL,
+    method TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_order ON payments (order_id);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_id TEXT PRIMARY KEY,
+    order_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expected_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_order ON deliveries (order_id);
+
+CREATE TABLE IF NOT EXISTS discounts (
+    discount_id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    value REAL NOT NULL
+);
+"""
+
+# Record kind -> (table, primary key, columns), in the order records are loaded
+TABLES = {
+    "user": ("users", "user_id", ("user_id", "name", "email", "password", "type", "store_name", "business_id")),
+    "product": ("products", "product_id", ("product_id", "name", "category", "price", "stock")),
+    "discount": ("discounts", "discount_id", ("discount_id", "type", "value")),
+    "payment": ("payments", "payment_id", ("payment_id", "order_id", "method", "status")),
+    "delivery": ("deliveries", "delivery_id", ("delivery_id", "order_id", "status", "expected_date")),
+    "order": ("orders", "order_id", ("order_id", "customer_id", "payment_method", "status", "total_price", "date",
+                                     "discount_applied", "payment_id", "delivery_id"))
+}
+
+
+class SqliteStore:
+    """Keeps EStore records as rows of a SQLite database, one row per record.
+
+    Records go in and come out as the models' to_dict()/from_dict()
+    dictionaries. Order items are stored as order_lines rows, and a
+    customer's order history is rebuilt from their orders.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # EStore serializes writes under its lock, so any thread may use the connection
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def _row(self, kind: str, data: Dict) -> Tuple:
+        columns = TABLES[kind][2]
+        if kind == "order":
+            discount = data.get("discount_applied")
+            data = dict(data, discount_applied=json.dumps(discount) if discount else None)
+        return tuple(data.get(column) for column in columns)
+
+    def _put(self, kind: str, data: Dict) -> None:
+        table, key, columns = TABLES[kind]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+        # An upsert keeps the row's place in load order
+        self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates}",
+            self._row(kind, data)
+        )
+        if kind == "order":
+            self.conn.execute("DELETE FROM order_lines WHERE order_id = ?", (data["order_id"],))
+            self.conn.executemany(
+                "INSERT INTO order_lines (order_id, line_no, product_id, quantity) VALUES (?, ?, ?, ?)",
+                [(data["order_id"], line_no, item["product_id"], item["quantity"])
+                 for line_no, item in enumerate(data["items"])]
+            )
+
+    def write(self, put: List[Tuple[str, Dict]] = (), delete: List[Tuple[str, str]] = ()) -> None:
+        """Upsert and delete records in one transaction"""
+        with self.conn:
+            for kind, key in delete:
+                table, key_column, _ = TABLES[kind]
+                self.conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+            for kind, data in put:
+                self._put(kind, data)
+
+    def replace_all(self, records: Dict[str, List[Dict]]) -> None:
+        """Replace every table's rows with the given records"""
+        with self.conn:
+            self.conn.execute("DELETE FROM order_lines")
+            for kind, (table, _, _) in TABLES.items():
+                self.conn.execute(f"DELETE FROM {table}")
+                for data in records.get(kind, []):
+                    self._put(kind, data)
+
+    def load(self) -> Dict[str, List[Dict]]:
+        """Return {kind: [record dicts]} for every table, each in the order the rows were first written"""
+        records = {}
+        for kind, (table, _, _) in TABLES.items():
+            records[kind] = [dict(row) for row in self.conn.execute(f"SELECT * FROM {table} ORDER BY rowid")]
+
+        items = {}
+        for row in self.conn.execute("SELECT * FROM order_lines ORDER BY order_id, line_no"):
+            items.setdefault(row["order_id"], []).append({"product_id": row["product_id"], "quantity": row["quantity"]})
+        order_history = {}
+        for data in records["order"]:
+            data["items"] = items.get(data["order_id"], [])
+            data["discount_applied"] = json.loads(data["discount_applied"]) if data["discount_applied"] else None
+            order_history.setdefault(data["customer_id"], []).append(data["order_id"])
+        for data in records["user"]:
+            data["order_history"] = order_history.get(data["user_id"], [])
+        return records
+
+    def close(self) -> None:
+        self.conn.close()
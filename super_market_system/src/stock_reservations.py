@@ -0,0 +1,177 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import heapq
+import threading
+import time
+import uuid
+from product import Product
+
+# Seconds a reservation holds stock before an abandoned checkout gives it back
+RESERVATION_TTL = 600.0
+
+
+class InsufficientStock(ValueError):
+    """Raised when a reservation asks for more of a product than is available"""
+
+    def __init__(self, product: Product, available: int):
+        super().__init__(f"Insufficient stock for {product.name}. Available: {available}")
+        self.product = product
+        self.available = available
+
+
+class Reservation:
+    """Units of products held for one checkout until it is committed, released or expires"""
+
+    def __init__(self, lines: Dict[str, Tuple[Product, int]], expires_at: float):
+        self.reservation_id = str(uuid.uuid4())
+        self.lines = lines  # product_id -> (product, units held)
+        self.expires_at = expires_at
+        # The product whose stock no longer covered the hold when the commit was refused
+        self.short_of: Optional[Product] = None
+
+    def quantities(self) -> Dict[str, int]:
+        """Units held per product_id"""
+        return {product_id: quantity for product_id, (_, quantity) in self.lines.items()}
+
+
+class _Holds:
+    """A product's lock and the units reservations hold on it"""
+    __slots__ = ("lock", "held", "reservations", "expiries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.held = 0
+        self.reservations: Dict[str, int] = {}  # reservation id -> units held
+        self.expiries: List[Tuple[float, str]] = []  # heap of (expiry time, reservation id)
+
+    def expire(self, now: float) -> None:
+        """Give back the units of reservations that have expired; call with the lock held"""
+        while self.expiries and self.expiries[0][0] <= now:
+            _, reservation_id = heapq.heappop(self.expiries)
+            self.held -= self.reservations.pop(reservation_id, 0)
+
+
+class StockReservations:
+    """Holds stock for checkouts in progress, so concurrent orders can't oversell.
+
+    Every product has its own lock. A reservation locks the products it
+    needs in product_id order, so two reservations never wait on each other
+    in a cycle, checks that each has enough stock not already held, and
+    holds all of it or none. Committing takes the held units out of
+    product.stock; releasing a reservation, or letting it expire, gives them
+    back. Expired holds are dropped whenever their product is next locked.
+    """
+
+    def __init__(self, ttl: float = RESERVATION_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._holds: Dict[str, _Holds] = {}  # product_id -> holds
+
+    def _lock(self, product_ids: Iterable[str]) -> List[Tuple[str, _Holds]]:
+        locked = []
+        for product_id in sorted(product_ids):
+            holds = self._holds.get(product_id)
+            if holds is None:
+                # setdefault is atomic, so racing threads end up sharing one lock
+                holds = self._holds.setdefault(product_id, _Holds())
+            holds.lock.acquire()
+            locked.append((product_id, holds))
+        return locked
+
+    @staticmethod
+    def _unlock(locked: List[Tuple[str, _Holds]]) -> None:
+        for _, holds in reversed(locked):
+            holds.lock.release()
+
+    def available(self, product: Product) -> int:
+        """Units of a product in stock and not held by a reservation"""
+        locked = self._lock([product.product_id])
+        try:
+            locked[0][1].expire(self._clock())
+            return max(0, product.stock - locked[0][1].held)
+        finally:
+            self._unlock(locked)
+
+    def set_stock(self, product: Product, stock: int) -> bool:
+        """Set a product's stock under its lock; False, leaving it unchanged, if stock is below the units held"""
+        if stock < 0:
+            raise ValueError("Stock can't be negative.")
+        locked = self._lock([product.product_id])
+        try:
+            holds = locked[0][1]
+            holds.expire(self._clock())
+            if stock < holds.held:
+                return False
+            product.stock = stock
+            return True
+        finally:
+            self._unlock(locked)
+
+    def reserve(self, lines: Iterable[Tuple[Product, int]], ttl: Optional[float] = None) -> Reservation:
+        """Hold units of every (product, quantity) line, or of none.
+
+        Lines for the same product are added together. Raises InsufficientStock
+        for the first product short of stock, or ValueError for a quantity
+        that isn't positive. ttl overrides how many seconds the hold lasts.
+        """
+        wanted: Dict[str, Tuple[Product, int]] = {}
+        for product, quantity in lines:
+            if quantity <= 0:
+                raise ValueError("Quantity must be positive.")
+            earlier = wanted.get(product.product_id, (product, 0))[1]
+            wanted[product.product_id] = (product, earlier + quantity)
+
+        locked = self._lock(wanted)
+        try:
+            now = self._clock()
+            for product_id, holds in locked:
+                holds.expire(now)
+                product, quantity = wanted[product_id]
+                if quantity > product.stock - holds.held:
+                    raise InsufficientStock(product, max(0, product.stock - holds.held))
+
+            reservation = Reservation(wanted, now + (self.ttl if ttl is None else ttl))
+            for product_id, holds in locked:
+                holds.held += wanted[product_id][1]
+                holds.reservations[reservation.reservation_id] = wanted[product_id][1]
+                heapq.heappush(holds.expiries, (reservation.expires_at, reservation.reservation_id))
+            return reservation
+        finally:
+            self._unlock(locked)
+
+    def _settle(self, reservation: Reservation, take: bool) -> bool:
+        locked = self._lock(reservation.lines)
+        try:
+            now = self._clock()
+            if now >= reservation.expires_at or any(
+                    reservation.reservation_id not in holds.reservations for _, holds in locked):
+                for _, holds in locked:
+                    holds.expire(now)
+                return False
+            # Stock changed outside set_stock may no longer cover the hold; then nothing is taken
+            short = take and next((product for product, quantity in reservation.lines.values()
+                                   if product.stock < quantity), None)
+            reservation.short_of = short or None
+            for product_id, holds in locked:
+                holds.held -= holds.reservations.pop(reservation.reservation_id)
+                if not holds.reservations:
+                    # Nothing left to expire, so drop the settled reservations' deadlines
+                    holds.expiries.clear()
+                if take and not short:
+                    product, quantity = reservation.lines[product_id]
+                    product.stock -= quantity
+            return not short
+        finally:
+            self._unlock(locked)
+
+    def commit(self, reservation: Reservation) -> bool:
+        """Take the reserved units out of stock.
+
+        False if the reservation expired or was already settled, or if a
+        product no longer has the units held; the reservation is released then
+        and short_of names the product.
+        """
+        return self._settle(reservation, take=True)
+
+    def release(self, reservation: Reservation) -> bool:
+        """Give the reserved units back; False if the reservation expired or was already settled"""
+        return self._settle(reservation, take=False)
@@ -423,6 +423,9 @@ class TestRetailStore:
         assert updated_product.category == "Gadgets"
         assert updated_product.price == 299.99
         assert updated_product.stock == 15
+        assert estore.search_product("updated") == [product]
+        assert estore.search_product("gadg") == [product]
+        assert estore.search_product("test product") == []
     
     def test_retail_store_delete_product(self, clean_estore):
         """Test retail store deleting a product"""
@@ -489,6 +492,38 @@ class TestRetailStore:
         assert updated_order.status == "In Transit"
         assert updated_order.delivery.status == "Shipped"
     
+    def test_retail_store_manage_delivery_without_delivery(self, clean_estore, test_users, test_products):
+        """Test a delivery created for an order without one is linked to it and survives a reload"""
+        estore = clean_estore
+        customer = test_users["customer"]
+        store = test_users["retail_store"]
+        store.login("password123")
+        customer.login("password123")
+        
+        # A failed payment leaves the order without a delivery
+        with patch('payment.Payment.process_payment', return_value=False):
+            order = customer.place_order(estore, [{"product_id": test_products[0].product_id, "quantity": 1}],
+                                         "Credit Card")
+        assert order.delivery is None
+        
+        # An invalid status choice leaves no delivery behind
+        deliveries = len(estore.deliveries)
+        with patch('builtins.input', side_effect=["1", "9"]):
+            with patch('builtins.print'):
+                store.manage_delivery(estore)
+        assert order.delivery is None
+        assert len(estore.deliveries) == deliveries
+        
+        with patch('builtins.input', side_effect=["1", "2"]):
+            with patch('builtins.print'):
+                store.manage_delivery(estore)
+        assert order.delivery.status == "Shipped"
+        
+        EStore._instance = None
+        reloaded = EStore.get_instance().get_order(order.order_id)
+        assert reloaded.status == "In Transit"
+        assert reloaded.delivery.status == "Shipped"
+    
     def test_retail_store_to_dict(self):
         """Test retail store serialization to dictionary"""
         store = RetailStore("Store Owner", "store@test.com", "password123", "Test Store")
@@ -1127,6 +1162,415 @@ class TestEStore:
         assert product == self.product1
         assert self.e_store.get_product("nonexistent") is None
 
+    def test_store_indexes_follow_list_changes(self):
+        """Test lookups stay in step with additions, removals and reassigned lists"""
+        customer = Customer("Index Customer", "Index@Test.com", "password123")
+        self.e_store.add_user(customer)
+        assert self.e_store.get_user("index@test.com") is customer
+        assert self.e_store.get_user("INDEX@test.com") is customer
+
+        product3 = Product("Kite", "Toys", 9.99, 5)
+        self.e_store.products.append(product3)
+        assert self.e_store.get_product(product3.product_id) is product3
+        self.e_store.products.remove(product3)
+        assert self.e_store.get_product(product3.product_id) is None
+
+        self.e_store.products = [self.product2]
+        assert self.e_store.get_product(self.product1.product_id) is None
+        assert self.e_store.get_product(self.product2.product_id) is self.product2
+
+        customer.login("password123")
+        order = customer.place_order(self.e_store, [{"product_id": self.product2.product_id, "quantity": 1}],
+                                     "Credit Card")
+        assert self.e_store.get_order(order.order_id) is order
+        del self.e_store.orders[:]
+        assert self.e_store.get_order(order.order_id) is None
+
+    def test_store_search_matches_substring_scan(self):
+        """Test indexed search returns what a scan of every name and category would"""
+        def scan(query):
+            query = query.lower()
+            return [p for p in self.e_store.products
+                    if query in p.name.lower() or query in p.category.lower()]
+
+        for name, category in [("Red Ball", "Toys"), ("TV", "Electronics"), ("Ballerina Doll", "Toys"),
+                               ("Äpfel Saft", "Food"), ("ab", "x"), ("Teddy Bear XL", "Plush")]:
+            self.e_store.add_product(Product(name, category, 5.0, 1))
+        self.e_store.delete_product(self.product2.product_id)
+        renamed = self.e_store.search_product("red ball")[0]
+        renamed.name = "Blue Ball"
+        self.e_store.update_product(renamed)
+
+        for query in ["", "b", "BA", "ball", "all doll", "red", "blue ball", "äpfel", "tv", "ab", "oys",
+                      "electronics", "teddy bear", "bear teddy", "zzz", "l", "x", "xl", "ä"]:
+            assert self.e_store.search_product(query) == scan(query), query
+
+        # Short queries are looked up, not matched against every indexed gram
+        from product_search import ProductIndex
+        self.e_store.product_search._postings = {}
+        assert self.e_store.search_product("ba") == scan("ba")
+        with pytest.raises(TypeError):
+            ProductIndex()
+
+    def test_store_fuzzy_search_ranks_misspellings(self):
+        """Test fuzzy search tolerates typos, ranks closer matches first and honours the limit"""
+        dark = Product("Dark Chocolate Bar", "Food", 3.5, 10)
+        milk = Product("Milk Chocolate", "Food", 3.0, 10)
+        cookie = Product("Chocolate Chip Cookie", "Food", 2.0, 10)
+        self.e_store.add_product(dark)
+        self.e_store.add_product(milk)
+        self.e_store.add_product(cookie)
+
+        assert self.e_store.search_product("chocolte") == []
+        assert self.e_store.search_product("chocolte", fuzzy=True) == [dark, milk, cookie]
+        assert self.e_store.search_product("milk chocolte", fuzzy=True)[0] is milk
+        assert self.e_store.search_product("chocolte", fuzzy=True, limit=1) == [dark]
+        assert self.e_store.search_product("Dol", fuzzy=True) == []
+
+        self.e_store.delete_product(dark.product_id)
+        milk.name = "Milk Toffee"
+        self.e_store.update_product(milk)
+        assert self.e_store.search_product("chocolte", fuzzy=True) == [cookie]
+        assert self.e_store.search_product("tofee", fuzzy=True) == [milk]
+
+    def test_cli_search_falls_back_to_fuzzy_matches(self):
+        """Test the search screen shows the closest matches when nothing matches exactly"""
+        from dollmart_main import DollMartCLI
+        cli = DollMartCLI()
+        with patch('builtins.input', side_effect=["Tedy Baer", "0"]):
+            with patch('builtins.print') as mock_print:
+                cli._search_products()
+        printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+        assert "Showing closest matches" in printed
+        assert "1. Teddy Bear" in printed
+
+    def test_fuzzy_index_rebuilds_once_half_its_words_are_dead(self):
+        """Test renamed products' old words stop matching and don't pile up in the BK-tree"""
+        from product_search import FuzzyIndex
+        kite = Product("Kite", "Toys", 5.0, 10)
+        index = FuzzyIndex([kite])
+        for round in range(50):
+            kite.name = f"Kite Model{round}"
+            index.update(kite)
+            assert index._words.size <= 2 * (len(index._postings) + 1)
+        assert index.search("model49") == [kite]
+        assert "model12" not in index._postings
+
+    def test_cli_search_asks_for_fuzzy_matches(self):
+        """Test a query starting with ~ goes straight to the typo-tolerant search"""
+        from dollmart_main import DollMartCLI
+        cli = DollMartCLI()
+        with patch('builtins.input', side_effect=["~Tedy", "0"]):
+            with patch('builtins.print') as mock_print:
+                cli._search_products()
+        printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+        assert "No exact matches" not in printed
+        assert "1. Teddy Bear" in printed
+
+    def test_store_suggestions_follow_sales_and_catalogue(self):
+        """Test autocomplete ranks completions by units sold and follows catalogue changes"""
+        kite = Product("Kite", "Toys", 5.0, 10)
+        kitchen = Product("Kitchen  Scale", "Home", 15.0, 10)
+        self.e_store.add_product(kite)
+        self.e_store.add_product(kitchen)
+        assert self.e_store.suggest_products("KIT") == ["kitchen scale", "kite"]
+
+        customer = Customer("Suggest Customer", "suggest@test.com", "password123")
+        self.e_store.add_user(customer)
+        customer.login("password123")
+        customer.place_order(self.e_store, [{"product_id": kite.product_id, "quantity": 2}], "Credit Card")
+        assert self.e_store.suggest_products("kit") == ["kite", "kitchen scale"]
+        assert self.e_store.suggest_products("t")[0] == "toys"
+        assert self.e_store.suggest_products("kit", k=1) == ["kite"]
+
+        kitchen.name = "Bathroom Scale"
+        self.e_store.update_product(kitchen)
+        self.e_store.delete_product(kite.product_id)
+        assert self.e_store.suggest_products("kit") == []
+        assert self.e_store.suggest_products("bath") == ["bathroom scale"]
+
+    def test_cli_search_offers_suggestions(self):
+        """Test a query ending in * lists completions and searches the one picked"""
+        from dollmart_main import DollMartCLI
+        cli = DollMartCLI()
+        with patch('builtins.input', side_effect=["ted*", "1", "0"]):
+            with patch('builtins.print') as mock_print:
+                cli._search_products()
+        printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+        assert "1. teddy bear" in printed
+        assert "1. Teddy Bear" in printed
+
+    def test_store_browse_by_category_and_price(self):
+        """Test browsing by price range and category counts follow adds, deletes, price and stock changes"""
+        lamp = Product("Lamp", "electronics", 149.0, 1)
+        radio = Product("Radio", "Electronics", 250.0, 5)
+        self.e_store.add_product(lamp)
+        self.e_store.add_product(radio)
+
+        assert self.e_store.browse_products("Electronics", max_price=200) == [self.product1, lamp]
+        assert self.e_store.browse_products(descending=True, limit=2) == [radio, lamp]
+        assert self.e_store.browse_products(min_price=20, max_price=149) == [self.product2, lamp]
+        assert self.e_store.category_counts() == {"Clothing": 1, "Electronics": 3}
+        assert self.e_store.category_counts(min_price=100) == {"Electronics": 2}
+
+        radio.price = 99.0
+        self.e_store.update_product(radio)
+        assert self.e_store.browse_products("ELECTRONICS", max_price=200) == [self.product1, radio, lamp]
+
+        customer = Customer("Browse Customer", "browse@test.com", "password123")
+        self.e_store.add_user(customer)
+        customer.login("password123")
+        customer.place_order(self.e_store, [{"product_id": lamp.product_id, "quantity": 1}], "Credit Card")
+        assert self.e_store.browse_products("electronics", in_stock=True) == [self.product1, radio]
+        assert self.e_store.category_counts(in_stock=True) == {"Clothing": 1, "Electronics": 2}
+
+        self.e_store.delete_product(self.product2.product_id)
+        assert self.e_store.category_counts() == {"Electronics": 3}
+        assert self.e_store.browse_products("Clothing") == []
+
+    def test_cli_browse_products(self):
+        """Test the browse screen lists category counts and products in the price range"""
+        from dollmart_main import DollMartCLI
+        cli = DollMartCLI()
+        with patch('builtins.input', side_effect=["1", "", "30", "1", "n", "0"]):
+            with patch('builtins.print') as mock_print:
+                cli._browse_products()
+        printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list if call.args)
+        assert "1. Clothing (1)" in printed
+        assert "1. Doll" in printed
+        assert "Teddy Bear" not in printed
+
+    def test_cli_main_menu_numbers_options_in_order(self):
+        """Test the main menu lists its options in order and choice 4 opens the browse screen"""
+        from dollmart_main import DollMartCLI
+        cli = DollMartCLI()
+        with patch('builtins.input', side_effect=["4", "1", "", "30", "1", "n", "0", "0"]):
+            with patch('builtins.print') as mock_print:
+                cli.start()
+        printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+        menu = printed[printed.index("\n==== Main Menu ====") + 1:printed.index("0. Exit")]
+        numbers = [int(line.split(".")[0]) for line in menu]
+        assert numbers == sorted(numbers) == [1, 2, 3, 4]
+        assert "\n==== Browse Products ====" in printed
+
+    def test_store_pages_products(self):
+        """Test offset and cursor paging, with cursors unaffected by changes to earlier pages"""
+        for i in range(23):
+            self.e_store.add_product(Product(f"Item {i}", "Toys", 1.0 + i, 5))
+        products = list(self.e_store.products)
+
+        assert self.e_store.page_products(0, 10) == products[:10]
+        assert self.e_store.page_products(20) == products[20:]
+
+        page, cursor = self.e_store.products_after(limit=10)
+        assert page == products[:10]
+        self.e_store.delete_product(products[3].product_id)
+        self.e_store.add_product(Product("Late Item", "Toys", 9.0, 5))
+        page, cursor = self.e_store.products_after(cursor, limit=10)
+        assert page == products[10:20]
+
+        # The cursor still works once the product it names is deleted
+        self.e_store.delete_product(products[19].product_id)
+        page, cursor = self.e_store.products_after(cursor, limit=10)
+        assert [product.name for product in page] == [p.name for p in products[20:]] + ["Late Item"]
+        assert cursor is None
+
+    def test_cli_place_order_pages_products(self):
+        """Test the order screen numbers products per page and keeps them while the cart is filled"""
+        from dollmart_main import DollMartCLI
+        for i in range(13):
+            self.e_store.add_product(Product(f"Item {i}", "Toys", 1.0, 5))
+        customer = Customer("Pager Customer", "pager@test.com", "password123")
+        customer.login("password123")
+        cli = DollMartCLI()
+        cli.current_user = customer
+        with patch('builtins.input', side_effect=["n", "12", "2", "y", "3", "0", "n"]):
+            with patch('builtins.print') as mock_print:
+                cli._place_order()
+        printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+        assert "10. Item 7 - $1.00 (5 in stock)" in printed
+        assert "11. Item 8 - $1.00 (5 in stock)" in printed
+        assert "-- Page 2 (p: previous page) --" in printed
+        assert "2x Item 9 added to cart." in printed
+        assert "Invalid product number." in printed
+        assert "Order cancelled." in printed
+
+    def test_store_reserves_all_lines_or_none(self):
+        """Test a reservation holds every line or none, and commit or release settles it once"""
+        from stock_reservations import InsufficientStock
+        teddy = {"product_id": self.product1.product_id, "quantity": 40}
+        with pytest.raises(InsufficientStock) as error:
+            self.e_store.reserve_stock([teddy, {"product_id": self.product2.product_id, "quantity": 31}])
+        assert error.value.product is self.product2 and error.value.available == 30
+        assert self.e_store.available_stock(self.product1) == 50
+
+        # Lines for the same product are added together
+        reservation = self.e_store.reserve_stock([teddy, dict(teddy, quantity=5)])
+        assert self.e_store.available_stock(self.product1) == 5
+        with pytest.raises(InsufficientStock):
+            self.e_store.reserve_stock([dict(teddy, quantity=6)])
+        assert self.e_store.release_reservation(reservation)
+        assert not self.e_store.commit_reservation(reservation)
+        assert self.e_store.available_stock(self.product1) == 50
+
+        reservation = self.e_store.reserve_stock([dict(teddy, quantity=10)])
+        assert self.e_store.commit_reservation(reservation)
+        assert not self.e_store.commit_reservation(reservation)
+        assert self.product1.stock == 40
+        assert self.e_store.available_stock(self.product1) == 40
+
+    def test_store_reservations_expire(self):
+        """Test an abandoned reservation gives its stock back and can no longer be used"""
+        customer = Customer("Slow Customer", "slow@test.com", "password123")
+        customer.login("password123")
+        items = [{"product_id": self.product2.product_id, "quantity": 30}]
+        reservation = self.e_store.reserve_stock(items, ttl=0)
+        assert self.e_store.available_stock(self.product2) == 30
+
+        with patch('builtins.print') as mock_print:
+            assert customer.place_order(self.e_store, items, "Credit Card", reservation) is None
+        mock_print.assert_called_with("Your reserved stock has expired. Please place the order again.")
+        assert self.product2.stock == 30
+        assert customer.place_order(self.e_store, items, "Credit Card") is not None
+        assert self.product2.stock == 0
+
+    def test_store_concurrent_reservations_do_not_oversell(self):
+        """Test threads racing for the same stock sell exactly what there is"""
+        import threading
+        items = [{"product_id": self.product2.product_id, "quantity": 1},
+                 {"product_id": self.product1.product_id, "quantity": 1}]
+        sold = []
+
+        def checkout():
+            for _ in range(10):
+                try:
+                    reservation = self.e_store.reserve_stock(items)
+                except ValueError:
+                    continue
+                if self.e_store.commit_reservation(reservation):
+                    sold.append(reservation)
+
+        threads = [threading.Thread(target=checkout) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(sold) == 30
+        assert self.product2.stock == 0 and self.product1.stock == 20
+
+    def test_store_stock_edits_respect_reservations(self):
+        """Test stock can't be set below the units held, and a commit never takes more than is in stock"""
+        reservation = self.e_store.reserve_stock([{"product_id": self.product2.product_id, "quantity": 20}])
+        assert not self.e_store.set_stock(self.product2, 19)
+        assert self.product2.stock == 30
+        assert self.e_store.set_stock(self.product2, 25)
+        assert self.e_store.available_stock(self.product2) == 5
+
+        store = RetailStore("Stock Owner", "stock@test.com", "password123", "Stock Store")
+        with patch('builtins.input', side_effect=[self.product2.product_id, "", "", "", "10"]):
+            with patch('builtins.print') as mock_print:
+                store._update_product(self.e_store)
+        mock_print.assert_any_call("Stock can't go below the units reserved by checkouts in progress.")
+        assert self.product2.stock == 25
+
+        # Negative stock is refused with the reason, not reported as a bad number
+        with patch('builtins.input', side_effect=[self.product2.product_id, "", "", "", "-1"]):
+            with patch('builtins.print') as mock_print:
+                store._update_product(self.e_store)
+        mock_print.assert_any_call("Invalid stock quantity. Stock can't be negative.")
+        assert self.product2.stock == 25
+
+        # Stock changed behind the reservations' back no longer covers the hold
+        self.product2.stock = 5
+        assert not self.e_store.commit_reservation(reservation)
+        assert reservation.short_of is self.product2
+        assert self.product2.stock == 5
+        assert self.e_store.available_stock(self.product2) == 5
+
+    def test_store_place_order_checks_reservation(self):
+        """Test an order only commits a reservation holding exactly its items, and says why a commit failed"""
+        customer = Customer("Holder", "holder@test.com", "password123")
+        self.e_store.add_user(customer)
+        customer.login("password123")
+        items = [{"product_id": self.product1.product_id, "quantity": 2},
+                 {"product_id": self.product1.product_id, "quantity": 1}]
+
+        # Items split over two lines are summed before comparing
+        stock = self.product1.stock
+        reservation = self.e_store.reserve_stock([{"product_id": self.product1.product_id, "quantity": 3}])
+        assert customer.place_order(self.e_store, items, "Credit Card", reservation)
+        assert self.product1.stock == stock - 3
+
+        reservation = self.e_store.reserve_stock([{"product_id": self.product2.product_id, "quantity": 3}])
+        with patch('builtins.print') as mock_print:
+            assert customer.place_order(self.e_store, items, "Credit Card", reservation) is None
+        mock_print.assert_any_call("Your reserved stock doesn't match the items ordered. Please place the order again.")
+        assert self.product1.stock == stock - 3
+        assert self.e_store.available_stock(self.product2) == self.product2.stock
+
+        reservation = self.e_store.reserve_stock(items)
+        self.product1.stock = 2
+        with patch('builtins.print') as mock_print:
+            assert customer.place_order(self.e_store, items, "Credit Card", reservation) is None
+        mock_print.assert_any_call(f"{self.product1.name} no longer has enough stock. Please place the order again.")
+
+        reservation = self.e_store.reserve_stock([{"product_id": self.product2.product_id, "quantity": 1}], ttl=0)
+        with patch('builtins.print') as mock_print:
+            assert customer.place_order(self.e_store, [{"product_id": self.product2.product_id, "quantity": 1}],
+                                        "Credit Card", reservation) is None
+        mock_print.assert_any_call("Your reserved stock has expired. Please place the order again.")
+
+    def test_store_concurrent_place_order(self):
+        """Test customers ordering from several threads leave the orders, indexes and journal consistent"""
+        import threading
+        import estore
+        products = [self.product1, self.product2] + [Product(f"Race Item {i}", "Toys", 5.0 + i, 6) for i in range(4)]
+        for product in products[2:]:
+            self.e_store.add_product(product)
+        customers = [Customer(f"Racer {i}", f"racer{i}@test.com", "password123") for i in range(8)]
+        for customer in customers:
+            self.e_store.add_user(customer)
+            customer.login("password123")
+        earlier = len(self.e_store.orders)
+        placed = []
+
+        def shop(index):
+            for round_no in range(10):
+                items = [{"product_id": products[(index + round_no + line) % len(products)].product_id,
+                          "quantity": 1 + line} for line in range(2)]
+                order = customers[index].place_order(self.e_store, items, "Credit Card")
+                if order:
+                    placed.append(order)
+
+        # Compact often, so snapshots are written while orders are being placed
+        with patch.object(estore, "COMPACT_MIN_RECORDS", 5), patch('builtins.print'):
+            threads = [threading.Thread(target=shop, args=(i,)) for i in range(len(customers))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert placed
+        assert len(self.e_store.orders) == earlier + len(placed)
+        assert all(self.e_store.get_order(order.order_id) is order for order in placed)
+        assert all(product.stock >= 0 for product in products)
+        sold = {product.product_id: 0 for product in products}
+        for order in placed:
+            for item in order.items:
+                sold[item["product_id"]] += item["quantity"]
+        assert sold[self.product2.product_id] == 30 - self.product2.stock
+        assert self.e_store.browse_products(in_stock=True) == sorted(
+            (product for product in products if product.stock > 0), key=lambda product: product.price)
+        assert self.e_store.suggest_products("race", k=1) != []
+
+        # Reloading from the journal or database gives back every order and the stock left
+        stock = {product.product_id: product.stock for product in products}
+        EStore._instance = None
+        reloaded = EStore.get_instance()
+        assert all(reloaded.get_order(order.order_id).status == "Confirmed" for order in placed)
+        assert len(reloaded.orders) == earlier + len(placed)
+        assert {product_id: reloaded.get_product(product_id).stock for product_id in stock} == stock
+
 #
 class TestProductEdgeCases:
     def test_product_zero_price(self):
@@ -1377,5 +1821,92 @@ class TestIntegrationEdgeCases:
         assert order1 is not None
         assert order2 is None
         assert limited_stock.stock == 0
+    
+    def test_reload_relinks_orders(self, clean_estore, test_users, test_products):
+        """Test orders reloaded from disk point at the reloaded customer, payment and delivery"""
+        customer = test_users["customer"]
+        customer.login("password123")
+        order = customer.place_order(clean_estore, [{"product_id": test_products[0].product_id, "quantity": 1}],
+                                     "Credit Card")
+
+        EStore._instance = None
+        estore = EStore.get_instance()
+        reloaded = estore.get_order(order.order_id)
+        assert reloaded.customer is estore.get_user("customer@test.com")
+        assert reloaded.payment in estore.payments
+        assert reloaded.payment.payment_id == order.payment.payment_id
+        assert reloaded.delivery in estore.deliveries
+        assert reloaded.delivery.delivery_id == order.delivery.delivery_id
+
+    def test_journal_replays_mutations_and_compacts(self, clean_estore, test_users, test_products):
+        """Test mutations are journaled, replayed on startup and folded into a snapshot"""
+        if clean_estore.journal is None:
+            pytest.skip("Only the json storage engine keeps a journal")
+        customer = test_users["customer"]
+        customer.login("password123")
+        order = customer.place_order(clean_estore, [{"product_id": test_products[1].product_id, "quantity": 3}],
+                                     "Credit Card")
+        clean_estore.delete_product(test_products[2].product_id)
+        order.delivery.update_status("Shipped")
+        clean_estore.update_order(order)
+        assert not os.path.exists("data/products.json")
+
+        # A write torn by a crash is dropped
+        with open("data/journal.log", "a") as f:
+            f.write('{"op": "add_product", "put": [["product", {"product_')
+
+        EStore._instance = None
+        estore = EStore.get_instance()
+        assert estore.get_product(test_products[1].product_id).stock == 17
+        assert estore.get_product(test_products[2].product_id) is None
+        reloaded = estore.get_order(order.order_id)
+        assert reloaded.delivery.status == "Shipped"
+        assert reloaded.customer.order_history == [order.order_id]
+        assert len(estore.retail_stores) == 1
+
+        estore.compact()
+        assert os.path.getsize("data/journal.log") == 0
+        EStore._instance = None
+        estore = EStore.get_instance()
+        assert estore.get_product(test_products[1].product_id).stock == 17
+        assert estore.get_order(order.order_id).delivery.status == "Shipped"
+
+    def test_sqlite_storage_round_trip(self):
+        """Test the SQLite engine stores one row per record and loads them back"""
+        EStore._instance = None
+        if os.path.exists("data/dollmart.db"):
+            os.remove("data/dollmart.db")
+        estore = EStore.get_instance("sqlite")
+        try:
+            customer = Customer("SQL Customer", "sql@test.com", "password123")
+            estore.add_user(customer)
+            product = Product("SQL Product", "Books", 12.5, 4)
+            estore.add_product(product)
+            gone = Product("Gone", "Books", 1.0, 1)
+            estore.add_product(gone)
+            estore.delete_product(gone.product_id)
+            customer.login("password123")
+            order = customer.place_order(estore, [{"product_id": product.product_id, "quantity": 3}], "PayPal")
+
+            rows = estore.database.conn.execute(
+                "SELECT product_id, quantity FROM order_lines WHERE order_id = ?", (order.order_id,)).fetchall()
+            assert [tuple(row) for row in rows] == [(product.product_id, 3)]
+            assert estore.database.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 1
+
+            EStore._instance = None
+            estore = EStore.get_instance("sqlite")
+            assert estore.get_product(product.product_id).stock == 1
+            assert estore.get_product(gone.product_id) is None
+            reloaded = estore.get_order(order.order_id)
+            assert reloaded.customer is estore.get_user("sql@test.com")
+            assert reloaded.items == [{"product_id": product.product_id, "quantity": 3}]
+            assert reloaded.payment.method == "PayPal"
+            assert reloaded.delivery.order_id == order.order_id
+            assert reloaded.customer.order_history == [order.order_id]
+            assert estore.get_user("admin@dollmart.com") is not None
+        finally:
+            estore.database.close()
+            EStore._instance = None
+
 if __name__ == "__main__":
     pytest.main(["-v"])
\ No newline at end of file